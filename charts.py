@@ -0,0 +1,191 @@
+"""Batch chart renderer for the status/report charts.
+
+Charts are described by JSON specs and rendered in one process on the Agg
+backend, so matplotlib and its font cache are loaded once per batch rather
+than once per script. Each output gets a ``.hash`` sidecar holding the hash
+of its spec (data included); a chart whose spec has not changed is skipped,
+and a batch with nothing to redraw never imports matplotlib at all.
+
+A spec:
+
+    {
+      "output": "system_resource_usage.png",
+      "figsize": [12, 6],
+      "layout": [1, 2],
+      "suptitle": "...",
+      "panels": [
+        {"type": "pie", "values": [10.8, 12.5, 76.8], "labels": ["User", "System", "Idle"],
+         "colors": ["#ff9999", "#66b3ff", "#99ff99"], "autopct": "%1.1f%%", "startangle": 140,
+         "title": "CPU Usage"},
+        {"type": "line", "x": [1, 2, 3], "series": [{"y": [3, 1, 2], "style": "g-", "label": "load"}],
+         "xlabel": "t", "ylabel": "load", "grid": true, "legend": true}
+      ]
+    }
+
+    python3 charts.py specs.json [--force]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+# Bump when rendering changes so cached outputs are redrawn
+RENDERER_VERSION = 1
+# CJK-capable fonts: macOS first, then common Linux packages
+CJK_FONTS = ["Arial Unicode MS", "Heiti TC", "PingFang HK", "PingFang SC",
+             "Noto Sans CJK SC", "WenQuanYi Micro Hei", "Source Han Sans SC"]
+
+PIE_OPTIONS = ("colors", "explode", "autopct", "shadow", "startangle", "labeldistance", "pctdistance")
+LINE_OPTIONS = ("label", "linewidth", "alpha", "color", "marker")
+
+_figures = {}
+_installed_fonts = None
+_mpl = None
+
+
+def spec_hash(spec):
+    payload = json.dumps(spec, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{RENDERER_VERSION}:{payload}".encode("utf-8")).hexdigest()
+
+
+def _matplotlib():
+    """Import matplotlib (Agg) on the first chart that actually needs drawing."""
+    global _mpl
+    if _mpl is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.backends.backend_agg
+        import matplotlib.figure
+        import matplotlib.font_manager
+        _mpl = matplotlib
+    return _mpl
+
+
+def available_fonts(names):
+    """Drop fonts that are not installed, so matplotlib does not warn for each one."""
+    global _installed_fonts
+    if _installed_fonts is None:
+        _installed_fonts = {f.name for f in _matplotlib().font_manager.fontManager.ttflist}
+    return [n for n in names if n in _installed_fonts] or ["DejaVu Sans"]
+
+
+def _figure(figsize, dpi):
+    """One Figure per size, cleared and reused across the batch."""
+    key = (tuple(figsize), dpi)
+    fig = _figures.get(key)
+    if fig is None:
+        mpl = _matplotlib()
+        fig = mpl.figure.Figure(figsize=figsize, dpi=dpi)
+        mpl.backends.backend_agg.FigureCanvasAgg(fig)
+        _figures[key] = fig
+    else:
+        fig.clear()
+    return fig
+
+
+def _draw_pie(ax, panel):
+    options = {k: panel[k] for k in PIE_OPTIONS if k in panel}
+    if "explode" in options:
+        options["explode"] = tuple(options["explode"])
+    ax.pie(panel["values"], labels=panel.get("labels"), **options)
+    if panel.get("equal", True):
+        ax.axis("equal")
+
+
+def _draw_line(ax, panel):
+    x = panel.get("x")
+    for series in panel["series"]:
+        args = [x, series["y"]] if x is not None else [series["y"]]
+        if "style" in series:
+            args.append(series["style"])
+        ax.plot(*args, **{k: series[k] for k in LINE_OPTIONS if k in series})
+    for fill in panel.get("fill_between", []):
+        ax.fill_between(x, fill["y1"], fill["y2"], **{k: fill[k] for k in ("color", "alpha", "label") if k in fill})
+    for line in panel.get("vlines", []):
+        ax.axvline(x=line["x"], **{k: line[k] for k in ("color", "linestyle", "label") if k in line})
+    if "xlabel" in panel:
+        ax.set_xlabel(panel["xlabel"], fontsize=panel.get("label_fontsize"))
+    if "ylabel" in panel:
+        ax.set_ylabel(panel["ylabel"], fontsize=panel.get("label_fontsize"))
+    if panel.get("legend"):
+        ax.legend()
+    if panel.get("grid"):
+        ax.grid(True, linestyle=":", alpha=0.6)
+
+
+DRAWERS = {"pie": _draw_pie, "line": _draw_line}
+
+
+def draw(spec):
+    """Build the figure for ``spec`` (without saving)."""
+    rows, cols = spec.get("layout", [1, len(spec["panels"])])
+    fig = _figure(spec.get("figsize", [10, 7]), spec.get("dpi", 100))
+    axes = fig.subplots(rows, cols, squeeze=False).ravel()
+    for ax, panel in zip(axes, spec["panels"]):
+        DRAWERS[panel.get("type", "pie")](ax, panel)
+        if "title" in panel:
+            ax.set_title(panel["title"], fontsize=panel.get("title_fontsize"))
+    if "suptitle" in spec:
+        fig.suptitle(spec["suptitle"], fontsize=spec.get("suptitle_fontsize", 16))
+    if "tight_layout_rect" in spec:
+        fig.tight_layout(rect=spec["tight_layout_rect"])
+    else:
+        fig.tight_layout()
+    return fig
+
+
+def render(spec, out_dir=None, force=False):
+    """Render one chart; returns (path, rendered). Unchanged specs are skipped."""
+    path = spec["output"]
+    if out_dir and not os.path.isabs(path):
+        path = os.path.join(out_dir, path)
+    digest = spec_hash(spec)
+    sidecar = path + ".hash"
+    if not force and os.path.exists(path) and os.path.exists(sidecar):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            if f.read().strip() == digest:
+                return path, False
+
+    rc = {"axes.unicode_minus": False}
+    if spec.get("fonts"):
+        rc["font.sans-serif"] = available_fonts(spec["fonts"])
+    with _matplotlib().rc_context(rc):
+        fig = draw(spec)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fig.savefig(path)
+    with open(sidecar, "w", encoding="utf-8") as f:
+        f.write(digest + "\n")
+    return path, True
+
+
+def render_batch(specs, out_dir=None, force=False):
+    results = []
+    for spec in specs:
+        started = time.perf_counter()
+        path, rendered = render(spec, out_dir, force)
+        results.append((path, rendered, (time.perf_counter() - started) * 1000))
+    return results
+
+
+def load_specs(path):
+    if path == "-":
+        data = json.load(sys.stdin)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    return data["charts"] if isinstance(data, dict) and "charts" in data else (
+        data if isinstance(data, list) else [data])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a batch of chart specs")
+    parser.add_argument("specs", nargs="+", help="JSON files with one spec, a list, or {\"charts\": [...]} ('-' = stdin)")
+    parser.add_argument("--out-dir", help="directory for relative output paths")
+    parser.add_argument("--force", action="store_true", help="render even if the spec is unchanged")
+    args = parser.parse_args()
+
+    specs = [spec for path in args.specs for spec in load_specs(path)]
+    for path, rendered, ms in render_batch(specs, args.out_dir, args.force):
+        print(f"{'✅ rendered' if rendered else '⏩ unchanged'} {path} ({ms:.0f} ms)")
@@ -1,25 +1,39 @@
-import matplotlib.pyplot as plt
+import host_stats
+import resource_sampler
+from charts import render
+
+# Averages over the last hour when the sampler is running, else a live reading
+try:
+    stats = resource_sampler.window_stats(3600)
+except OSError:
+    stats = None
+if stats:
+    value = {name: stats[name]["mean"] for name in ("cpu_user", "cpu_system", "cpu_idle", "mem_used", "mem_available")}
+    period = f"avg of {stats['samples']} samples"
+else:
+    value = host_stats.sample()
+    period = "now"
 
 # CPU data
 cpu_labels = ['User', 'System', 'Idle']
-cpu_sizes = [10.76, 12.46, 76.76]
+cpu_sizes = [value["cpu_user"], value["cpu_system"], value["cpu_idle"]]
 cpu_colors = ['#ff9999','#66b3ff','#99ff99']
 
-# Memory data
-# 34GB used, 1.1GB unused
+# Memory data (GB)
 mem_labels = ['Used', 'Unused']
-mem_sizes = [34, 1.1]
+mem_sizes = [value["mem_used"] / 1024**3, value["mem_available"] / 1024**3]
 mem_colors = ['#ffcc99','#c2c2f0']
 
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
-
-# CPU Pie
-ax1.pie(cpu_sizes, labels=cpu_labels, autopct='%1.1f%%', startangle=140, colors=cpu_colors)
-ax1.set_title('CPU Usage')
-
-# Memory Pie
-ax2.pie(mem_sizes, labels=mem_labels, autopct='%1.1f%%', startangle=140, colors=mem_colors)
-ax2.set_title('Memory Usage (Total ~35.1GB)')
+spec = {
+    "output": "system_resource_usage.png",
+    "figsize": [12, 6],
+    "panels": [
+        {"type": "pie", "values": cpu_sizes, "labels": cpu_labels, "colors": cpu_colors,
+         "autopct": "%1.1f%%", "startangle": 140, "equal": False, "title": f"CPU Usage ({period})"},
+        {"type": "pie", "values": mem_sizes, "labels": mem_labels, "colors": mem_colors,
+         "autopct": "%1.1f%%", "startangle": 140, "equal": False,
+         "title": f"Memory Usage (Total ~{sum(mem_sizes):.1f}GB)"},
+    ],
+}
 
-plt.tight_layout()
-plt.savefig('system_resource_usage.png')
+render(spec)
@@ -1,66 +1,29 @@
-import matplotlib.pyplot as plt
-import subprocess
-import re
 import os
 
-def get_cpu_usage():
-    try:
-        output = subprocess.check_output(['top', '-l', '1', '-n', '0']).decode()
-        match = re.search(r'CPU usage: ([\d.]+)% user, ([\d.]+)% sys, ([\d.]+)% idle', output)
-        if match:
-            return [float(match.group(1)), float(match.group(2)), float(match.group(3))]
-    except:
-        pass
-    return [15.0, 10.0, 75.0]
-
-def get_mem_usage():
-    try:
-        vm = subprocess.check_output(['vm_stat']).decode()
-        page_size = 4096
-        m = re.search(r'page size of (\d+) bytes', vm)
-        if m: page_size = int(m.group(1))
-        
-        def get_val(label):
-            match = re.search(rf'{label}:\s+(\d+)\.', vm)
-            return int(match.group(1)) * page_size / (1024**3) if match else 0
-
-        free = get_val('Pages free')
-        active = get_val('Pages active')
-        inactive = get_val('Pages inactive')
-        speculative = get_val('Pages speculative')
-        wired = get_val('Pages wired down')
-        compressed = get_val('Pages occupied by compressor')
-        
-        used = active + wired + compressed
-        unused = free + inactive + speculative
-        return [used, unused]
-    except:
-        pass
-    return [24.0, 8.0]
-
-cpu_data = get_cpu_usage()
-mem_data = get_mem_usage()
-
-# Use Arial Unicode MS which is standard on macOS for Chinese support
-plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'Heiti TC', 'PingFang HK']
-plt.rcParams['axes.unicode_minus'] = False
-
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
-
-# CPU Pie
-labels_cpu = ['用户 (User)', '系统 (System)', '空闲 (Idle)']
-colors_cpu = ['#ff9999','#66b3ff','#99ff99']
-ax1.pie(cpu_data, labels=labels_cpu, autopct='%1.1f%%', startangle=140, colors=colors_cpu, explode=(0.05, 0, 0))
-ax1.set_title('CPU 资源调度情况', fontsize=14)
-
-# Memory Pie
-labels_mem = ['已使用 (Used)', '空闲/可用 (Available)']
-colors_mem = ['#ffcc99','#c2c2f0']
-ax2.pie(mem_data, labels=labels_mem, autopct='%1.1f%%', startangle=140, colors=colors_mem, explode=(0.05, 0))
-ax2.set_title('内存 资源使用情况', fontsize=14)
-
-plt.suptitle('系统实时资源状态报告', fontsize=16)
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-output_path = 'resource_status_zh.png'
-plt.savefig(output_path)
+import host_stats
+from charts import CJK_FONTS, render
+
+sample = host_stats.sample()
+cpu_data = [sample["cpu_user"], sample["cpu_system"], sample["cpu_idle"]]
+mem_data = [sample["mem_used"] / (1024**3), sample["mem_available"] / (1024**3)]
+
+spec = {
+    "output": "resource_status_zh.png",
+    "figsize": [14, 7],
+    "fonts": CJK_FONTS,
+    "suptitle": "系统实时资源状态报告",
+    "tight_layout_rect": [0, 0.03, 1, 0.95],
+    "panels": [
+        {"type": "pie", "values": cpu_data, "labels": ['用户 (User)', '系统 (System)', '空闲 (Idle)'],
+         "colors": ['#ff9999','#66b3ff','#99ff99'], "explode": [0.05, 0, 0],
+         "autopct": "%1.1f%%", "startangle": 140, "equal": False,
+         "title": "CPU 资源调度情况", "title_fontsize": 14},
+        {"type": "pie", "values": mem_data, "labels": ['已使用 (Used)', '空闲/可用 (Available)'],
+         "colors": ['#ffcc99','#c2c2f0'], "explode": [0.05, 0],
+         "autopct": "%1.1f%%", "startangle": 140, "equal": False,
+         "title": "内存 资源使用情况", "title_fontsize": 14},
+    ],
+}
+
+output_path, _ = render(spec)
 print(f"File saved to {os.path.abspath(output_path)}")
@@ -0,0 +1,63 @@
+"""Live CPU/memory reading for the chart scripts, on Linux and macOS.
+
+Linux reads /proc through resource_sampler (no subprocess); macOS, which has
+no /proc, parses ``top`` and ``vm_stat``. Anything that cannot be read falls
+back to placeholder values with a warning, so a chart is still produced.
+
+Memory is split one way on each platform: /proc's MemAvailable against the
+rest, or on macOS active + wired + compressed pages as used and free +
+inactive + speculative pages as available.
+"""
+import re
+import subprocess
+import sys
+
+import resource_sampler
+
+PLACEHOLDER_CPU = (15.0, 10.0, 75.0)
+PLACEHOLDER_MEM = (24 * 1024**3, 8 * 1024**3)
+
+
+def macos_cpu():
+    """(user, system, idle) percent from ``top``, or None."""
+    try:
+        output = subprocess.check_output(['top', '-l', '1', '-n', '0'], stderr=subprocess.DEVNULL).decode()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    match = re.search(r'CPU usage: ([\d.]+)% user, ([\d.]+)% sys, ([\d.]+)% idle', output)
+    return tuple(float(v) for v in match.groups()) if match else None
+
+
+def macos_mem():
+    """(used, available) bytes from ``vm_stat``, or None."""
+    try:
+        vm = subprocess.check_output(['vm_stat'], stderr=subprocess.DEVNULL).decode()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    m = re.search(r'page size of (\d+) bytes', vm)
+    page_size = int(m.group(1)) if m else 4096
+
+    def pages(label):
+        match = re.search(rf'{label}:\s+(\d+)\.', vm)
+        return int(match.group(1)) * page_size if match else 0
+
+    used = pages('Pages active') + pages('Pages wired down') + pages('Pages occupied by compressor')
+    available = pages('Pages free') + pages('Pages inactive') + pages('Pages speculative')
+    return (used, available) if used + available else None
+
+
+def sample():
+    """Dict with cpu_user/cpu_system/cpu_idle (percent) and mem_used/mem_available (bytes)."""
+    try:
+        return resource_sampler.current()
+    except OSError:
+        pass
+    cpu, mem = macos_cpu(), macos_mem()
+    if cpu is None:
+        print("⚠️ CPU usage unavailable, using placeholder values", file=sys.stderr)
+        cpu = PLACEHOLDER_CPU
+    if mem is None:
+        print("⚠️ Memory usage unavailable, using placeholder values", file=sys.stderr)
+        mem = PLACEHOLDER_MEM
+    return {"cpu_user": cpu[0], "cpu_system": cpu[1], "cpu_idle": cpu[2],
+            "mem_used": mem[0], "mem_available": mem[1]}
@@ -0,0 +1,379 @@
+"""Declarative image edits, applied to many files in a process pool.
+
+A pipeline is a list of operations, each a dict with an ``op`` key.
+Coordinates and sizes may be numbers or expressions over:
+
+    w, h     current image size          cx, cy   its centre
+    s        scale against the source    i        index inside "repeat"
+    tw, th   rendered text size ("text" only)
+
+Expressions allow arithmetic, min/max/int/round/abs and nothing else, so
+pipelines can come from JSON files safely. Writing sizes as ``100*s``
+keeps an edit proportional when ``max_size`` shrinks the image.
+
+    {"max_size": [1600, 1600], "output": {"suffix": "_super", "quality": 90},
+     "ops": [
+       {"op": "clone", "box": ["w*0.25", "h*0.1", "w*0.75", "h*0.5"],
+        "copies": [{"to": ["w*0.05", "h*0.1"], "rotate": 15, "mask": "shape", "feather": "6*s"}]},
+       {"op": "line", "repeat": 3, "xy": ["cx-100*s", "h*0.4+i*80*s", "cx-300*s", "h*0.4+i*80*s-50*s"],
+        "fill": [80, 80, 80], "width": "30*s"},
+       {"op": "polygon", "points": [...], "fill": [135, 206, 235], "opacity": 0.5}
+     ]}
+
+When ``max_size`` is smaller than a JPEG, it is decoded at reduced size
+(``Image.draft``), so a 24 MP photo is never fully decompressed. Files are
+fed to the pool a few at a time and only paths and timings come back, so
+memory stays at about ``workers`` images whatever the folder size.
+
+    python3 image_pipeline.py pipeline.json photos/ --out-dir edited --workers 8
+"""
+import argparse
+import ast
+import functools
+import glob
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+IN_FLIGHT_PER_WORKER = 2
+# Op keys holding literal strings (colors, fonts, text), not expressions
+STRING_KEYS = {"op", "text", "font", "mask", "fill", "outline", "stroke_fill", "fillcolor"}
+
+VARIABLES = {"w", "h", "cx", "cy", "s", "i", "tw", "th"}
+FUNCTIONS = {"min": min, "max": max, "int": int, "round": round, "abs": abs}
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load, ast.Call,
+          ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.USub, ast.UAdd)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_expr(text):
+    """Compile a coordinate expression, rejecting anything but arithmetic."""
+    tree = ast.parse(text, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise ValueError(f"{text!r}: {type(node).__name__} is not allowed")
+        if isinstance(node, ast.Name) and node.id not in VARIABLES and node.id not in FUNCTIONS:
+            raise ValueError(f"{text!r}: unknown name {node.id!r}")
+        if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name)
+                                           or node.func.id not in FUNCTIONS):
+            raise ValueError(f"{text!r}: only {', '.join(FUNCTIONS)} may be called")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"{text!r}: only numeric constants are allowed")
+    return compile(tree, "<pipeline>", "eval")
+
+
+def resolve(value, env):
+    """Numbers pass through, strings are evaluated, lists recursively."""
+    if isinstance(value, str):
+        return eval(compile_expr(value), {"__builtins__": {}}, dict(FUNCTIONS, **env))
+    if isinstance(value, (list, tuple)):
+        return [resolve(v, env) for v in value]
+    return value
+
+
+def _color(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _ints(values):
+    return [int(v) for v in values]
+
+
+def composite(img, patch, xy, alpha=None):
+    """Blend ``patch`` onto ``img`` at ``xy`` with a 0..1 ``alpha`` array, clipped to the image."""
+    x, y = int(xy[0]), int(xy[1])
+    if alpha is None:
+        img.paste(patch, (x, y))
+        return
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + patch.width, img.width), min(y + patch.height, img.height)
+    if right <= left or bottom <= top:
+        return
+    box = (left, top, right, bottom)
+    src = np.asarray(patch.convert(img.mode), dtype=np.float32)[top - y:bottom - y, left - x:right - x]
+    dst = np.asarray(img.crop(box), dtype=np.float32)
+    a = alpha[top - y:bottom - y, left - x:right - x]
+    if dst.ndim == 3:
+        a = a[:, :, None]
+    blended = dst + (src - dst) * a
+    img.paste(Image.fromarray(np.rint(blended).astype(np.uint8), img.mode), box)
+
+
+def _mask_alpha(mask, opacity=1.0, feather=0):
+    if feather:
+        mask = mask.filter(ImageFilter.GaussianBlur(feather))
+    return np.asarray(mask, dtype=np.float32) * (opacity / 255.0)
+
+
+def op_clone(img, op, env):
+    """Crop ``box`` once, then paste rotated/scaled copies of it."""
+    region = img.crop(_ints(resolve(op["box"], env)))
+    for copy in op.get("copies", [op]):
+        patch = region
+        scale = resolve(copy.get("scale", 1), env)
+        if scale != 1:
+            patch = patch.resize((max(1, round(patch.width * scale)), max(1, round(patch.height * scale))),
+                                 Image.LANCZOS)
+        angle = resolve(copy.get("rotate", 0), env)
+        opacity = resolve(copy.get("opacity", 1), env)
+        feather = resolve(copy.get("feather", 0), env)
+        # "rect" pastes the whole rotated bounding box, corners included;
+        # "shape" blends only the pixels that came from the region
+        shape = copy.get("mask", "rect") == "shape"
+        mask = Image.new("L", patch.size, 255)
+        if angle:
+            patch = patch.rotate(angle, expand=True)
+            mask = mask.rotate(angle, expand=True) if shape else Image.new("L", patch.size, 255)
+        to = resolve(copy["to"], env)
+        if shape or opacity < 1 or feather:
+            composite(img, patch, to, _mask_alpha(mask, opacity, feather))
+        else:
+            composite(img, patch, to)
+
+
+def _draw_shape(draw, op, env):
+    kind = op["op"]
+    style = {k: _color(op[k]) for k in ("fill", "outline") if k in op}
+    if "width" in op:
+        style["width"] = max(1, int(resolve(op["width"], env)))
+    if kind == "polygon":
+        draw.polygon([tuple(p) for p in resolve(op["points"], env)], **style)
+    elif kind == "ellipse":
+        draw.ellipse(resolve(op["box"], env), **style)
+    elif kind == "rectangle":
+        draw.rectangle(resolve(op["box"], env), **style)
+    elif kind == "line":
+        style.pop("outline", None)
+        draw.line(resolve(op["xy"], env), **style)
+
+
+def op_shape(img, op, env):
+    """Polygon/ellipse/rectangle/line; with ``opacity`` < 1 they are drawn on a mask and blended."""
+    opacity = resolve(op.get("opacity", 1), env)
+    if opacity >= 1:
+        _draw_shape(ImageDraw.Draw(img), op, env)
+        return
+    layer = Image.new(img.mode, img.size)
+    mask = Image.new("L", img.size, 0)
+    _draw_shape(ImageDraw.Draw(layer), op, env)
+    _draw_shape(ImageDraw.Draw(mask), dict(op, fill=255, outline=255) if "fill" in op else dict(op, outline=255), env)
+    bbox = mask.getbbox()
+    if bbox:
+        alpha = _mask_alpha(mask.crop(bbox), opacity)
+        composite(img, layer.crop(bbox), bbox[:2], alpha)
+
+
+@functools.lru_cache(maxsize=32)
+def _font(name, size):
+    try:
+        return ImageFont.truetype(name, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def op_text(img, op, env):
+    draw = ImageDraw.Draw(img)
+    name = op.get("font", "Arial")  # null: Pillow's built-in default font
+    font = _font(name, int(resolve(op.get("size", 40), env))) if name else None
+    stroke = int(resolve(op.get("stroke_width", 0), env))
+    left, top, right, bottom = draw.textbbox((0, 0), op["text"], font=font)
+    env = dict(env, tw=right - left, th=bottom - top)
+    draw.text(resolve(op["xy"], env), op["text"], font=font, fill=_color(op.get("fill", "white")),
+              stroke_width=stroke, stroke_fill=_color(op.get("stroke_fill")))
+
+
+def op_crop(img, op, env):
+    return img.crop(_ints(resolve(op["box"], env)))
+
+
+def op_rotate(img, op, env):
+    return img.rotate(resolve(op["angle"], env), Image.BICUBIC, expand=op.get("expand", True),
+                      fillcolor=_color(op.get("fillcolor")))
+
+
+def op_resize(img, op, env):
+    return img.resize(_ints(resolve(op["size"], env)), Image.LANCZOS)
+
+
+def op_blur(img, op, env):
+    radius = resolve(op.get("radius", 2), env)
+    if "box" not in op:
+        return img.filter(ImageFilter.GaussianBlur(radius))
+    box = _ints(resolve(op["box"], env))
+    img.paste(img.crop(box).filter(ImageFilter.GaussianBlur(radius)), box[:2])
+
+
+# Operations that return a new image replace it; the rest edit in place
+OPS = {
+    "clone": op_clone, "polygon": op_shape, "ellipse": op_shape, "rectangle": op_shape,
+    "line": op_shape, "text": op_text, "crop": op_crop, "rotate": op_rotate,
+    "resize": op_resize, "blur": op_blur,
+}
+
+
+def apply(img, ops, scale=1.0):
+    """Run ``ops`` on ``img`` (edited in place where possible); returns the result."""
+    for op in ops:
+        if op["op"] not in OPS:
+            raise ValueError(f"unknown op {op['op']!r}")
+        for i in range(int(op.get("repeat", 1))):
+            env = {"w": img.width, "h": img.height, "cx": img.width // 2, "cy": img.height // 2,
+                   "s": scale, "i": i}
+            try:
+                result = OPS[op["op"]](img, op, env)
+            except Exception as e:
+                if "fallback" not in op:
+                    raise
+                print(f"⚠️ {op['op']} failed ({e}), using fallback")
+                result = apply(img, op["fallback"], scale)
+            if result is not None:
+                img = result
+    return img
+
+
+def open_image(path, max_size=None):
+    """Open ``path``, decoding JPEGs at reduced size when ``max_size`` allows.
+
+    Returns (image, scale) where scale is the final width over the source width.
+    """
+    img = Image.open(path)
+    source_width = img.width
+    if max_size and (img.width > max_size[0] or img.height > max_size[1]):
+        # draft picks the smallest DCT scale (1/2, 1/4, 1/8) still >= the request
+        if img.format == "JPEG":
+            ratio = min(max_size[0] / img.width, max_size[1] / img.height)
+            img.draft("RGB", (int(img.width * ratio), int(img.height * ratio)))
+        img.thumbnail(max_size, Image.LANCZOS)
+    else:
+        img.load()
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    return img, img.width / source_width
+
+
+def save_image(img, path, options=None):
+    options = dict(options or {})
+    fmt = options.pop("format", None) or Image.registered_extensions().get(os.path.splitext(path)[1].lower())
+    options.pop("suffix", None)
+    if fmt == "JPEG" and img.mode == "RGBA":
+        img = img.convert("RGB")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    img.save(path, format=fmt, **options)
+
+
+def process_file(src, dst, pipeline):
+    """Worker entry point: returns (src, dst, ms, size) so no pixels cross processes."""
+    started = time.perf_counter()
+    img, scale = open_image(src, pipeline.get("max_size"))
+    img = apply(img, pipeline["ops"], scale)
+    save_image(img, dst, pipeline.get("output"))
+    return src, dst, (time.perf_counter() - started) * 1000, img.size
+
+
+def validate(pipeline):
+    """Fail before forking workers if any op or expression is invalid."""
+    def walk(value):
+        if isinstance(value, str):
+            compile_expr(value)
+        elif isinstance(value, list):
+            for v in value:
+                walk(v)
+
+    for op in pipeline["ops"]:
+        if op.get("op") not in OPS:
+            raise ValueError(f"unknown op {op.get('op')!r}")
+        for key, value in op.items():
+            if key == "copies":
+                for copy in value:
+                    walk([v for k, v in copy.items() if k not in STRING_KEYS])
+            elif key == "fallback":
+                validate({"ops": value})
+            elif key not in STRING_KEYS:
+                walk(value)
+
+
+def collect_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            files += sorted(glob.glob(path)) or [path]
+    return files
+
+
+def output_path(src, out_dir, options):
+    stem, ext = os.path.splitext(os.path.basename(src))
+    fmt = (options or {}).get("format")
+    if fmt:
+        ext = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}.get(fmt.upper(), "." + fmt.lower())
+    return os.path.join(out_dir, stem + (options or {}).get("suffix", "") + ext)
+
+
+def run_batch(pipeline, inputs, out_dir, workers=None):
+    """Process every input; yields (src, dst, ms, size) or (src, None, error) as they finish."""
+    validate(pipeline)
+    jobs = deque((src, output_path(src, out_dir, pipeline.get("output"))) for src in inputs)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for src, dst in jobs:
+            try:
+                yield process_file(src, dst, pipeline)
+            except Exception as e:
+                yield src, None, str(e)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while jobs or running:
+            # Keep only a few files per worker queued, so decoded images never pile up
+            while jobs and len(running) < workers * IN_FLIGHT_PER_WORKER:
+                src, dst = jobs.popleft()
+                running[pool.submit(process_file, src, dst, pipeline)] = src
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                src = running.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield src, None, str(e)
+
+
+def _size(text):
+    w, _, h = text.lower().partition("x")
+    return [int(w), int(h or w)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply a JSON image pipeline to many files")
+    parser.add_argument("pipeline", help="JSON file with {\"ops\": [...], \"max_size\": ..., \"output\": ...}")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or globs")
+    parser.add_argument("--out-dir", default="edited")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-size", type=_size, help="WxH bound, overrides the pipeline's max_size")
+    args = parser.parse_args()
+
+    with open(args.pipeline, "r", encoding="utf-8") as f:
+        pipeline = json.load(f)
+    if args.max_size:
+        pipeline["max_size"] = args.max_size
+
+    inputs = collect_inputs(args.inputs)
+    started = time.perf_counter()
+    failed = 0
+    for result in run_batch(pipeline, inputs, args.out_dir, args.workers):
+        if result[1] is None:
+            failed += 1
+            print(f"❌ {result[0]}: {result[2]}")
+        else:
+            print(f"✅ {result[1]} {result[3][0]}x{result[3][1]} ({result[2]:.0f} ms)")
+    elapsed = time.perf_counter() - started
+    print(f"🖼️ {len(inputs) - failed}/{len(inputs)} images in {elapsed:.1f}s "
+          f"({len(inputs) / elapsed if elapsed else 0:.1f}/s, {args.workers} workers)")
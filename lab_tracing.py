@@ -0,0 +1,20 @@
+"""``tracing`` for scripts that live outside nanoclaw-lab/.
+
+    from lab_tracing import tracing
+
+Puts nanoclaw-lab/ on sys.path and returns its tracing module, or, when the
+lab scripts are not there, a stand-in whose ``span``/``run`` are no-op
+context managers and whose ``flush`` does nothing.
+"""
+import contextlib
+import os
+import sys
+import types
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "nanoclaw-lab"))
+try:
+    import tracing
+except ImportError:  # copied out of the repo: tracing is optional
+    _null = contextlib.nullcontext(types.SimpleNamespace(set=lambda **attrs: None))
+    tracing = types.SimpleNamespace(span=lambda name, **attrs: _null, run=lambda name, **attrs: _null,
+                                    flush=lambda: None)
@@ -1,39 +1,507 @@
 import os
 import glob
 import re
+import gzip
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import argparse
+from collections import Counter
 from datetime import datetime
 
-def analyze_system_logs(log_dir="logs"):
+from lab_tracing import tracing
+
+# One combined pass: the group that matched tells us the category
+EVENT_PATTERN = re.compile(rb"(INFO)|(ERROR)|(WARN)|(completed)")
+CATEGORIES = ("total_events", "errors", "warnings", "task_completions")
+LOG_GLOBS = ("*.log", "*.log.[0-9]*", "*.log.gz", "*.log.*.gz")
+HEAD_BYTES = 4096
+MIN_HEAD_MATCH = 256
+CHUNK_BYTES = 32 * 1024 * 1024
+
+# pino numeric levels
+LEVEL_INFO, LEVEL_WARN, LEVEL_ERROR = 30, 40, 50
+DURATION_KEYS = ("duration", "durationMs", "duration_ms")
+# Task durations are kept as log-scale histograms: ~5% relative error on
+# percentiles for a few dozen integers per (minute, name).
+HIST_GROWTH = 1.1
+VOLATILE = re.compile(r"[0-9a-f]{8}-[0-9a-f-]{27}|0x[0-9a-f]+|\d+", re.I)
+
+def empty_counts():
+    return dict.fromkeys(CATEGORIES, 0)
+
+def duration_bucket(ms):
+    return 0 if ms <= 1 else math.ceil(math.log(ms) / math.log(HIST_GROWTH))
+
+def bucket_value(bucket):
+    return HIST_GROWTH ** bucket
+
+def error_signature(record):
+    """Stable identity for an error: message and error type with ids,
+    numbers and hex addresses masked out."""
+    err = record.get("err") or {}
+    text = f"{err.get('type', '')}: {record.get('msg', '')} {err.get('message', '')}" if isinstance(err, dict) \
+        else f"{record.get('msg', '')} {err}"
+    normalized = VOLATILE.sub("#", text.strip())[:200]
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16], normalized
+
+class Partial:
+    """Mergeable result of scanning part of the logs."""
+
+    def __init__(self):
+        self.counts = empty_counts()
+        self.levels = Counter()      # (minute, level) -> n
+        self.errors = Counter()      # (minute, signature) -> n
+        self.samples = {}            # signature -> normalized text
+        self.durations = Counter()   # (minute, name, bucket) -> n
+
+    def merge(self, other):
+        for key in CATEGORIES:
+            self.counts[key] += other.counts[key]
+        self.levels.update(other.levels)
+        self.errors.update(other.errors)
+        self.samples.update(other.samples)
+        self.durations.update(other.durations)
+        return self
+
+    def add_line(self, line):
+        if line.startswith(b"{"):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict) and isinstance(record.get("level"), int):
+                self.add_record(record)
+                return
+        for match in EVENT_PATTERN.finditer(line):
+            self.counts[CATEGORIES[match.lastindex - 1]] += 1
+
+    def add_record(self, record):
+        level = record["level"]
+        msg = record.get("msg") or ""
+        if level >= LEVEL_ERROR:
+            self.counts["errors"] += 1
+        elif level >= LEVEL_WARN:
+            self.counts["warnings"] += 1
+        elif level >= LEVEL_INFO:
+            self.counts["total_events"] += 1
+        if "completed" in msg:
+            self.counts["task_completions"] += 1
+
+        timestamp = record.get("time")
+        if not isinstance(timestamp, (int, float)):
+            return
+        minute = int(timestamp // 60000)
+        self.levels[(minute, level)] += 1
+        if level >= LEVEL_ERROR:
+            signature, text = error_signature(record)
+            self.errors[(minute, signature)] += 1
+            self.samples[signature] = text
+        for key in DURATION_KEYS:
+            value = record.get(key)
+            if isinstance(value, (int, float)) and value >= 0:
+                self.durations[(minute, msg[:80], duration_bucket(value))] += 1
+                break
+
+def list_log_files(log_dir):
+    files = set()
+    for pattern in LOG_GLOBS:
+        files.update(glob.glob(os.path.join(log_dir, pattern)))
+    return sorted(files)
+
+def open_log(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+def head_signature(path, length):
+    """SHA-1 of the first ``length`` (decompressed) bytes of ``path``."""
+    with open_log(path) as f:
+        head = f.read(length)
+    if len(head) < length:
+        return None
+    return hashlib.sha1(head).hexdigest()
+
+def scan_stream(f, partial, final=False, limit=None):
+    """Feed lines to ``partial``; returns the number of bytes consumed.
+
+    A trailing line without a newline is still being written, so it is left
+    for the next run unless ``final`` (e.g. a compressed, rotated file).
+    Reading stops once ``limit`` bytes have been consumed.
+    """
+    consumed = 0
+    for line in f:
+        if not line.endswith(b"\n") and not final:
+            break
+        consumed += len(line)
+        partial.add_line(line)
+        if limit is not None and consumed >= limit:
+            break
+    return consumed
+
+class LogIndex:
+    """On-disk index: per-file offsets plus per-minute aggregates.
+
+    Offsets and aggregates are committed in one transaction, so a crash can
+    never count the same bytes twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                state TEXT
+            );
+            CREATE TABLE IF NOT EXISTS level_counts (
+                minute INTEGER, level INTEGER, count INTEGER,
+                PRIMARY KEY (minute, level)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS error_counts (
+                minute INTEGER, signature TEXT, count INTEGER,
+                PRIMARY KEY (minute, signature)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS error_signatures (
+                signature TEXT PRIMARY KEY,
+                sample TEXT
+            );
+            CREATE TABLE IF NOT EXISTS durations (
+                minute INTEGER, name TEXT, bucket INTEGER, count INTEGER,
+                PRIMARY KEY (minute, name, bucket)
+            ) WITHOUT ROWID;
+        """)
+
+    def load_files(self):
+        return {path: json.loads(state) for path, state in self.conn.execute("SELECT path, state FROM files")}
+
+    def reset(self):
+        with self.conn:
+            for table in ("files", "level_counts", "error_counts", "error_signatures", "durations"):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def commit(self, files, partial):
+        with self.conn:
+            self.conn.execute("DELETE FROM files")
+            self.conn.executemany("INSERT INTO files (path, state) VALUES (?, ?)",
+                                  [(path, json.dumps(entry)) for path, entry in files.items()])
+            self.conn.executemany("""
+                INSERT INTO level_counts (minute, level, count) VALUES (?, ?, ?)
+                ON CONFLICT(minute, level) DO UPDATE SET count = count + excluded.count
+            """, [(m, l, n) for (m, l), n in partial.levels.items()])
+            self.conn.executemany("""
+                INSERT INTO error_counts (minute, signature, count) VALUES (?, ?, ?)
+                ON CONFLICT(minute, signature) DO UPDATE SET count = count + excluded.count
+            """, [(m, sig, n) for (m, sig), n in partial.errors.items()])
+            self.conn.executemany("INSERT OR REPLACE INTO error_signatures (signature, sample) VALUES (?, ?)",
+                                  list(partial.samples.items()))
+            self.conn.executemany("""
+                INSERT INTO durations (minute, name, bucket, count) VALUES (?, ?, ?, ?)
+                ON CONFLICT(minute, name, bucket) DO UPDATE SET count = count + excluded.count
+            """, [(m, name, b, n) for (m, name, b), n in partial.durations.items()])
+
+    def errors_per_hour(self, days=7):
+        since = int(time.time() // 60) - days * 1440
+        return self.conn.execute("""
+            SELECT minute / 60 AS hour, SUM(count) FROM level_counts
+            WHERE level >= ? AND minute >= ? GROUP BY hour ORDER BY hour
+        """, (LEVEL_ERROR, since)).fetchall()
+
+    def top_errors(self, days=7, limit=10):
+        since = int(time.time() // 60) - days * 1440
+        return self.conn.execute("""
+            SELECT s.sample, SUM(c.count) AS n FROM error_counts c
+            JOIN error_signatures s ON s.signature = c.signature
+            WHERE c.minute >= ? GROUP BY c.signature ORDER BY n DESC LIMIT ?
+        """, (since, limit)).fetchall()
+
+    def latency_percentile(self, percentile=95, days=7, name=None):
+        """Approximate duration percentile in ms, or None without samples."""
+        since = int(time.time() // 60) - days * 1440
+        sql = "SELECT bucket, SUM(count) FROM durations WHERE minute >= ?"
+        params = [since]
+        if name:
+            sql += " AND name = ?"
+            params.append(name)
+        rows = self.conn.execute(sql + " GROUP BY bucket ORDER BY bucket", params).fetchall()
+        total = sum(n for _, n in rows)
+        if not total:
+            return None
+        rank, seen = total * percentile / 100.0, 0
+        for bucket, n in rows:
+            seen += n
+            if seen >= rank:
+                return bucket_value(bucket)
+        return bucket_value(rows[-1][0])
+
+    def close(self):
+        self.conn.close()
+
+def find_previous(path, st, previous, claimed):
+    """Locate the state entry describing this file's content, if any.
+
+    Same path and inode is the common case. A rename keeps the inode
+    (``app.log`` -> ``app.log.1``). A compressed rotation gets a new inode but
+    its decompressed head still matches the original file's signature. With
+    copytruncate the copy carries the old content under a new inode while
+    ``app.log`` keeps its inode but starts over, so a same-inode file that no
+    longer continues its entry leaves that entry for the copy to claim.
+    """
+    is_gz = path.endswith(".gz")
+    entry = previous.get(path)
+    if entry and not is_gz and entry["inode"] == st.st_ino and entry["dev"] == st.st_dev:
+        if path in claimed or not continues(path, st, entry):
+            return None
+        return path
+    if entry and is_gz and entry.get("raw_size") == st.st_size and entry.get("raw_mtime") == st.st_mtime:
+        return None if path in claimed else path
+    for old_path, entry in previous.items():
+        if old_path in claimed or old_path == path or entry.get("gz"):
+            continue
+        if not is_gz and entry["inode"] == st.st_ino and entry["dev"] == st.st_dev:
+            return old_path
+    for old_path, entry in previous.items():
+        if old_path in claimed or entry["head_len"] < MIN_HEAD_MATCH:
+            continue
+        if old_path == path and entry.get("inode") == st.st_ino:
+            continue  # rejected above: truncated in place
+        if head_signature(path, entry["head_len"]) == entry["head_sha"]:
+            return old_path
+    return None
+
+def continues(path, st, entry):
+    """True if ``path`` still starts with the content ``entry`` was scanned from."""
+    return st.st_size >= entry["offset"] and (
+        entry["head_len"] == 0 or head_signature(path, entry["head_len"]) == entry["head_sha"])
+
+def plan_file(path, entry):
+    """Decide which bytes of ``path`` still need scanning.
+
+    Returns None for an unchanged compressed file, otherwise a dict with
+    the resume offset and the counts carried over from ``entry``.
+    """
+    st = os.stat(path)
+    is_gz = path.endswith(".gz")
+    if entry and is_gz and entry.get("gz") and entry.get("raw_size") == st.st_size \
+            and entry.get("raw_mtime") == st.st_mtime:
+        return None  # compressed logs never change once written
+
+    offset, counts = 0, empty_counts()
+    if entry and (is_gz or st.st_size >= entry["offset"]) \
+            and (entry["head_len"] == 0 or head_signature(path, entry["head_len"]) == entry["head_sha"]):
+        offset, counts = entry["offset"], dict(entry["counts"])
+    return {"path": path, "st": st, "gz": is_gz, "offset": offset, "counts": counts}
+
+def split_ranges(path, start, end, chunk_bytes):
+    """Split [start, end) into ranges of about ``chunk_bytes`` that each end
+    on a newline, so every line belongs to exactly one range."""
+    ranges, pos = [], start
+    with open(path, "rb") as f:
+        while end - pos > chunk_bytes:
+            f.seek(pos + chunk_bytes)
+            f.readline()
+            boundary = f.tell()
+            if boundary >= end:
+                break
+            ranges.append((pos, boundary))
+            pos = boundary
+    ranges.append((pos, end))
+    return ranges
+
+def scan_range(path, start, end=None, final=False):
+    """Scan ``path`` from byte ``start`` up to ``end`` (None = to EOF).
+
+    Top-level so worker processes can run it; returns (bytes consumed, Partial).
+    """
+    partial = Partial()
+    with tracing.span("logs.scan_range", path=os.path.basename(path), start=start) as span, open_log(path) as f:
+        f.seek(start)
+        consumed = scan_stream(f, partial, final=final,
+                               limit=None if end is None else end - start)
+        span.set(bytes=consumed)
+    return consumed, partial
+
+def finish_entry(plan, consumed, partial):
+    counts = plan["counts"]
+    for key in CATEGORIES:
+        counts[key] += partial.counts[key]
+    offset = plan["offset"] + consumed
+    head_len = min(HEAD_BYTES, offset)
+    st = plan["st"]
+    return {
+        "inode": st.st_ino,
+        "dev": st.st_dev,
+        "gz": plan["gz"],
+        "raw_size": st.st_size,
+        "raw_mtime": st.st_mtime,
+        "offset": offset,
+        "head_len": head_len,
+        "head_sha": head_signature(plan["path"], head_len) if head_len else None,
+        "counts": counts,
+    }
+
+def scan_file(path, entry):
+    """Scan only the bytes of ``path`` not covered by ``entry``.
+
+    Returns the new state entry and a Partial holding just the new events.
+    """
+    plan = plan_file(path, entry)
+    if plan is None:
+        return entry, Partial()
+    consumed, partial = scan_range(path, plan["offset"], final=plan["gz"])
+    return finish_entry(plan, consumed, partial), partial
+
+def merge_partials(partials):
+    """Combine Partials from any number of shards, files or hosts."""
+    merged = Partial()
+    for partial in partials:
+        merged.merge(partial)
+    return merged
+
+def scan_parallel(plans, workers, chunk_bytes=CHUNK_BYTES):
+    """Scan planned files across a process pool.
+
+    Plain files larger than ``chunk_bytes`` are split at newline boundaries;
+    compressed files are one unit each. Returns {path: (consumed, Partial)};
+    like the serial scan, a file that fails to read is reported and left out.
+    """
+    units = []
+    for plan in plans:
+        path = plan["path"]
+        if plan["gz"]:
+            units.append((path, plan["offset"], None, True))
+            continue
+        try:
+            ranges = split_ranges(path, plan["offset"], plan["st"].st_size, chunk_bytes)
+        except Exception as e:
+            print(f"[!] Error reading {path}: {e}")
+            continue
+        for start, end in ranges:
+            units.append((path, start, end, False))
+
+    # Only --workers > 1 gets here; single-process runs skip the pool import
+    from concurrent.futures import ProcessPoolExecutor
+
+    results, failed = {}, set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(unit[0], pool.submit(scan_range, *unit)) for unit in units]
+        for path, future in futures:
+            try:
+                consumed, partial = future.result()
+            except Exception as e:
+                # Drop the whole file; a partial result would advance its offset past the gap
+                if path not in failed:
+                    print(f"[!] Error reading {path}: {e}")
+                    failed.add(path)
+                    results.pop(path, None)
+                continue
+            if path in failed:
+                continue
+            total, merged = results.get(path, (0, Partial()))
+            results[path] = (total + consumed, merged.merge(partial))
+    return results
+
+def analyze_system_logs(log_dir="logs", index_path=None, full=False, workers=1, extra_dirs=()):
     print(f"[*] Initializing NanoClaw Self-Analysis Protocol at {datetime.now()}")
     if not os.path.exists(log_dir):
         print(f"[!] Log directory '{log_dir}' not found. Creating empty summary.")
         os.makedirs(log_dir, exist_ok=True)
-    
-    log_files = glob.glob(os.path.join(log_dir, "*.log"))
-    
-    summary = {
-        "total_events": 0,
-        "errors": 0,
-        "warnings": 0,
-        "task_completions": 0
-    }
 
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                content = f.read()
-                summary["total_events"] += len(re.findall(r"INFO", content))
-                summary["errors"] += len(re.findall(r"ERROR", content))
-                summary["warnings"] += len(re.findall(r"WARN", content))
-                summary["task_completions"] += len(re.findall(r"completed", content))
-        except Exception as e:
-            print(f"[!] Error reading {log_file}: {e}")
+    index = LogIndex(index_path or os.path.join(log_dir, ".log_index.db"))
+    if full:
+        index.reset()
+    previous = index.load_files()
+    current, claimed, plans = {}, set(), []
+
+    log_files = list_log_files(log_dir)
+    for extra in extra_dirs:
+        log_files.extend(list_log_files(extra))
+
+    with tracing.span("logs.plan", files=len(log_files)):
+        for log_file in log_files:
+            try:
+                st = os.stat(log_file)
+                old_path = find_previous(log_file, st, previous, claimed)
+                if old_path:
+                    claimed.add(old_path)
+                plan = plan_file(log_file, previous.get(old_path))
+                if plan is None:
+                    current[log_file] = previous[old_path]
+                else:
+                    plan["previous"] = previous.get(old_path)
+                    plans.append(plan)
+            except Exception as e:
+                print(f"[!] Error reading {log_file}: {e}")
+
+    with tracing.span("logs.scan", files=len(plans), workers=workers):
+        if workers > 1 and plans:
+            results = scan_parallel(plans, workers)
+        else:
+            results = {}
+            for plan in plans:
+                try:
+                    results[plan["path"]] = scan_range(plan["path"], plan["offset"], final=plan["gz"])
+                except Exception as e:
+                    print(f"[!] Error reading {plan['path']}: {e}")
+
+    with tracing.span("logs.merge"):
+        for plan in plans:
+            if plan["path"] in results:
+                current[plan["path"]] = finish_entry(plan, *results[plan["path"]])
+            elif plan["previous"]:
+                # Unreadable this run: keep its offset so the next run resumes, not rescans
+                current[plan["path"]] = plan["previous"]
+        new_events = merge_partials(partial for _, partial in results.values())
+
+    summary = empty_counts()
+    for entry in current.values():
+        for key in CATEGORIES:
+            summary[key] += entry["counts"][key]
+    with tracing.span("logs.commit", files=len(current)):
+        index.commit(current, new_events)
+    index.close()
 
     print(f"\n[📊 TACTICAL SUMMARY]")
     print(f">> Total Events: {summary['total_events']}")
     print(f">> Critical Errors: {summary['errors']}")
     print(f">> Warnings: {summary['warnings']}")
     print(f">> Task Completions: {summary['task_completions']}")
+    return summary
+
+def run_query(index_path, query, days=7, percentile=95, name=None):
+    index = LogIndex(index_path)
+    if query == "errors-per-hour":
+        for hour, count in index.errors_per_hour(days):
+            print(f"{datetime.fromtimestamp(hour * 3600):%Y-%m-%d %H:00}  {count}")
+    elif query == "top-errors":
+        for sample, count in index.top_errors(days):
+            print(f"{count:>8}  {sample}")
+    elif query == "latency":
+        value = index.latency_percentile(percentile, days, name)
+        print(f"p{percentile:g} duration: {'n/a' if value is None else f'{value:,.0f} ms'}")
+    index.close()
 
 if __name__ == "__main__":
-    analyze_system_logs()
+    parser = argparse.ArgumentParser(description="NanoClaw log analyzer")
+    parser.add_argument("log_dir", nargs="?", default="logs")
+    parser.add_argument("--also", nargs="*", default=[], metavar="DIR",
+                        help="more log directories (globs allowed), e.g. 'groups/*/logs'")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for scanning")
+    parser.add_argument("--index", help="index database (default: <log_dir>/.log_index.db)")
+    parser.add_argument("--full", action="store_true", help="drop the index and rescan everything")
+    parser.add_argument("--query", choices=["errors-per-hour", "top-errors", "latency"],
+                        help="answer from the index without scanning logs")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--name", help="restrict latency to one log message, e.g. 'Container completed'")
+    args = parser.parse_args()
+
+    index_path = args.index or os.path.join(args.log_dir, ".log_index.db")
+    with tracing.run("log_analyzer", query=args.query, workers=args.workers):
+        if args.query:
+            run_query(index_path, args.query, days=args.days, percentile=args.percentile, name=args.name)
+        else:
+            extra_dirs = sorted({d for pattern in args.also for d in glob.glob(pattern) if os.path.isdir(d)})
+            analyze_system_logs(args.log_dir, index_path=index_path, full=args.full,
+                                workers=args.workers, extra_dirs=extra_dirs)
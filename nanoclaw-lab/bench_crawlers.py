@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+"""Offline benchmark of the crawlers against a local replay server.
+
+A ThreadingHTTPServer on 127.0.0.1 stands in for DuckDuckGo, Yahoo News and
+the World Bank API. It serves recorded responses from ``fixtures/`` (the
+HttpCache fixture format: url/status/headers/body or body_file; export
+them with ``HttpCache.export_fixture``). URLs without a fixture get a
+synthetic page of realistic size, so the suite also runs with no fixtures.
+
+Each crawler runs in its own subprocess with its URLs pointed at the
+server, a throwaway output directory and HTTP cache, and no rate limits
+for the local host. Reported per crawler:
+
+    wall_ms          median end-to-end run time over --repeat runs
+    parse_ms_page    mean time in the per-page hook (parse_ddg/parse_yahoo,
+                     parse_results, WorldBankStore.upsert for gdp)
+    peak_rss_mb      peak resident set of the worker process
+    alloc_peak_kb    tracemalloc peak during one extra traced run
+
+Results are compared with a JSON baseline; metrics worse than the baseline
+by more than --threshold are flagged and the exit status is 1.
+
+    python3 nanoclaw-lab/bench_crawlers.py --save-baseline
+    python3 nanoclaw-lab/bench_crawlers.py --repeat 5 --threshold 0.15
+"""
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import tracing
+from bench_extract import FILLER
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, "fixtures")
+BASELINE_PATH = "data/bench_crawlers_baseline.json"
+CRAWLERS = ("wc2026_scraper", "wc2026_infra_crawler", "gdp_crawler")
+# Lower is better for all of these
+METRICS = ("wall_ms", "parse_ms_page", "peak_rss_mb", "alloc_peak_kb")
+THRESHOLD = 0.2
+
+RESULTS_PER_PAGE = 30
+# Synthetic DDG answers these queries with its 202 anomaly page, like a
+# rate-limited DDG does, so the scraper's Yahoo fallback is exercised too
+DDG_BLOCKED = ("schedule",)
+GDP_COUNTRIES = ["CHN", "USA", "JPN", "DEU", "IND", "GBR", "FRA", "BRA", "ITA", "CAN",
+                 "KOR", "RUS", "AUS", "ESP", "MEX", "IDN", "NLD", "SAU", "TUR", "CHE"]
+GDP_INDICATORS = ["NY.GDP.MKTP.CD", "NY.GDP.PCAP.CD", "SP.POP.TOTL"]
+WB_YEARS = range(1960, 2025)
+
+
+def _seed(text):
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def ddg_page(query, results=RESULTS_PER_PAGE):
+    slug = _seed(query)
+    items = "".join(
+        f'<div class="result results_links"><div class="links_main result__body">'
+        f'<h2 class="result__title"><a class="result__a" href="https://example.com/{slug}/{i}">{query} story {i}</a></h2>'
+        f'<a class="result__snippet" href="https://example.com/{slug}/{i}">Snippet <b>{i}</b> about {query}.</a>'
+        f'</div></div>' for i in range(results))
+    head = "<html><head>" + "<script>var x = 1;</script>" * 50 + "</head><body>"
+    return f'{head}<div id="links" class="results">{items}</div>{FILLER}</body></html>'
+
+
+def yahoo_page(query, results=RESULTS_PER_PAGE):
+    slug = _seed(query)
+    items = "".join(
+        f'<li><div class="NewsArticle"><h4 class="s-title"><a href="https://news.example/{slug}/{i}">{query} headline {i}</a></h4>'
+        f'<p class="s-desc">Description {i}</p><span class="s-source">Source {i % 5}</span></div></li>'
+        for i in range(results))
+    head = "<html><head>" + "<script>var x = 1;</script>" * 50 + "</head><body>"
+    return f"{head}<ol>{items}</ol>{FILLER}</body></html>"
+
+
+def worldbank_page(path, params):
+    """World Bank v2 JSON for /country/<a;b>/indicator/<id>, paginated like the real API."""
+    parts = path.strip("/").split("/")
+    countries, indicator = parts[1].split(";"), parts[3]
+    per_page = int(params.get("per_page", ["50"])[0])
+    page = int(params.get("page", ["1"])[0])
+    entries = [{
+        "indicator": {"id": indicator, "value": f"Indicator {indicator}"},
+        "country": {"id": code[:2], "value": f"Country {code}"},
+        "countryiso3code": code,
+        "date": str(year),
+        "value": float(_seed(f"{code}{indicator}{year}") % 10 ** 9) if year % 7 else None,
+        "unit": "", "obs_status": "", "decimal": 0,
+    } for code in countries for year in reversed(WB_YEARS)]
+    pages = max(1, -(-len(entries) // per_page))
+    meta = {"page": page, "pages": pages, "per_page": per_page, "total": len(entries)}
+    return [meta, entries[(page - 1) * per_page:page * per_page] or None]
+
+
+def load_fixtures(fixture_dir):
+    """{(host, path, query): (status, headers, body bytes)} from HttpCache fixture files."""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(fixture_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        if "body_file" in fixture:
+            with open(os.path.join(fixture_dir, fixture["body_file"]), "rb") as f:
+                body = f.read()
+        else:
+            body = fixture["body"].encode("utf-8")
+        url = urlsplit(fixture["url"])
+        fixtures[(url.hostname, url.path, url.query)] = (fixture.get("status", 200), fixture.get("headers", {}), body)
+    return fixtures
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves ``/<host>/<path>?<query>``: the fixture if recorded, else a synthetic response."""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        host, _, path = url.path.lstrip("/").partition("/")
+        path = "/" + path
+        server = self.server
+        with server.lock:
+            server.hits += 1
+        response = server.fixtures.get((host, path, url.query))
+        if response is None and server.synthetic:
+            response = self.synthetic(host, path, parse_qs(url.query))
+        if response is None:
+            response = (404, {"Content-Type": "text/plain"}, b"no fixture")
+            with server.lock:
+                server.misses += 1
+        status, headers, body = response
+        if server.latency:
+            time.sleep(server.latency)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def synthetic(self, host, path, params):
+        html = {"Content-Type": "text/html; charset=utf-8"}
+        query = params.get("q", params.get("p", [""]))[0]
+        if host == "duckduckgo.com":
+            return 200, html, b"<html><body>home</body></html>"
+        if host == "html.duckduckgo.com":
+            if any(word in query.lower() for word in DDG_BLOCKED):
+                return 202, html, b"<html><body>anomaly</body></html>"
+            return 200, html, ddg_page(query).encode("utf-8")
+        if host == "news.search.yahoo.com":
+            return 200, html, yahoo_page(query).encode("utf-8")
+        if host == "api.worldbank.org" and "/indicator/" in path:
+            body = json.dumps(worldbank_page(path[len("/v2"):], params)).encode("utf-8")
+            return 200, {"Content-Type": "application/json;charset=utf-8"}, body
+        return None
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(fixtures, synthetic=True, latency=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+    server.daemon_threads = True
+    server.fixtures, server.synthetic, server.latency = fixtures, synthetic, latency
+    server.lock, server.hits, server.misses = threading.Lock(), 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---- worker side: runs inside the per-crawler subprocess ----
+
+class HookTimer:
+    """Wraps a bound method, accumulating call count and time."""
+
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.calls += 1
+
+
+def _run_scraper(base, workdir):
+    from http_cache import HttpCache
+    from wc2026_scraper import WorldCupScraper
+
+    scraper = WorldCupScraper(output_dir=os.path.join(workdir, "wc2026"),
+                              cache=HttpCache(os.path.join(workdir, "http_cache.db")))
+    scraper.DDG_HOME = f"{base}/duckduckgo.com/"
+    scraper.DDG_URL = f"{base}/html.duckduckgo.com/html/?q={{q}}"
+    scraper.YAHOO_URL = f"{base}/news.search.yahoo.com/search?p={{q}}"
+    hooks = [HookTimer(scraper.parse_ddg), HookTimer(scraper.parse_yahoo)]
+    scraper.parse_ddg, scraper.parse_yahoo = hooks
+    scraper.run()
+    return hooks
+
+
+def _run_infra(base, workdir):
+    from http_cache import HttpCache
+    from wc2026_infra_crawler import InfraCrawler
+
+    crawler = InfraCrawler(output_dir=os.path.join(workdir, "wc2026"), freshness_hours=0,
+                           cache=HttpCache(os.path.join(workdir, "http_cache.db")))
+    crawler.DDG_URL = f"{base}/html.duckduckgo.com/html/?q={{q}}"
+    hook = crawler.parse_results = HookTimer(crawler.parse_results)
+    crawler.run()
+    return [hook]
+
+
+def _run_gdp(base, workdir):
+    import gdp_crawler
+    from http_cache import HttpCache
+    from worldbank_store import WorldBankStore
+
+    gdp_crawler.WB_API = f"{base}/api.worldbank.org/v2"
+    store = WorldBankStore(os.path.join(workdir, "worldbank.db"))
+    hook = store.upsert = HookTimer(store.upsert)
+    gdp_crawler.fetch_batch(GDP_COUNTRIES, GDP_INDICATORS, store,
+                            cache=HttpCache(os.path.join(workdir, "http_cache.db")))
+    gdp_crawler.generate_store_report(store, GDP_COUNTRIES, GDP_INDICATORS)
+    store.close()
+    return [hook]
+
+
+RUNNERS = {"wc2026_scraper": _run_scraper, "wc2026_infra_crawler": _run_infra, "gdp_crawler": _run_gdp}
+
+
+def _one_run(name, base):
+    """One isolated run: fresh output dir and cache, crawler output discarded."""
+    with tempfile.TemporaryDirectory(prefix="bench-crawl-") as workdir, \
+            contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        with tracing.run(f"bench.{name}"):
+            hooks = RUNNERS[name](base, workdir)
+        wall = time.perf_counter() - started
+    calls = sum(h.calls for h in hooks)
+    return wall, sum(h.seconds for h in hooks), calls
+
+
+def worker(name, base, repeat):
+    import fetch_engine
+
+    # Politeness limits are for real hosts; they would dominate the timings here
+    fetch_engine.HOST_RATES["127.0.0.1"] = (1e6, 1e6)
+
+    _one_run(name, base)  # warm imports and the page cache
+    runs = [_one_run(name, base) for _ in range(repeat)]
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+    tracemalloc.start()
+    _one_run(name, base)
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pages = runs[0][2]
+    return {
+        "wall_ms": statistics.median(r[0] for r in runs) * 1000,
+        "wall_ms_min": min(r[0] for r in runs) * 1000,
+        "parse_ms_page": statistics.median(r[1] / max(r[2], 1) for r in runs) * 1000,
+        "pages": pages,
+        "peak_rss_mb": peak_rss,
+        "alloc_peak_kb": alloc_peak / 1024,
+    }
+
+
+# ---- parent side ----
+
+def run_suite(crawlers, repeat, fixture_dir=FIXTURE_DIR, synthetic=True, latency=0.0):
+    fixtures = load_fixtures(fixture_dir) if os.path.isdir(fixture_dir) else {}
+    server = start_server(fixtures, synthetic, latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    results, failed = {}, {}
+    try:
+        for name in crawlers:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", name,
+                                   "--base", base, "--repeat", str(repeat)],
+                                  capture_output=True, text=True, cwd=HERE)
+            if proc.returncode != 0:
+                print(f"❌ {name} failed:\n{proc.stderr[-2000:]}")
+                failed[name] = proc.stderr[-2000:]
+                continue
+            results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+    finally:
+        server.shutdown()
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "cpus": os.cpu_count(), "fixtures": len(fixtures), "synthetic": synthetic,
+                        "latency_ms": latency * 1000, "repeat": repeat, "selected": list(crawlers)},
+        "requests": server.hits,
+        "unmatched": server.misses,
+        "crawlers": results,
+        "failed": failed,
+    }
+
+
+def compare(report, baseline, threshold=THRESHOLD):
+    """[(crawler, metric, baseline, current, change)] for metrics worse than ``threshold``.
+
+    A selected crawler that has a baseline but no result (it failed) is
+    reported with metric ``"missing"`` and None for the numbers.
+    """
+    regressions = []
+    selected = report["environment"].get("selected", list(report["crawlers"]))
+    for name in baseline.get("crawlers", {}):
+        if name in selected and name not in report["crawlers"]:
+            regressions.append((name, "missing", None, None, None))
+    for name, current in report["crawlers"].items():
+        before = baseline.get("crawlers", {}).get(name)
+        if not before:
+            continue
+        for metric in METRICS:
+            if before.get(metric) and metric in current:
+                change = current[metric] / before[metric] - 1
+                if change > threshold:
+                    regressions.append((name, metric, before[metric], current[metric], change))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    env = report["environment"]
+    print(f"🏁 {len(report['crawlers'])} crawlers, {env['repeat']} runs each, {report['requests']} requests "
+          f"({env['fixtures']} fixtures{', synthetic fallback' if env['synthetic'] else ''}, "
+          f"{report['unmatched']} unmatched)")
+    print(f"{'crawler':<22} {'wall ms':>9} {'parse ms/pg':>12} {'pages':>6} {'RSS MB':>8} {'alloc KB':>10}")
+    for name, m in report["crawlers"].items():
+        line = (f"{name:<22} {m['wall_ms']:>9.1f} {m['parse_ms_page']:>12.2f} {m['pages']:>6} "
+                f"{m['peak_rss_mb']:>8.1f} {m['alloc_peak_kb']:>10.0f}")
+        before = (baseline or {}).get("crawlers", {}).get(name)
+        if before and before.get("wall_ms"):
+            line += f"   wall {m['wall_ms'] / before['wall_ms'] - 1:+.0%} vs baseline"
+        print(line)
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline crawler benchmark against a local replay server")
+    parser.add_argument("--crawler", nargs="+", choices=CRAWLERS, default=list(CRAWLERS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per crawler")
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of recorded HttpCache fixtures")
+    parser.add_argument("--no-synthetic", action="store_true", help="404 for URLs without a fixture")
+    parser.add_argument("--latency", type=float, default=0, help="simulated server latency in ms")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="flag metrics this much worse (0.2 = 20%%)")
+    parser.add_argument("--json", help="also write this run's results here")
+    parser.add_argument("--worker", choices=CRAWLERS, help=argparse.SUPPRESS)
+    parser.add_argument("--base", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.base, args.repeat)))
+        sys.exit(0)
+
+    report = run_suite(args.crawler, args.repeat, args.fixtures, not args.no_synthetic, args.latency / 1000)
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    print_report(report, baseline)
+    if args.json:
+        save_json(args.json, report)
+
+    if args.save_baseline and report["failed"]:
+        # A baseline without the failed crawlers would stop them being compared at all
+        print("⚠️ Baseline not saved: some crawlers failed")
+    elif args.save_baseline:
+        save_json(args.baseline, report)
+        print(f"💾 Baseline saved: {args.baseline}")
+    elif baseline is None:
+        print(f"ℹ️ No baseline at {args.baseline}; run with --save-baseline to create one")
+    else:
+        if baseline.get("environment", {}).get("machine") != report["environment"]["machine"]:
+            print("⚠️ Baseline was recorded on a different machine type")
+        regressions = compare(report, baseline, args.threshold)
+        for name, metric, before, current, change in regressions:
+            if metric == "missing":
+                print(f"🐢 {name}: in the baseline but produced no result")
+            else:
+                print(f"🐢 {name} {metric}: {before:.1f} -> {current:.1f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        if not report["failed"]:
+            print(f"✅ No regressions beyond {args.threshold:.0%}")
+    if report["failed"]:
+        print(f"❌ {len(report['failed'])} crawler(s) failed: {', '.join(report['failed'])}")
+        sys.exit(1)
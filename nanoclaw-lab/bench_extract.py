@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the result extraction backends on saved search pages.
+
+Pages are ``*.html`` files or HttpCache fixtures (``*.json`` with ``body`` or
+``body_file``); files with "yahoo" in the name use the Yahoo profile. With
+no pages, synthetic DDG/Yahoo pages of realistic size are generated.
+
+    python3 nanoclaw-lab/bench_extract.py data/pages/ --repeat 50
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from result_extract import DDG_RESULTS, YAHOO_RESULTS, available_backends, get_extractor
+
+FILLER = "<div class='nav'>" + "<a href='/x'>link</a><span>footer text</span>" * 400 + "</div>"
+
+
+def synthetic_pages(results=30):
+    ddg = "".join(
+        f'<div class="result results_links"><div class="links_main result__body">'
+        f'<h2 class="result__title"><a class="result__a" href="https://example.com/{i}">World Cup 2026 story {i}</a></h2>'
+        f'<a class="result__snippet" href="https://example.com/{i}">Snippet <b>{i}</b> about stadiums and tickets.</a>'
+        f'</div></div>' for i in range(results))
+    yahoo = "".join(
+        f'<li><div class="NewsArticle"><h4 class="s-title"><a href="https://news.example/{i}">Headline {i}</a></h4>'
+        f'<p class="s-desc">Description {i}</p><span class="s-source">Source {i % 5}</span></div></li>'
+        for i in range(results))
+    head = "<html><head>" + "<script>var x = 1;</script>" * 50 + "</head><body>"
+    return [
+        ("synthetic-ddg", DDG_RESULTS, f'{head}<div id="links" class="results">{ddg}</div>{FILLER}</body></html>'),
+        ("synthetic-yahoo", YAHOO_RESULTS, f"{head}<ol>{yahoo}</ol>{FILLER}</body></html>"),
+    ]
+
+
+def load_page(path):
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        if "body_file" in fixture:
+            with open(os.path.join(os.path.dirname(path), fixture["body_file"]), "r", encoding="utf-8") as f:
+                return f.read()
+        return fixture.get("body", "")
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def collect_pages(paths):
+    pages = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.html")) + glob.glob(os.path.join(path, "*.json"))) \
+            if os.path.isdir(path) else [path]
+        for name in files:
+            profile = YAHOO_RESULTS if "yahoo" in os.path.basename(name).lower() else DDG_RESULTS
+            pages.append((os.path.basename(name), profile, load_page(name)))
+    return pages
+
+
+def bench(pages, repeat):
+    backends = available_backends()
+    print(f"{'page':<28} {'KB':>6} " + " ".join(f"{b + ' ms':>10}" for b in backends) + "  results")
+    totals = dict.fromkeys(backends, 0.0)
+    for name, profile, html in pages:
+        timings, counts = {}, {}
+        for backend in backends:
+            extractor = get_extractor(profile, backend)
+            counts[backend] = len(extractor.extract(html))
+            started = time.perf_counter()
+            for _ in range(repeat):
+                extractor.extract(html)
+            timings[backend] = (time.perf_counter() - started) / repeat * 1000
+            totals[backend] += timings[backend]
+        count_str = "/".join(str(counts[b]) for b in backends)
+        print(f"{name[:28]:<28} {len(html) / 1024:>6.1f} "
+              + " ".join(f"{timings[b]:>10.2f}" for b in backends) + f"  {count_str}")
+
+    if "bs4" in totals and totals["bs4"]:
+        print()
+        for backend in backends:
+            print(f"⚡ {backend:<7} {totals['bs4'] / totals[backend]:>6.1f}x vs bs4")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark search result extraction backends")
+    parser.add_argument("pages", nargs="*", help="HTML files, HttpCache fixtures, or directories of them")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--results", type=int, default=30, help="results per synthetic page")
+    args = parser.parse_args()
+
+    pages = collect_pages(args.pages) if args.pages else synthetic_pages(args.results)
+    if not pages:
+        raise SystemExit("No pages found")
+    bench(pages, args.repeat)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Cold-start budget for the ``nanoclaw-lab`` commands.
+
+Each command's script is loaded the way the interpreter ``cli.py`` execs
+into loads it (the script's module level, but not its ``__main__`` block)
+in a fresh interpreter, ``--runs`` times. The median must stay within
+BUDGET_MS, so a new eager ``import pandas`` at the top of a script fails
+here instead of quietly slowing every scheduled task. Interpreter start-up
+itself is not counted; it is the same for every command.
+
+    python3 nanoclaw-lab/bench_startup.py              # exit 1 when over budget
+    python3 nanoclaw-lab/bench_startup.py --only gdp charts --runs 9
+    python3 nanoclaw-lab/bench_startup.py --scale 2    # slower host
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from cli import COMMANDS, HERE, ROOT
+
+# Milliseconds of import work per command. The crawlers need requests, numpy
+# (near-duplicate index) and lxml on every run, so they get more room than
+# the commands whose heavy dependencies load only when there is work to do.
+BUDGET_MS = {
+    "gdp": 60,
+    "wc-news": 500,
+    "infra": 500,
+    "logs": 60,
+    "charts": 40,
+    "syscheck": 60,
+}
+MARKER = "--nanoclaw-startup--"
+PROBE = f"""
+import sys, time
+started = time.perf_counter()
+print({MARKER!r}, file=sys.stderr, flush=True)
+sys.path.insert(0, {HERE!r})
+import os, runpy, cli
+path = cli.script_path(sys.argv[1])
+sys.path[0] = os.path.dirname(path)
+runpy.run_path(path, run_name="__startup_probe__")
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def probe(command, importtime=False):
+    """(load ms, stderr) for one cold load of ``command``."""
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE, command]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{command} failed to load:\n{proc.stderr[-2000:]}")
+    return float(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def heaviest_imports(stderr, top=5):
+    """Top-level imports triggered by the command, by cumulative microseconds."""
+    rows = []
+    lines = stderr.splitlines()
+    for line in lines[lines.index(MARKER) + 1 if MARKER in lines else 0:]:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below their parent
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def measure(commands, runs=5, scale=1.0):
+    results = {}
+    for name in commands:
+        samples = [probe(name)[0] for _ in range(runs)]
+        budget = BUDGET_MS[name] * scale
+        median = statistics.median(samples)
+        results[name] = {"ms": round(median, 1), "min_ms": round(min(samples), 1),
+                         "budget_ms": budget, "ok": median <= budget}
+        if median > budget:
+            results[name]["heaviest"] = [{"module": module, "ms": round(us / 1000, 1)}
+                                         for us, module in heaviest_imports(probe(name, importtime=True)[1])]
+    return results
+
+
+def print_results(results):
+    print(f"{'command':<10} {'median ms':>10} {'min ms':>8} {'budget':>8}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['ms']:>10.1f} {r['min_ms']:>8.1f} {r['budget_ms']:>8.0f}  {'✅' if r['ok'] else '❌ over budget'}")
+        for row in r.get("heaviest", []):
+            print(f"{'':<12}{row['ms']:>8.1f} ms  import {row['module']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check nanoclaw-lab command cold-start times against a budget")
+    parser.add_argument("--only", nargs="+", choices=list(COMMANDS), metavar="COMMAND")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per command (median is compared)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. 2 on a slow host")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = measure(args.only or list(COMMANDS), args.runs, args.scale)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_results(results)
+    sys.exit(0 if all(r["ok"] for r in results.values()) else 1)
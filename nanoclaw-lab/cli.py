@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""One entry point for the lab scripts: ``nanoclaw-lab <command> [args]``.
+
+The chosen command's script replaces this process (``os.execv``), so it
+runs exactly as if it had been started with ``python3 <script>``: same argv
+handling, same exit codes, same relative data/ paths, and it is the real
+``__main__``, which spawn-based process pools need to unpickle its
+functions. Listing the commands loads nothing but this file, so scheduled
+task prompts can call one command without paying for every dependency of
+every script.
+
+    nanoclaw-lab gdp --batch CHN,USA,JPN
+    nanoclaw-lab wc-news
+    nanoclaw-lab logs --query top-errors
+    nanoclaw-lab syscheck --json
+
+``bench_startup.py`` keeps each command's cold start under a budget.
+"""
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# command -> (script relative to the repo root, description)
+COMMANDS = {
+    "gdp": ("nanoclaw-lab/gdp_crawler.py", "World Bank GDP / indicator reports"),
+    "wc-news": ("nanoclaw-lab/wc2026_scraper.py", "World Cup 2026 news crawl into the archive"),
+    "infra": ("nanoclaw-lab/wc2026_infra_crawler.py", "World Cup 2026 stadium infrastructure crawl"),
+    "logs": ("log_analyzer.py", "incremental log analysis and index queries"),
+    "charts": ("charts.py", "render JSON chart specs"),
+    "syscheck": ("nanoclaw-lab/sys_check.py", "host diagnostics"),
+}
+
+
+def script_path(command):
+    return os.path.join(ROOT, COMMANDS[command][0])
+
+
+def print_usage(out=sys.stdout):
+    print("usage: nanoclaw-lab <command> [args...]\n\ncommands:", file=out)
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<10} {description}", file=out)
+    print("\nRun 'nanoclaw-lab <command> --help' for a command's options.", file=out)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print_usage()
+        return 0
+    command = argv[0]
+    if command not in COMMANDS:
+        print(f"❌ Unknown command: {command}\n", file=sys.stderr)
+        print_usage(sys.stderr)
+        return 2
+
+    path = script_path(command)
+    # Not runpy: the script would not be __main__ in a spawned pool worker
+    os.execv(sys.executable, [sys.executable, path] + argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Append-only JSONL checkpoint for resumable crawls.
+
+Every finished query is written as one line as soon as it is parsed, so a
+crash mid-run keeps everything collected so far. On restart, queries that
+finished within the freshness window are skipped and their results reused.
+"""
+import datetime
+import json
+import os
+
+
+class CrawlCheckpoint:
+    def __init__(self, path, freshness_hours=12):
+        self.path = path
+        self.freshness = datetime.timedelta(hours=freshness_hours)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def load(self):
+        """Return {query: record} for queries finished within the window.
+
+        The newest record wins; a torn last line from a crash is ignored.
+        """
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        cutoff = datetime.datetime.now() - self.freshness
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    finished = datetime.datetime.fromisoformat(record["finished_at"])
+                except (ValueError, KeyError):
+                    continue
+                if finished >= cutoff:
+                    done[record["query"]] = record
+        return done
+
+    def append(self, query, results):
+        record = {
+            "query": query,
+            "finished_at": datetime.datetime.now().isoformat(),
+            "results": results,
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return record
+
+    def compact(self):
+        """Rewrite the file keeping only records still inside the window."""
+        done = self.load()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in done.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Persistent near-duplicate index for scraped articles.
+
+Each article's title + snippet becomes a 32-value MinHash signature over its
+word set, so the fraction of equal values estimates the Jaccard similarity
+of two articles. Syndicated copies of a story share most of their words.
+Signatures are split into 8 bands of 4 values (LSH); each band is hashed
+into an indexed key, and only articles sharing a band key with the new one
+are compared, so a lookup costs a few index probes however long the history.
+
+Only the signature, the link and timestamps are stored, never the article
+text, so the index stays small. Entries not seen for ``max_age_days`` are
+evicted. Inside ``deferred()`` tagging is committed only when the block
+succeeds, so articles count as seen only once they have been archived.
+
+    python3 nanoclaw-lab/dedup_index.py data/wc2026/news_dedup.db stats
+    python3 nanoclaw-lab/dedup_index.py data/wc2026/news_dedup.db evict --days 30
+"""
+import argparse
+import contextlib
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# 8x4 bands make pairs above ~0.6 Jaccard candidates; 0.8 counts as a duplicate
+THRESHOLD = 0.8
+MAX_AGE_DAYS = 30
+TOKEN = re.compile(r"\w+", re.U)
+
+NEW, DUPLICATE, UPDATED = "new", "duplicate", "updated"
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# Multiply-shift hash family; parameters derived from fixed strings so
+# signatures stay comparable across runs and NumPy versions.
+_A = np.array([_hash64(f"a{i}") | 1 for i in range(NUM_PERM)], dtype=np.uint64)
+_B = np.array([_hash64(f"b{i}") for i in range(NUM_PERM)], dtype=np.uint64)
+
+
+def minhash(text):
+    """MinHash signature (uint32 array) of the text's word set, or None if it has no words."""
+    words = set(TOKEN.findall(text.lower()))
+    if not words:
+        return None
+    hashes = np.array([_hash64(w) for w in words], dtype=np.uint64)
+    # uint64 arithmetic wraps, which is what multiply-shift hashing wants
+    values = (np.outer(_A, hashes) + _B[:, None]) >> np.uint64(32)
+    return values.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature):
+    return [_signed(_hash64(f"{band}:" + signature[band * ROWS:(band + 1) * ROWS].tobytes().hex()))
+            for band in range(BANDS)]
+
+
+def similarity(a, b):
+    return float(np.mean(a == b))
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def article_text(article):
+    return f"{article.get('title', '')} {article.get('snippet', '')}"
+
+
+class DedupIndex:
+    def __init__(self, path, threshold=THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._deferred = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                link TEXT,
+                signature BLOB,
+                content INTEGER,
+                first_seen REAL,
+                last_seen REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_link ON articles(link);
+            CREATE INDEX IF NOT EXISTS idx_articles_last_seen ON articles(last_seen);
+            CREATE TABLE IF NOT EXISTS bands (
+                key INTEGER,
+                article_id INTEGER,
+                PRIMARY KEY (key, article_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_bands_article ON bands(article_id);
+        """)
+
+    def _near(self, signature, keys):
+        placeholders = ",".join("?" * len(keys))
+        rows = self.conn.execute(
+            f"SELECT id, signature FROM articles WHERE id IN"
+            f" (SELECT article_id FROM bands WHERE key IN ({placeholders}))", keys
+        ).fetchall()
+        best = None
+        for row_id, blob in rows:
+            score = similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best[0]):
+                best = (score, row_id)
+        return best[1] if best else None
+
+    def _set_bands(self, row_id, keys):
+        self.conn.execute("DELETE FROM bands WHERE article_id = ?", (row_id,))
+        self.conn.executemany("INSERT OR IGNORE INTO bands (key, article_id) VALUES (?, ?)",
+                              [(key, row_id) for key in keys])
+
+    def _check(self, article, now):
+        text = article_text(article)
+        signature = minhash(text)
+        keys = band_keys(signature) if signature is not None else []
+        blob = signature.tobytes() if signature is not None else None
+        content = _signed(_hash64(text))
+        link = article.get("link") or None
+
+        if link:
+            row = self.conn.execute("SELECT id, content FROM articles WHERE link = ?", (link,)).fetchone()
+            if row:
+                if row[1] == content:
+                    self.conn.execute("UPDATE articles SET last_seen = ? WHERE id = ?", (now, row[0]))
+                    return DUPLICATE
+                # Same URL, edited headline or snippet
+                self.conn.execute("UPDATE articles SET signature = ?, content = ?, last_seen = ? WHERE id = ?",
+                                  (blob, content, now, row[0]))
+                self._set_bands(row[0], keys)
+                return UPDATED
+
+        if keys:
+            match = self._near(signature, keys)
+            if match is not None:
+                self.conn.execute("UPDATE articles SET last_seen = ? WHERE id = ?", (now, match))
+                return DUPLICATE
+
+        row_id = self.conn.execute(
+            "INSERT INTO articles (link, signature, content, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)",
+            (link, blob, content, now, now)).lastrowid
+        self._set_bands(row_id, keys)
+        return NEW
+
+    def tag(self, articles):
+        """Set ``status`` on each article to new, duplicate or updated,
+        checking against all earlier runs and earlier articles in this batch."""
+        now = time.time()
+        if self._deferred:
+            for article in articles:
+                article["status"] = self._check(article, now)
+            return articles
+        with self.conn:
+            for article in articles:
+                article["status"] = self._check(article, now)
+        return articles
+
+    @contextlib.contextmanager
+    def deferred(self):
+        """Keep ``tag`` writes in one open transaction until the block exits:
+        committed if it succeeds, rolled back if it raises. Wrap the archive
+        append with the tagging so a failed append leaves nothing marked seen.
+        """
+        self._deferred = True
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._deferred = False
+
+    def evict(self, max_age_days=MAX_AGE_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        with self.conn:
+            self.conn.execute("DELETE FROM bands WHERE article_id IN"
+                              " (SELECT id FROM articles WHERE last_seen < ?)", (cutoff,))
+            removed = self.conn.execute("DELETE FROM articles WHERE last_seen < ?", (cutoff,)).rowcount
+        return removed
+
+    def stats(self):
+        count, oldest = self.conn.execute("SELECT COUNT(*), MIN(first_seen) FROM articles").fetchone()
+        return {"articles": count, "oldest": oldest, "bytes": os.path.getsize(self.path)}
+
+    def close(self):
+        self.conn.close()
+
+
+def drop_duplicates(index, articles):
+    """Tag ``articles`` and return the ones that are new or updated."""
+    return [a for a in index.tag(articles) if a["status"] != DUPLICATE]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or trim an article dedup index")
+    parser.add_argument("path")
+    parser.add_argument("command", choices=["stats", "evict"])
+    parser.add_argument("--days", type=float, default=MAX_AGE_DAYS)
+    args = parser.parse_args()
+
+    index = DedupIndex(args.path)
+    if args.command == "evict":
+        removed = index.evict(args.days)
+        index.conn.execute("VACUUM")
+        print(f"🧹 Evicted {removed} articles not seen for {args.days:g} days")
+    print(index.stats())
+    index.close()
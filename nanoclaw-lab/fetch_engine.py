@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Shared asyncio fetch engine for the nanoclaw-lab crawlers.
+
+Requests go through one pooled ``requests.Session`` on a worker thread pool,
+so the crawlers keep their existing HTTP stack. Each host gets its own
+token bucket instead of a fixed ``time.sleep`` between queries, and a global
+semaphore bounds the number of requests in flight. With an ``HttpCache``
+attached, fresh cache hits return before touching the rate limiter.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import CacheMiss
+
+# requests per second, burst size
+DEFAULT_RATE = (0.5, 2)
+HOST_RATES = {
+    "duckduckgo.com": (0.5, 1),
+    "html.duckduckgo.com": (0.5, 2),
+    "news.search.yahoo.com": (0.5, 2),
+    "api.worldbank.org": (4.0, 4),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchEngine:
+    def __init__(self, session=None, max_in_flight=8, host_rates=None, timeout=15, cache=None):
+        self.session = session or requests.Session()
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.host_rates = dict(HOST_RATES)
+        if host_rates:
+            self.host_rates.update(host_rates)
+
+        # One keep-alive pool per host, large enough for every in-flight request
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_in_flight)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._buckets = {}
+        self._warmups = {}
+        self.stats = {"requests": 0, "errors": 0, "wait_s": 0.0}
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.host_rates.get(host, DEFAULT_RATE)
+            bucket = self._buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+    async def fetch(self, url, timeout=None, use_cache=True, **kwargs):
+        """GET ``url`` politely and return the response.
+
+        Network errors propagate to the caller, like ``session.get`` would.
+        Cached fetches return an ``http_cache.CachedResponse``. ``params`` are
+        folded into the URL (and so into the cache key); any other per-call
+        ``session.get`` options such as ``headers`` can change the response,
+        so those requests skip the cache.
+        """
+        timeout = timeout or self.timeout
+        if "params" in kwargs:
+            request = requests.models.PreparedRequest()
+            request.prepare_url(url, kwargs.pop("params"))
+            url = request.url
+        cached = self.cache is not None and use_cache and not kwargs
+        if cached:
+            hit = self.cache.lookup(url)
+            if hit is not None:
+                return hit
+        elif self.cache is not None and self.cache.offline:
+            raise CacheMiss(url)
+
+        host = urlsplit(url).hostname or ""
+        started = time.monotonic()
+        await self._bucket(host).acquire()
+        async with self._slots:
+            self.stats["wait_s"] += time.monotonic() - started
+            self.stats["requests"] += 1
+            loop = asyncio.get_running_loop()
+            try:
+                if cached:
+                    get = lambda: self.cache.get(self.session, url, timeout=timeout)
+                else:
+                    get = lambda: self.session.get(url, timeout=timeout, **kwargs)
+                return await loop.run_in_executor(self._executor, get)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+
+    async def warmup(self, url):
+        """Visit ``url`` once per session (e.g. to collect cookies).
+
+        Concurrent callers share the same in-flight request; failures are
+        remembered so a broken homepage is not retried on every query.
+        """
+        task = self._warmups.get(url)
+        if task is None:
+            task = self._warmups[url] = asyncio.ensure_future(self.fetch(url, timeout=10, use_cache=False))
+        try:
+            await task
+            return True
+        except Exception:
+            return False
+
+    async def fetch_all(self, urls, **kwargs):
+        """Fetch many URLs concurrently; failed fetches yield the exception."""
+        return await asyncio.gather(*(self.fetch(u, **kwargs) for u in urls), return_exceptions=True)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -1,14 +1,27 @@
-import requests
+import argparse
 import json
 import sys
 import os
 from datetime import datetime
 
-def fetch_gdp(country_code="CHN"):
+from http_cache import HttpCache
+from worldbank_store import WorldBankStore
+import tracing
+
+WB_API = "https://api.worldbank.org/v2"
+GDP_INDICATOR = "NY.GDP.MKTP.CD"
+PER_PAGE = 1000
+COUNTRIES_PER_REQUEST = 40  # keeps the semicolon-joined URL short
+
+@tracing.traced("fetch.gdp")
+def fetch_gdp(country_code="CHN", cache=None):
     """Fetch GDP data from World Bank API."""
-    url = f"https://api.worldbank.org/v2/country/{country_code}/indicator/NY.GDP.MKTP.CD?format=json"
+    import requests  # network paths only: --from-store reports never load it
+
+    url = f"{WB_API}/country/{country_code}/indicator/{GDP_INDICATOR}?format=json"
+    cache = cache if cache is not None else HttpCache()
     try:
-        response = requests.get(url, timeout=10)
+        response = cache.get(requests, url, timeout=10)
         response.raise_for_status()
         data = response.json()
         if len(data) > 1:
@@ -42,15 +55,100 @@ def generate_report(data, country_code):
     
     return "\n".join(lines)
 
-if __name__ == "__main__":
-    country = sys.argv[1] if len(sys.argv) > 1 else "CHN"
-    gdp_data = fetch_gdp(country)
-    report_content = generate_report(gdp_data, country)
-    
+def indicator_url(countries, indicator, page):
+    return f"{WB_API}/country/{';'.join(countries)}/indicator/{indicator}?format=json&per_page={PER_PAGE}&page={page}"
+
+@tracing.traced("fetch.indicator")
+async def fetch_indicator(engine, countries, indicator):
+    """Fetch every page of one indicator for a group of countries."""
+    first = await engine.fetch(indicator_url(countries, indicator, 1))
+    first.raise_for_status()
+    payload = first.json()
+    if len(payload) < 2 or payload[1] is None:
+        return []
+    entries = list(payload[1])
+    pages = int(payload[0].get("pages", 1))
+    if pages > 1:
+        responses = await engine.fetch_all([indicator_url(countries, indicator, p) for p in range(2, pages + 1)])
+        for response in responses:
+            if isinstance(response, Exception):
+                raise response
+            response.raise_for_status()
+            entries.extend(response.json()[1] or [])
+    return entries
+
+async def fetch_batch_async(countries, indicators, store, cache):
+    import asyncio
+    from fetch_engine import FetchEngine
+
+    engine = FetchEngine(cache=cache)
+    groups = [countries[i:i + COUNTRIES_PER_REQUEST] for i in range(0, len(countries), COUNTRIES_PER_REQUEST)]
+    jobs = [(group, indicator) for indicator in indicators for group in groups]
+    try:
+        results = await asyncio.gather(
+            *(fetch_indicator(engine, group, indicator) for group, indicator in jobs),
+            return_exceptions=True,
+        )
+    finally:
+        engine.close()
+
+    stored = 0
+    for (group, indicator), entries in zip(jobs, results):
+        if isinstance(entries, Exception):
+            print(f"Error fetching {indicator} for {','.join(group)}: {entries}")
+            continue
+        with tracing.span("store", indicator=indicator, entries=len(entries)):
+            stored += store.upsert(entries)
+    return stored
+
+def fetch_batch(countries, indicators, store, cache=None):
+    """Fetch all pages for every (country, indicator) pair into ``store``."""
+    import asyncio
+
+    cache = cache if cache is not None else HttpCache()
+    return asyncio.run(fetch_batch_async(countries, indicators, store, cache))
+
+@tracing.traced("report")
+def generate_store_report(store, countries, indicators, years=10):
+    """Markdown report for any subset of the store, without network access."""
+    country_names, indicator_names = store.names(countries, indicators)
+    lines = []
+    lines.append(f"# World Bank Indicator Report")
+    lines.append("")
+    lines.append(f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    for country in countries:
+        if country not in country_names:
+            lines.append("")
+            lines.append(f"## {country}")
+            lines.append("")
+            lines.append("No data in store.")
+            continue
+
+        by_year = {}
+        for indicator in indicators:
+            for year, value in store.series(country, indicator, years=years):
+                by_year.setdefault(year, {})[indicator] = value
+
+        lines.append("")
+        lines.append(f"## {country_names[country]} ({country})")
+        lines.append("")
+        lines.append("| Year | " + " | ".join(indicator_names.get(i, i) for i in indicators) + " |")
+        lines.append("|------|" + "|".join("---" for _ in indicators) + "|")
+        for year in sorted(by_year, reverse=True)[:years]:
+            cells = []
+            for indicator in indicators:
+                value = by_year[year].get(indicator)
+                cells.append(f"{value:,.0f}" if value is not None else "N/A")
+            lines.append(f"| {year} | " + " | ".join(cells) + " |")
+
+    return "\n".join(lines)
+
+def save_report(report_content, name):
     # Save to a file in data/gdp_reports
     report_dir = "data/gdp_reports"
     os.makedirs(report_dir, exist_ok=True)
-    report_path = os.path.join(report_dir, f"gdp_report_{country}_{datetime.now().strftime('%Y%m%d')}.md")
+    report_path = os.path.join(report_dir, f"{name}_{datetime.now().strftime('%Y%m%d')}.md")
     
     with open(report_path, "wb") as f:
         f.write(report_content.encode('utf-8'))
@@ -58,4 +156,42 @@ if __name__ == "__main__":
     print(f"Report generated: {report_path}")
     print("\n--- REPORT START ---\n")
     print(report_content)
-    print("\n--- REPORT END ---\n")
\ No newline at end of file
+    print("\n--- REPORT END ---\n")
+
+def split_codes(value):
+    return [code.strip().upper() for code in value.split(",") if code.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="World Bank indicator crawler")
+    parser.add_argument("country", nargs="?", default="CHN", help="single country for the classic GDP report")
+    parser.add_argument("--batch", help="comma-separated ISO3 (or ISO2) country codes, e.g. CHN,USA,JPN")
+    parser.add_argument("--indicators", default=GDP_INDICATOR, help="comma-separated indicator codes")
+    parser.add_argument("--from-store", action="store_true", help="report from the local store only, no network")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--store", default="data/worldbank.db")
+    args = parser.parse_args()
+
+    with tracing.run("gdp_crawler", batch=bool(args.batch), from_store=args.from_store):
+        if args.batch or args.from_store:
+            countries = split_codes(args.batch or args.country)
+            indicators = split_codes(args.indicators)
+            store = WorldBankStore(args.store)
+            if not args.from_store:
+                cache = HttpCache()
+                stored = fetch_batch(countries, indicators, store, cache=cache)
+                print(f"Stored {stored} observations for {len(countries)} countries x {len(indicators)} indicators")
+                print(cache.summary())
+            # The API accepts ISO2 codes too, but rows are stored under ISO3
+            countries = store.resolve(countries)
+            report_content = generate_store_report(store, countries, indicators, years=args.years)
+            store.close()
+            name = "wb_report_" + "_".join(countries[:3]) + ("_etc" if len(countries) > 3 else "")
+            save_report(report_content, name)
+            sys.exit(0)
+
+        country = args.country
+        cache = HttpCache()
+        gdp_data = fetch_gdp(country, cache=cache)
+        print(cache.summary())
+        report_content = generate_report(gdp_data, country)
+        save_report(report_content, f"gdp_report_{country}")
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""On-disk HTTP cache shared by the nanoclaw-lab crawlers.
+
+Responses live in one SQLite file. Each host has its own TTL; once an entry
+goes stale it is revalidated with If-None-Match / If-Modified-Since, so an
+unchanged World Bank series costs a 304 instead of a full download. The
+cache is LRU-evicted by total body bytes and keeps hit/miss counters for
+each run.
+
+Offline mode (``offline=True`` or NANOCLAW_HTTP_OFFLINE=1) never touches the
+network: entries are served regardless of age and unknown URLs raise
+``CacheMiss``. Together with ``load_fixtures`` this lets crawlers run
+against recorded responses.
+"""
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_TTL = 3600
+SOURCE_TTLS = {
+    "api.worldbank.org": 7 * 86400,  # indicators change about once a year
+    "html.duckduckgo.com": 6 * 3600,
+    "news.search.yahoo.com": 6 * 3600,
+}
+KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode for a URL that has no cached response."""
+
+
+class CachedResponse:
+    """The subset of ``requests.Response`` the crawlers use."""
+
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        # Loaded here rather than at import time; whoever fetched this already has requests
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        charset = "utf-8"
+        content_type = self.headers.get("content-type", "")
+        if "charset=" in content_type:
+            charset = content_type.split("charset=", 1)[1].split(";")[0].strip()
+        return self.content.decode(charset, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HttpCache:
+    def __init__(self, path="data/http_cache.db", max_bytes=200 * 1024 * 1024,
+                 ttls=None, default_ttl=DEFAULT_TTL, offline=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(SOURCE_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        if offline is None:
+            offline = os.environ.get("NANOCLAW_HTTP_OFFLINE") == "1"
+        self.offline = offline
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                size INTEGER,
+                fetched_at REAL,
+                last_access REAL,
+                fetch_ms REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+        """)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_saved": 0, "ms_saved": 0.0}
+
+    def ttl_for(self, url):
+        return self.ttls.get(urlsplit(url).hostname or "", self.default_ttl)
+
+    def _row(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, headers, body, fetched_at, fetch_ms FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _touch(self, url, fetched_at=None):
+        with self._lock:
+            if fetched_at is None:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            else:
+                self._conn.execute("UPDATE entries SET last_access = ?, fetched_at = ? WHERE url = ?",
+                                   (time.time(), fetched_at, url))
+            self._conn.commit()
+
+    def _count(self, **deltas):
+        # FetchEngine calls in from its executor threads
+        with self._lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _hit(self, url, row, counter):
+        status, headers, body, _, fetch_ms = row
+        self._count(**{counter: 1}, bytes_saved=len(body),
+                    ms_saved=(fetch_ms or 0.0) if counter == "hits" else 0.0)
+        return CachedResponse(url, status, json.loads(headers), body, from_cache=True)
+
+    def lookup(self, url, ttl=None):
+        """Return a fresh cached response without any network I/O, or None."""
+        row = self._row(url)
+        if row is None:
+            return None
+        ttl = self.ttl_for(url) if ttl is None else ttl
+        if not self.offline and time.time() - row[3] > ttl:
+            return None
+        self._touch(url)
+        return self._hit(url, row, "hits")
+
+    def get(self, session, url, timeout=15, ttl=None):
+        """GET ``url`` through the cache using ``session`` for network access."""
+        fresh = self.lookup(url, ttl=ttl)
+        if fresh is not None:
+            return fresh
+
+        row = self._row(url)
+        if self.offline:
+            self._count(misses=1)
+            raise CacheMiss(url)
+
+        conditional = {}
+        if row is not None:
+            cached_headers = json.loads(row[1])
+            if cached_headers.get("etag"):
+                conditional["If-None-Match"] = cached_headers["etag"]
+            if cached_headers.get("last-modified"):
+                conditional["If-Modified-Since"] = cached_headers["last-modified"]
+
+        started = time.monotonic()
+        response = session.get(url, headers=conditional, timeout=timeout)
+        fetch_ms = (time.monotonic() - started) * 1000
+
+        if response.status_code == 304 and row is not None:
+            self._touch(url, fetched_at=time.time())
+            return self._hit(url, row, "revalidated")
+
+        self._count(misses=1)
+        headers = {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers}
+        if response.status_code == 200:
+            self.store(url, 200, headers, response.content, fetch_ms=fetch_ms)
+        return CachedResponse(url, response.status_code, headers, response.content)
+
+    def store(self, url, status, headers, body, fetched_at=None, fetch_ms=0.0):
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM entries WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (url, status, headers, body, size, fetched_at, last_access, fetch_ms)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(headers), body, len(body), fetched_at or now, now, fetch_ms),
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM entries ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._total_bytes -= size
+            if self._total_bytes <= self.max_bytes:
+                break
+
+    def load_fixtures(self, fixture_dir):
+        """Load recorded responses (``*.json`` with url/status/headers/body).
+
+        ``body`` is the response text; large bodies can live next to the
+        JSON file and be referenced by ``body_file`` instead.
+        """
+        count = 0
+        for path in sorted(glob.glob(os.path.join(fixture_dir, "*.json"))):
+            with open(path, "r", encoding="utf-8") as f:
+                fixture = json.load(f)
+            if "body_file" in fixture:
+                with open(os.path.join(fixture_dir, fixture["body_file"]), "rb") as f:
+                    body = f.read()
+            else:
+                body = fixture["body"].encode("utf-8")
+            headers = {k.lower(): v for k, v in fixture.get("headers", {}).items()}
+            self.store(fixture["url"], fixture.get("status", 200), headers, body)
+            count += 1
+        return count
+
+    def export_fixture(self, url, path):
+        """Write the cached response for ``url`` as a fixture file."""
+        row = self._row(url)
+        if row is None:
+            raise CacheMiss(url)
+        fixture = {"url": url, "status": row[0], "headers": json.loads(row[1]),
+                   "body": row[2].decode("utf-8", errors="replace")}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+
+    def summary(self):
+        s = self.stats
+        return (f"[http-cache] hits={s['hits']} revalidated={s['revalidated']} misses={s['misses']} "
+                f"saved={s['bytes_saved'] / 1024:.0f} KiB, ~{s['ms_saved'] / 1000:.1f}s network time")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
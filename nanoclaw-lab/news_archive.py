@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Append-only archive for crawler output.
+
+Each crawl is one small transaction into ``news_archive.db`` under the
+crawler's output directory. JSON, Markdown and Excel files are views
+exported on demand for a date range; an export's filename carries a hash of
+the rows it contains, so asking again for an unchanged range returns the
+existing file instead of re-serializing it.
+
+    python3 nanoclaw-lab/news_archive.py export --kind news --days 1 --format xlsx
+    python3 nanoclaw-lab/news_archive.py import data/wc2026/news_*.json
+"""
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+
+OUTPUT_DIR = "data/wc2026"
+ARCHIVE_NAME = "news_archive.db"
+COLUMNS = ("query", "source", "title", "link", "snippet", "status")
+FORMATS = ("json", "md", "xlsx")
+TITLES = {
+    "news": "🐾 zhaosj的助手: World Cup 2026 Intelligence Report",
+    "infra": "🏟️ World Cup 2026 Infrastructure Progress",
+}
+
+
+class NewsArchive:
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.export_dir = os.path.join(output_dir, "exports")
+        os.makedirs(output_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(output_dir, ARCHIVE_NAME))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS crawls (
+                id INTEGER PRIMARY KEY,
+                kind TEXT,
+                crawled_at TEXT,
+                article_count INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                crawl_id INTEGER REFERENCES crawls(id),
+                kind TEXT,
+                crawled_at TEXT,
+                query TEXT,
+                source TEXT,
+                title TEXT,
+                link TEXT,
+                snippet TEXT,
+                status TEXT,
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_kind_time ON articles(kind, crawled_at);
+            -- legacy JSON files already backfilled, by content hash
+            CREATE TABLE IF NOT EXISTS imports (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT,
+                crawl_id INTEGER REFERENCES crawls(id),
+                imported_at TEXT
+            );
+        """)
+        self._ensure_fts()
+
+    def _ensure_fts(self):
+        """Full-text index over title/snippet/query, kept in sync by triggers.
+
+        It is an external-content table, so the text lives only in
+        ``articles``; archives created before the index existed are
+        backfilled once.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'").fetchone()
+        self.conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, snippet, query,
+                content='articles', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, snippet, query)
+                VALUES (new.id, new.title, new.snippet, new.query);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, snippet, query)
+                VALUES ('delete', old.id, old.title, old.snippet, old.query);
+            END;
+        """)
+        if not exists:
+            with self.conn:
+                self.conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+    def _insert_crawl(self, kind, articles, crawled_at):
+        crawl_id = self.conn.execute(
+            "INSERT INTO crawls (kind, crawled_at, article_count) VALUES (?, ?, ?)",
+            (kind, crawled_at, len(articles))).lastrowid
+        rows = []
+        for article in articles:
+            extra = {k: v for k, v in article.items() if k not in COLUMNS}
+            rows.append((crawl_id, kind, crawled_at, *(article.get(c) for c in COLUMNS),
+                         json.dumps(extra, ensure_ascii=False) if extra else None))
+        self.conn.executemany(
+            "INSERT INTO articles (crawl_id, kind, crawled_at, query, source, title, link, snippet, status, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return crawl_id
+
+    def append(self, kind, articles, crawled_at=None):
+        """Store one crawl's articles; returns the crawl id."""
+        crawled_at = crawled_at or datetime.datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            return self._insert_crawl(kind, articles, crawled_at)
+
+    def import_json(self, path, kind, crawled_at):
+        """Store a legacy JSON file as one crawl; returns its article count, or
+        None if a file with the same content was imported before."""
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if self.conn.execute("SELECT 1 FROM imports WHERE sha256 = ?", (digest,)).fetchone():
+            return None
+        articles = json.loads(data)
+        # The rows and the import record commit together, so a retry after a
+        # failure neither skips the file nor imports it twice
+        with self.conn:
+            crawl_id = self._insert_crawl(kind, articles, crawled_at)
+            self.conn.execute("INSERT INTO imports (sha256, path, crawl_id, imported_at) VALUES (?, ?, ?, ?)",
+                              (digest, os.path.abspath(path), crawl_id,
+                               datetime.datetime.now().isoformat(timespec="seconds")))
+        return len(articles)
+
+    def query(self, kind=None, since=None, until=None, limit=None):
+        """Articles (oldest first) crawled in [since, until); bounds are ISO dates or datetimes."""
+        where, params = [], []
+        if kind:
+            where.append("kind = ?")
+            params.append(kind)
+        if since:
+            where.append("crawled_at >= ?")
+            params.append(str(since))
+        if until:
+            where.append("crawled_at < ?")
+            params.append(str(until))
+        sql = "SELECT * FROM articles"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        if limit:
+            sql = f"SELECT * FROM ({sql} DESC LIMIT {int(limit)}) ORDER BY id"
+        articles = []
+        for row in self.conn.execute(sql, params):
+            article = {k: row[k] for k in ("id", "crawled_at", *COLUMNS) if row[k] is not None}
+            if row["extra"]:
+                article.update(json.loads(row["extra"]))
+            articles.append(article)
+        return articles
+
+    def search(self, text, kind=None, source=None, query=None, since=None, until=None, limit=20, raw=False):
+        """BM25-ranked articles matching ``text``, best first.
+
+        ``text`` is plain words (all must match) unless ``raw`` is set, in
+        which case it is passed through as an FTS5 query expression.
+        """
+        match = text if raw else " ".join('"' + w.replace('"', '""') + '"' for w in text.split())
+        where, params = ["articles_fts MATCH ?"], [match]
+        for column, value in (("a.kind", kind), ("a.source", source), ("a.query", query)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            where.append("a.crawled_at >= ?")
+            params.append(str(since))
+        if until:
+            where.append("a.crawled_at < ?")
+            params.append(str(until))
+        params.append(int(limit))
+        # Title matches count three times as much as snippet matches
+        rows = self.conn.execute(f"""
+            SELECT a.id, a.kind, a.crawled_at, a.source, a.query, a.title, a.link,
+                   snippet(articles_fts, 1, '[', ']', '…', 16) AS excerpt,
+                   bm25(articles_fts, 3.0, 1.0, 0.5) AS rank
+            FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+            WHERE {" AND ".join(where)}
+            ORDER BY rank
+            LIMIT ?
+        """, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_crawl(self, kind):
+        return self.conn.execute("SELECT * FROM crawls WHERE kind = ? ORDER BY id DESC LIMIT 1", (kind,)).fetchone()
+
+    def export(self, fmt, kind="news", since=None, until=None):
+        """Write (or reuse) an export of the selected articles; returns its path, or None if empty."""
+        articles = self.query(kind, since, until)
+        if not articles:
+            return None
+        digest = hashlib.sha256(json.dumps(articles, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        label = "_".join(str(b)[:10].replace("-", "") for b in (since, until) if b) or "all"
+        path = os.path.join(self.export_dir, f"{kind}_{label}_{digest.hexdigest()[:12]}.{fmt}")
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(self.export_dir, exist_ok=True)
+        root, ext = os.path.splitext(path)
+        tmp = f"{root}.tmp{ext}"
+        if fmt == "json":
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(articles, f, ensure_ascii=False, indent=2)
+        elif fmt == "md":
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(render_markdown(articles, TITLES.get(kind, kind)))
+        elif fmt == "xlsx":
+            import pandas as pd
+            pd.DataFrame(articles).to_excel(tmp, index=False, engine="openpyxl")
+        else:
+            raise ValueError(f"unknown export format: {fmt}")
+        os.replace(tmp, path)
+        return path
+
+    def close(self):
+        self.conn.close()
+
+
+def render_markdown(articles, title=TITLES["news"]):
+    lines = [f"# {title}\n",
+             f"**Generated at:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"]
+    for i, article in enumerate(articles, 1):
+        lines.append(f"### {i}. {article.get('title', '')}")
+        lines.append(f"- **Snippet:** {article.get('snippet', 'N/A')}")
+        lines.append(f"- **Link:** [Read More]({article.get('link', '')})\n")
+    return "\n".join(lines) + "\n"
+
+
+def day_range(days, until=None):
+    until = until or datetime.date.today() + datetime.timedelta(days=1)
+    return (until - datetime.timedelta(days=days)).isoformat(), until.isoformat()
+
+
+def import_files(archive, paths, kind):
+    """Backfill the archive from the timestamped JSON files crawlers used to write.
+
+    Returns (articles imported, files skipped because they were imported before).
+    """
+    imported = skipped = 0
+    for path in paths:
+        stamp = os.path.basename(path).rsplit("_", 2)[-2:]
+        try:
+            crawled_at = datetime.datetime.strptime("_".join(stamp)[:15], "%Y%m%d_%H%M%S").isoformat()
+        except ValueError:
+            crawled_at = datetime.datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+        count = archive.import_json(path, kind, crawled_at)
+        if count is None:
+            skipped += 1
+        else:
+            imported += count
+    return imported, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and export the crawler archive")
+    parser.add_argument("--dir", default=OUTPUT_DIR, help="crawler output directory holding the archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="export a date range")
+    exp.add_argument("--kind", default="news", choices=["news", "infra"])
+    exp.add_argument("--format", default="md", choices=FORMATS)
+    exp.add_argument("--days", type=int, default=1, help="last N days (default today)")
+    exp.add_argument("--since", help="ISO date, overrides --days")
+    exp.add_argument("--until", help="ISO date (exclusive)")
+    imp = sub.add_parser("import", help="backfill from old JSON outputs")
+    imp.add_argument("files", nargs="+")
+    imp.add_argument("--kind", default="news", choices=["news", "infra"])
+    args = parser.parse_args()
+
+    archive = NewsArchive(args.dir)
+    if args.command == "export":
+        if args.since:
+            since, until = args.since, args.until
+        else:
+            since, until = day_range(args.days, datetime.date.fromisoformat(args.until) if args.until else None)
+        path = archive.export(args.format, args.kind, since, until)
+        print(f"✅ {path}" if path else f"⚠️ No {args.kind} articles between {since} and {until}")
+    else:
+        files = [p for pattern in args.files for p in sorted(glob.glob(pattern))]
+        imported, skipped = import_files(archive, files, args.kind)
+        print(f"📥 Imported {imported} articles from {len(files) - skipped} files"
+              + (f", skipped {skipped} already imported" if skipped else ""))
+    archive.close()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Full-text search over everything the crawlers have archived.
+
+    python3 nanoclaw-lab/news_search.py "Estadio Azteca renovation" --days 30
+    python3 nanoclaw-lab/news_search.py "roof OR pitch" --raw --kind infra --json
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+from news_archive import OUTPUT_DIR, NewsArchive, day_range
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search archived news and infra results (BM25 ranked)")
+    parser.add_argument("text", help="words to search for (all must match)")
+    parser.add_argument("--dir", default=OUTPUT_DIR, help="crawler output directory holding the archive")
+    parser.add_argument("--kind", choices=["news", "infra"])
+    parser.add_argument("--source", help="e.g. DuckDuckGo, or a Yahoo outlet name")
+    parser.add_argument("--query", help="only results collected for this crawler query")
+    parser.add_argument("--days", type=int, help="only the last N days")
+    parser.add_argument("--since", help="ISO date")
+    parser.add_argument("--until", help="ISO date (exclusive)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--raw", action="store_true", help="treat text as an FTS5 query (OR, NEAR, prefix*)")
+    parser.add_argument("--json", action="store_true", help="print hits as JSON")
+    args = parser.parse_args()
+
+    since, until = args.since, args.until
+    if args.days and not since:
+        since, until = day_range(args.days)
+
+    archive = NewsArchive(args.dir)
+    started = time.perf_counter()
+    try:
+        hits = archive.search(args.text, kind=args.kind, source=args.source, query=args.query,
+                              since=since, until=until, limit=args.limit, raw=args.raw)
+    except sqlite3.OperationalError as e:
+        sys.exit(f"❌ Bad search expression: {e}")
+    elapsed = (time.perf_counter() - started) * 1000
+    archive.close()
+
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+    elif not hits:
+        print(f"🔍 No matches for {args.text!r}")
+    else:
+        print(f"🔍 {len(hits)} matches for {args.text!r} ({elapsed:.1f} ms)\n")
+        for i, hit in enumerate(hits, 1):
+            print(f"{i}. {hit['title']}")
+            print(f"   {hit['crawled_at'][:10]} · {hit['kind']} · {hit['source'] or hit['query'] or ''}")
+            if hit["excerpt"]:
+                print(f"   {hit['excerpt']}")
+            print(f"   {hit['link']}\n")
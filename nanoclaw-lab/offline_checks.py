@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+"""Offline checks for the lab scripts.
+
+Every check runs in its own temporary directory against recorded fixtures
+or a throwaway server on 127.0.0.1, so nothing touches the network or the
+real data/ directory. Failures are printed and the exit code is 1.
+
+    python3 nanoclaw-lab/offline_checks.py
+    python3 nanoclaw-lab/offline_checks.py --only fetch_engine_cache
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.append(ROOT)
+
+CHECKS = {}
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def check(func):
+    CHECKS[func.__name__] = func
+    return func
+
+
+def expect(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+@contextlib.contextmanager
+def local_server(respond):
+    """Serve GETs on 127.0.0.1 with ``respond(handler) -> (status, body)``; yields the base URL."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = respond(self)
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def write_fixture(fixture_dir, name, url, body):
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(os.path.join(fixture_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump({"url": url, "status": 200, "headers": {"content-type": "text/plain; charset=utf-8"},
+                   "body": body}, f)
+
+
+# ---- fetch engine / HTTP cache ----
+
+@check
+def fetch_engine_token_bucket():
+    from fetch_engine import TokenBucket
+
+    async def take(bucket, n):
+        started = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # A burst of 2 is free, the next 3 tokens arrive at 20/s
+    elapsed = asyncio.run(take(TokenBucket(20, 2), 5))
+    expect(0.13 <= elapsed < 1.0, f"5 tokens at 20/s with burst 2 took {elapsed:.3f}s, expected ~0.15s")
+
+
+@check
+def fetch_engine_cache(workdir):
+    from fetch_engine import FetchEngine
+    from http_cache import CacheMiss, HttpCache
+
+    seen = []
+
+    def respond(handler):
+        seen.append((handler.path, handler.headers.get("X-Check")))
+        return 200, f"live {handler.path}".encode("utf-8")
+
+    with local_server(respond) as base:
+        fixtures = os.path.join(workdir, "fixtures")
+        write_fixture(fixtures, "recorded", f"{base}/recorded", "from fixture")
+        cache = HttpCache(os.path.join(workdir, "cache.db"))
+        cache.load_fixtures(fixtures)
+
+        async def scenario():
+            engine = FetchEngine(cache=cache, host_rates={"127.0.0.1": (1000, 1000)})
+            try:
+                hit = await engine.fetch(f"{base}/recorded")
+                expect(hit.from_cache and hit.text == "from fixture", "fixture URL was not served from the cache")
+                expect(hit.headers.get("Content-Type", "").startswith("text/plain"),
+                       f"cached headers are case-sensitive: {dict(hit.headers)}")
+                expect(engine.stats["requests"] == 0, "a cache hit went through the rate limiter")
+
+                miss = await engine.fetch(f"{base}/search", params={"q": "a b"})
+                expect(not miss.from_cache and seen[-1][0] == "/search?q=a+b", f"params not sent: {seen}")
+                again = await engine.fetch(f"{base}/search", params={"q": "a b"})
+                expect(again.from_cache, "params request was not cached under its full URL")
+                other = await engine.fetch(f"{base}/search", params={"q": "c"})
+                expect(not other.from_cache, "different params were served from another query's cache entry")
+
+                live = await engine.fetch(f"{base}/recorded", headers={"X-Check": "1"})
+                expect(not getattr(live, "from_cache", False) and seen[-1] == ("/recorded", "1"),
+                       "per-call headers were dropped on a cached URL")
+            finally:
+                engine.close()
+
+        asyncio.run(scenario())
+        expect(cache.stats["hits"] == 2, f"expected 2 cache hits, got {cache.stats}")
+
+        # Counters are bumped from executor threads
+        from concurrent.futures import ThreadPoolExecutor
+        before = cache.stats["hits"]
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: cache.lookup(f"{base}/recorded"), range(2000)))
+        expect(cache.stats["hits"] - before == 2000, f"lost hit counts: {cache.stats['hits'] - before} of 2000")
+
+        cache.offline = True
+        try:
+            asyncio.run(FetchEngine(cache=cache).fetch(f"{base}/never-recorded"))
+        except CacheMiss:
+            pass
+        else:
+            raise CheckFailed("offline cache served an unknown URL")
+        cache.close()
+
+
+# ---- World Bank store ----
+
+@check
+def gdp_batch_iso2(workdir):
+    import fetch_engine
+    import gdp_crawler
+    from http_cache import HttpCache
+    from worldbank_store import WorldBankStore
+
+    iso3 = {"CN": "CHN", "US": "USA"}
+
+    def respond(handler):
+        # /v2/country/CN;US/indicator/<id>?format=json&...
+        codes = handler.path.split("/")[3].split(";")
+        entries = [{"indicator": {"id": gdp_crawler.GDP_INDICATOR, "value": "GDP"},
+                    "country": {"id": code, "value": f"Country {code}"}, "countryiso3code": iso3[code],
+                    "date": "2023", "value": 1e12} for code in codes]
+        return 200, json.dumps([{"page": 1, "pages": 1}, entries]).encode("utf-8")
+
+    fetch_engine.HOST_RATES["127.0.0.1"] = (1000, 1000)
+    with local_server(respond) as base:
+        gdp_crawler.WB_API = f"{base}/v2"
+        store = WorldBankStore(os.path.join(workdir, "wb.db"))
+        cache = HttpCache(os.path.join(workdir, "cache.db"))
+        with contextlib.redirect_stdout(None):
+            gdp_crawler.fetch_batch(["CN", "US"], [gdp_crawler.GDP_INDICATOR], store, cache=cache)
+        countries = store.resolve(["CN", "US", "JPN"])
+        expect(countries == ["CHN", "USA", "JPN"], f"ISO2 codes resolved to {countries}")
+        report = gdp_crawler.generate_store_report(store, countries[:2], [gdp_crawler.GDP_INDICATOR])
+        expect("No data" not in report and "Country CN (CHN)" in report, f"report lost ISO2 countries:\n{report}")
+        store.close()
+        cache.close()
+
+
+# ---- news crawlers ----
+
+@check
+def news_query_search(workdir):
+    import bench_crawlers
+    import fetch_engine
+    from news_archive import NewsArchive
+
+    fetch_engine.HOST_RATES["127.0.0.1"] = (1000, 1000)
+    server = bench_crawlers.start_server({})
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with contextlib.redirect_stdout(None):
+            bench_crawlers._run_scraper(base, workdir)
+            bench_crawlers._run_infra(base, workdir)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    archive = NewsArchive(os.path.join(workdir, "wc2026"))
+    try:
+        # "schedule" is blocked on the replay DDG, so that query covers the Yahoo fallback
+        for kind, query in (("news", "World Cup 2026 news"), ("news", "World Cup 2026 schedule"),
+                            ("infra", "Estadio Azteca renovation status 2026")):
+            hits = archive.search("2026", kind=kind, query=query)
+            expect(hits and all(hit["query"] == query for hit in hits),
+                   f"{kind} search with query={query!r} found {len(hits)} articles")
+    finally:
+        archive.close()
+
+
+@check
+def bench_missing_crawler():
+    import bench_crawlers
+
+    metrics = {"wall_ms": 100.0, "parse_ms_page": 1.0, "peak_rss_mb": 50.0, "alloc_peak_kb": 900.0}
+    baseline = {"crawlers": {"wc2026_scraper": metrics, "gdp_crawler": metrics}}
+    report = {"environment": {"selected": ["wc2026_scraper", "gdp_crawler"]},
+              "crawlers": {"wc2026_scraper": metrics}, "failed": {"gdp_crawler": "Traceback ..."}}
+    regressions = bench_crawlers.compare(report, baseline)
+    expect([r[:2] for r in regressions] == [("gdp_crawler", "missing")], f"regressions {regressions}")
+    # Not selected for this run: not a regression
+    report["environment"]["selected"] = ["wc2026_scraper"]
+    expect(bench_crawlers.compare(report, baseline) == [], "an unselected crawler was flagged")
+
+
+@check
+def news_failed_archive_not_deduped(workdir):
+    from http_cache import HttpCache
+    from wc2026_infra_crawler import InfraCrawler
+    from wc2026_scraper import WorldCupScraper
+
+    articles = [{"query": "q", "source": "DuckDuckGo", "title": f"Stadium story {i}",
+                 "link": f"https://example.com/{i}", "snippet": f"Snippet {i} about stadium {i * 7}"}
+                for i in range(5)]
+    cache = HttpCache(os.path.join(workdir, "http_cache.db"))
+    for crawler, save in ((WorldCupScraper(output_dir=os.path.join(workdir, "news"), cache=cache), "save_results"),
+                          (InfraCrawler(output_dir=os.path.join(workdir, "infra"), cache=cache), "save")):
+        real_append = crawler.archive.append
+
+        def failing_append(kind, rows):
+            raise OSError("disk full")
+
+        crawler.archive.append = failing_append
+        try:
+            with contextlib.redirect_stdout(None):
+                getattr(crawler, save)([dict(a) for a in articles])
+        except OSError:
+            pass
+        else:
+            raise CheckFailed(f"{save}: the injected archive failure did not surface")
+        crawler.archive.append = real_append
+        with contextlib.redirect_stdout(None):
+            getattr(crawler, save)([dict(a) for a in articles])
+        archived = crawler.archive.conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        expect(archived == len(articles), f"{save}: {archived} of {len(articles)} archived after a failed append")
+    cache.close()
+
+
+@check
+def news_import_once(workdir):
+    from news_archive import NewsArchive, import_files
+
+    path = os.path.join(workdir, "news_20240101_120000.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"title": f"Legacy story {i}", "link": f"https://example.com/{i}"} for i in range(3)], f)
+    archive = NewsArchive(os.path.join(workdir, "wc2026"))
+    try:
+        expect(import_files(archive, [path], "news") == (3, 0), "first import")
+        expect(import_files(archive, [path], "news") == (0, 1), "a repeated import was not skipped")
+        hits = len(archive.search("legacy"))
+        expect(hits == 3, f"archive search finds {hits} rows for 3 imported articles")
+    finally:
+        archive.close()
+
+
+# ---- log analyzer ----
+
+def write_pino_lines(path, count, start_ms, mode="a"):
+    with open(path, mode, encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"level": 30, "time": start_ms + i * 1000, "msg": f"tick {i}"}) + "\n")
+
+
+def analyze(log_dir, index_path, workers=1):
+    import log_analyzer
+
+    with contextlib.redirect_stdout(None):
+        summary = log_analyzer.analyze_system_logs(log_dir, index_path=index_path, workers=workers)
+    index = log_analyzer.LogIndex(index_path)
+    indexed = index.conn.execute("SELECT COALESCE(SUM(count), 0) FROM level_counts").fetchone()[0]
+    index.close()
+    return summary["total_events"], indexed
+
+
+@check
+def logs_copytruncate(workdir):
+    import shutil
+
+    log_dir = os.path.join(workdir, "logs")
+    os.makedirs(log_dir)
+    index_path = os.path.join(workdir, "index.db")
+    app_log = os.path.join(log_dir, "app.log")
+    write_pino_lines(app_log, 200, 1_700_000_000_000)
+    expect(analyze(log_dir, index_path) == (200, 200), "first scan miscounted")
+
+    # copytruncate: the copy gets a new inode, app.log keeps its inode and starts over
+    shutil.copyfile(app_log, app_log + ".1")
+    write_pino_lines(app_log, 50, 1_700_100_000_000, mode="w")
+    counted = analyze(log_dir, index_path)
+    expect(counted == (250, 250), f"after copytruncate (summary, indexed) = {counted}, expected (250, 250)")
+
+    write_pino_lines(app_log, 10, 1_700_200_000_000)
+    counted = analyze(log_dir, index_path)
+    expect(counted == (260, 260), f"append after rotation (summary, indexed) = {counted}, expected (260, 260)")
+
+
+@check
+def logs_parallel_skips_unreadable(workdir):
+    import log_analyzer
+
+    good = os.path.join(workdir, "app.log")
+    write_pino_lines(good, 100, 1_700_000_000_000)
+    plans = [log_analyzer.plan_file(good, None),
+             # vanishes between planning and scanning: the worker's open() fails
+             {"path": os.path.join(workdir, "gone.log.gz"), "offset": 0, "gz": True, "counts": {}},
+             {"path": os.path.join(workdir, "gone.log"), "offset": 0, "gz": False,
+              "st": os.stat(good), "counts": {}}]
+    with contextlib.redirect_stdout(None):
+        results = log_analyzer.scan_parallel(plans, workers=2, chunk_bytes=1024)
+    expect(set(results) == {good}, f"scanned {sorted(results)}, expected only the readable file")
+    expect(results[good][1].counts["total_events"] == 100, "readable file miscounted next to a failing one")
+
+
+# ---- message export ----
+
+@check
+def export_messages_crash(workdir):
+    import sqlite3
+    import export_messages
+
+    db_path, out_dir = os.path.join(workdir, "nanoclaw.db"), os.path.join(workdir, "parquet")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE messages (id TEXT, chat_jid TEXT, sender_jid TEXT, sender_name TEXT, content TEXT,"
+                 " timestamp TEXT, from_me INTEGER)")
+    conn.execute("CREATE TABLE chats (jid TEXT, name TEXT, last_message_time TEXT)")
+    # NULL timestamps sort first, so the first chunk starts with one
+    rows = [(f"n{i}", "a@g.us", "s", "S", "no time", None, 0) for i in range(3)] + [
+        (f"m{i:03d}", "ab"[i % 2] + "@g.us", "s", "S", f"msg {i}", f"2024-0{1 + i // 50}-01T00:00:{i % 60:02d}Z", 0)
+        for i in range(150)]
+    conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    real_chunk_table, calls = export_messages._chunk_table, []
+
+    def failing_chunk_table(chunk):
+        calls.append(len(chunk))
+        if len(calls) == 3:
+            raise RuntimeError("disk full")
+        return real_chunk_table(chunk)
+
+    export_messages._chunk_table = failing_chunk_table
+    try:
+        export_messages.run_export(db_path, out_dir, chunk_rows=40)
+    except RuntimeError:
+        pass
+    else:
+        raise CheckFailed("the injected failure did not surface")
+    finally:
+        export_messages._chunk_table = real_chunk_table
+    leftovers = glob.glob(os.path.join(out_dir, "messages", "**", "*.parquet*"), recursive=True)
+    expect(not leftovers, f"failed run left part files behind: {leftovers}")
+    expect("messages" not in export_messages.load_state(out_dir), "failed run advanced the high-water mark")
+
+    exported, _, _ = export_messages.run_export(db_path, out_dir, chunk_rows=40)
+    expect(exported == len(rows), f"rerun exported {exported} of {len(rows)} messages")
+    df = export_messages.load_messages(out_dir, columns=["id"])
+    expect(len(df) == len(rows) and df["id"].is_unique, f"dataset holds {len(df)} rows for {len(rows)} messages")
+    expect(not glob.glob(os.path.join(out_dir, "messages", "**", ".*"), recursive=True), "temp files left visible")
+
+
+@check
+def export_messages_null_mark(workdir):
+    import sqlite3
+    import export_messages
+
+    db_path, out_dir = os.path.join(workdir, "nanoclaw.db"), os.path.join(workdir, "parquet")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE messages (id TEXT, chat_jid TEXT, sender_jid TEXT, sender_name TEXT, content TEXT,"
+                 " timestamp TEXT, from_me INTEGER)")
+    conn.execute("CREATE TABLE chats (jid TEXT, name TEXT, last_message_time TEXT)")
+    insert = "INSERT INTO messages VALUES (?, 'a@g.us', 's', 'S', 'x', ?, 0)"
+    conn.executemany(insert, [("n1", None), ("n2", None)])
+    conn.commit()
+    exported, _, _ = export_messages.run_export(db_path, out_dir)
+    expect(exported == 2, f"first run exported {exported} of 2")
+
+    # The mark now points at a NULL-timestamp row
+    conn.executemany(insert, [("n3", None), ("m1", "2024-01-01T00:00:00Z")])
+    conn.commit()
+    exported, _, _ = export_messages.run_export(db_path, out_dir)
+    expect(exported == 2, f"run after a NULL mark exported {exported} of 2 new messages")
+    conn.execute(insert, ("m2", "2024-01-02T00:00:00Z"))
+    conn.commit()
+    conn.close()
+    exported, _, _ = export_messages.run_export(db_path, out_dir)
+    expect(exported == 1, f"incremental run exported {exported} of 1")
+    expect(len(export_messages.load_messages(out_dir, columns=["id"])) == 5, "dataset row count is off")
+
+
+# ---- task provisioning ----
+
+@check
+def task_provision_keeps_status(workdir):
+    import sqlite3
+    from datetime import datetime, timezone
+    from zoneinfo import ZoneInfo
+    import task_provision
+
+    db_path = os.path.join(workdir, "nanoclaw.db")
+    spec = {"name": "daily", "group_folder": "main", "chat_jid": "c@g.us", "prompt": "p",
+            "schedule_type": "cron", "schedule_value": "0 9 * * *", "context_mode": "isolated"}
+    ((tid, *_),) = task_provision.provision([spec], db_path)
+    conn = sqlite3.connect(db_path)
+    status = lambda: conn.execute("SELECT status FROM tasks WHERE id = ?", (tid,)).fetchone()[0]
+    expect(status() == "active", f"new task status {status()}")
+    conn.execute("UPDATE tasks SET status = 'paused'")
+    conn.commit()
+    task_provision.provision([spec], db_path)
+    expect(status() == "paused", "re-provisioning resumed a paused task")
+    task_provision.provision([dict(spec, status="active")], db_path)
+    expect(status() == "active", "an explicit manifest status was not applied")
+    conn.close()
+
+    # Mondays only: "*/1" and "1-31" leave the day of month unrestricted, so it is ANDed
+    tz, start = ZoneInfo("UTC"), datetime(2024, 1, 1, 12, tzinfo=timezone.utc)  # a Monday
+    for expression in ("0 9 * * 1", "0 9 */1 * 1", "0 9 1-31 * 1", "0 9 * * 0-6/1"):
+        fire = task_provision.CronSchedule(expression).next_after(start, tz)
+        expected = datetime(2024, 1, 2 if expression.endswith("/1") else 8, 9, tzinfo=tz)
+        expect(fire == expected, f"{expression!r} fires {fire}, expected {expected}")
+
+
+# ---- task run analytics ----
+
+@check
+def task_runs_null_durations(workdir):
+    import sqlite3
+    import task_run_stats
+
+    db_path = os.path.join(workdir, "nanoclaw.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE task_runs (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT, run_at DATETIME,"
+                 " duration_ms INTEGER, status TEXT, result TEXT, error TEXT)")
+    day = time.strftime("%Y-%m-%d")
+    rows = [("t1", f"{day}T09:00:00", 10_000, "success")] * 60 + [("t1", f"{day}T09:00:00", None, "error")] * 40 \
+        + [("t2", f"{day}T09:00:00", None, "error")] * 3 + [("t1", None, 10_000, "success")] * 5
+    conn.executemany("INSERT INTO task_runs (task_id, run_at, duration_ms, status) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    # A rollup from before the timed column exists gets rebuilt
+    old = sqlite3.connect(os.path.join(workdir, "rollup.db"))
+    old.execute("CREATE TABLE daily (task_id TEXT, day TEXT, runs INTEGER, failures INTEGER, total_ms INTEGER,"
+                " max_ms INTEGER, PRIMARY KEY (task_id, day)) WITHOUT ROWID")
+    old.execute("INSERT INTO daily VALUES ('t1', ?, 999, 0, 0, 0)", (day,))
+    old.commit()
+    old.close()
+
+    rollup = task_run_stats.RunRollup(os.path.join(workdir, "rollup.db"))
+    expect(rollup.refresh(db_path) == len(rows), "not every run was folded")
+    report = {r["task_id"]: r for r in task_run_stats.build_report(rollup, days=2, db_path=db_path)}
+    rollup.close()
+    t1, t2 = report["t1"], report["t2"]
+    expect(t1["runs"] == 105 and t1["untimed"] == 40, f"t1 counts {t1} (runs without run_at dropped?)")
+    expect(abs(t1["p50"] - 10_000) / 10_000 < 0.1, f"NULL durations dragged p50 to {t1['p50']:.0f} ms")
+    expect(t2["p50"] is None and t2["max"] is None and t2["untimed"] == 3, f"untimed-only task {t2}")
+
+
+def run_checks(names):
+    failed = []
+    for name in names:
+        func = CHECKS[name]
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="nanoclaw-check-") as workdir:
+            try:
+                if func.__code__.co_argcount:
+                    func(workdir)
+                else:
+                    func()
+                status = "✅"
+            except CheckFailed as e:
+                status = f"❌ {e}"
+                failed.append(name)
+            except Exception:
+                status = "❌ error\n" + traceback.format_exc()
+                failed.append(name)
+        print(f"{name:<32} {(time.perf_counter() - started) * 1000:>8.0f} ms  {status}")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline checks for the lab scripts")
+    parser.add_argument("--only", nargs="+", choices=sorted(CHECKS), metavar="CHECK",
+                        help=f"run a subset: {', '.join(CHECKS)}")
+    args = parser.parse_args()
+
+    failed = run_checks(args.only or list(CHECKS))
+    print(f"\n{len(failed)} failed" if failed else "\nAll checks passed")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""Search result extraction for the DDG and Yahoo scrapers.
+
+A page profile lists CSS-style selectors (only ``tag.class`` compounds and
+descendant combinators) in priority order, mirroring the ``select(a) or
+select(b)`` fallbacks the scrapers used. Selectors are compiled once per
+profile for each backend:
+
+- ``lxml``: precompiled XPath over an lxml.html tree (C parser)
+- ``stream``: stdlib HTMLParser tokenizer that keeps no tree and stops
+  feeding the page once the list holding the results has closed
+- ``bs4``: the original BeautifulSoup ``html.parser`` path
+
+``extract`` uses lxml when installed, else the tokenizer, and falls back to
+BeautifulSoup when the fast backend finds nothing.
+"""
+import os
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+DDG_RESULTS = {
+    "containers": [".result", ".links_main"],
+    "fields": {
+        "title": [".result__title a", ".result-link"],
+        "snippet": [".result__snippet", ".result-snippet"],
+    },
+}
+
+YAHOO_RESULTS = {
+    "containers": ["div.NewsArticle"],
+    "fields": {
+        "title": ["h4.s-title a"],
+        "snippet": ["p.s-desc"],
+        "source": ["span.s-source"],
+    },
+}
+
+# Title is the link text; results without one are skipped
+LINK_FIELD = "title"
+FEED_BYTES = 16384
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "param", "source", "track", "wbr"}
+
+
+def _compounds(selector):
+    """'h4.s-title a' -> [('h4', 's-title'), ('a', None)]."""
+    parts = []
+    for part in selector.split():
+        tag, _, cls = part.partition(".")
+        parts.append((tag or None, cls or None))
+    return parts
+
+
+def _matches(compound, tag, classes):
+    want_tag, want_cls = compound
+    return (want_tag is None or want_tag == tag) and (want_cls is None or want_cls in classes)
+
+
+# ---------------------------------------------------------------- lxml
+
+def _xpath_step(compound):
+    tag, cls = compound
+    step = tag or "*"
+    if cls:
+        step += f"[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+    return step
+
+
+def _xpath(selector, relative):
+    path = "//".join(_xpath_step(c) for c in _compounds(selector))
+    return etree.XPath((".//" if relative else "//") + path)
+
+
+class LxmlExtractor:
+    name = "lxml"
+
+    def __init__(self, profile):
+        self.containers = [_xpath(s, False) for s in profile["containers"]]
+        self.fields = {name: [_xpath(s, True) for s in selectors]
+                       for name, selectors in profile["fields"].items()}
+
+    def extract(self, html):
+        if not html.strip():
+            return []
+        root = lxml_html.fromstring(html)
+        results = []
+        for container in self.containers:
+            results = container(root)
+            if results:
+                break
+        items = []
+        for result in results:
+            item = {}
+            for name, xpaths in self.fields.items():
+                for xpath in xpaths:
+                    found = xpath(result)
+                    if found:
+                        item[name] = found[0]
+                        break
+            link = item.get(LINK_FIELD)
+            if link is None:
+                continue
+            record = {name: "".join(el.itertext()).strip() for name, el in item.items()}
+            record["link"] = link.get("href", "")
+            items.append(record)
+        return items
+
+
+# ---------------------------------------------------------------- stream
+
+class _Capture:
+    __slots__ = ("depth", "parts", "href")
+
+    def __init__(self, depth, href):
+        self.depth = depth
+        self.parts = []
+        self.href = href
+
+
+class _Result:
+    __slots__ = ("depth", "slots")
+
+    def __init__(self, depth, fields):
+        self.depth = depth
+        self.slots = {name: [None] * len(selectors) for name, selectors in fields.items()}
+
+
+class _ResultTokenizer(HTMLParser):
+    def __init__(self, extractor):
+        super().__init__(convert_charrefs=True)
+        self.x = extractor
+        self.stack = []
+        self.open = [None] * len(extractor.containers)
+        self.finished = [[] for _ in extractor.containers]
+        self.captures = []
+        self.track_ci = None
+        self.first_path = None
+        self.list_depth = None
+        self.done = False
+
+    def _inside(self, compounds, start):
+        """Do the leading compounds match ancestors above ``start`` in order?"""
+        i = len(compounds) - 1
+        for tag, classes in reversed(self.stack[start:-1]):
+            if i < 0:
+                break
+            if _matches(compounds[i], tag, classes):
+                i -= 1
+        return i < 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        attrs = dict(attrs)
+        classes = set((attrs.get("class") or "").split())
+        entry = (tag, classes)
+        self.stack.append(entry)
+        depth = len(self.stack)
+
+        for ci, compounds in enumerate(self.x.containers):
+            if self.open[ci] is None and _matches(compounds[-1], tag, classes) \
+                    and self._inside(compounds[:-1], 0):
+                self.open[ci] = _Result(depth, self.x.fields)
+                if self.track_ci is None:
+                    self.track_ci = ci
+                if ci == self.track_ci:
+                    self._track_list()
+
+        for result in self.open:
+            if result is None or depth == result.depth:
+                continue
+            for name, selectors in self.x.fields.items():
+                slots = result.slots[name]
+                for si, compounds in enumerate(selectors):
+                    if slots[si] is None and _matches(compounds[-1], tag, classes) \
+                            and self._inside(compounds[:-1], result.depth - 1):
+                        slots[si] = _Capture(depth, attrs.get("href") or "")
+                        self.captures.append(slots[si])
+
+        if tag in VOID_TAGS:
+            self._close(depth - 1)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.stack:
+            self._close(len(self.stack) - 1)
+
+    def _track_list(self):
+        # The results' nearest common ancestor: once it closes, we are done
+        path = self.stack[:-1]
+        if self.first_path is None:
+            self.first_path = path
+        elif self.list_depth is None:
+            common = 0
+            for a, b in zip(self.first_path, path):
+                if a is not b:
+                    break
+                common += 1
+            self.list_depth = common
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                self._close(depth)
+                break
+
+    def _close(self, depth):
+        """Pop the stack down to ``depth`` elements."""
+        del self.stack[depth:]
+        self.captures = [c for c in self.captures if c.depth <= depth]
+        for ci, result in enumerate(self.open):
+            if result is not None and result.depth > depth:
+                self.finished[ci].append(result)
+                self.open[ci] = None
+        if self.list_depth is not None and depth < self.list_depth:
+            self.done = True
+
+    def handle_data(self, data):
+        for capture in self.captures:
+            capture.parts.append(data)
+
+
+class StreamExtractor:
+    name = "stream"
+
+    def __init__(self, profile):
+        self.containers = [_compounds(s) for s in profile["containers"]]
+        self.fields = {name: [_compounds(s) for s in selectors]
+                       for name, selectors in profile["fields"].items()}
+
+    def extract(self, html):
+        parser = _ResultTokenizer(self)
+        for start in range(0, len(html), FEED_BYTES):
+            parser.feed(html[start:start + FEED_BYTES])
+            if parser.done:
+                break
+        else:
+            parser.close()
+        # Results still open at EOF (unclosed markup) count too
+        for ci, result in enumerate(parser.open):
+            if result is not None:
+                parser.finished[ci].append(result)
+
+        results = next((r for r in parser.finished if r), [])
+        items = []
+        for result in results:
+            found = {name: next((c for c in slots if c is not None), None)
+                     for name, slots in result.slots.items()}
+            link = found.get(LINK_FIELD)
+            if link is None:
+                continue
+            record = {name: "".join(c.parts).strip() for name, c in found.items() if c is not None}
+            record["link"] = link.href
+            items.append(record)
+        return items
+
+
+# ---------------------------------------------------------------- bs4
+
+class SoupExtractor:
+    name = "bs4"
+
+    def __init__(self, profile):
+        self.containers = profile["containers"]
+        self.fields = profile["fields"]
+
+    def extract(self, html):
+        soup = BeautifulSoup(html, "html.parser")
+        results = []
+        for selector in self.containers:
+            results = soup.select(selector)
+            if results:
+                break
+        items = []
+        for result in results:
+            record = {}
+            link = ""
+            for name, selectors in self.fields.items():
+                tag = next((t for t in (result.select_one(s) for s in selectors) if t), None)
+                if tag is None:
+                    continue
+                record[name] = tag.get_text().strip()
+                if name == LINK_FIELD:
+                    link = tag["href"] if tag.has_attr("href") else ""
+            if LINK_FIELD in record:
+                record["link"] = link
+                items.append(record)
+        return items
+
+
+BACKENDS = {"lxml": LxmlExtractor, "stream": StreamExtractor, "bs4": SoupExtractor}
+_compiled = {}
+
+
+def available_backends():
+    names = []
+    if lxml_html is not None:
+        names.append("lxml")
+    names.append("stream")
+    if BeautifulSoup is not None:
+        names.append("bs4")
+    return names
+
+
+def get_extractor(profile, backend):
+    key = (id(profile), backend)
+    if key not in _compiled:
+        _compiled[key] = BACKENDS[backend](profile)
+    return _compiled[key]
+
+
+def extract(html, profile, backend=None):
+    """Return result dicts (``title``, ``link`` and the profile's other
+    fields, when present) from a search results page."""
+    backend = backend or os.environ.get("NANOCLAW_EXTRACT_BACKEND") or available_backends()[0]
+    items = get_extractor(profile, backend).extract(html)
+    if not items and backend != "bs4" and BeautifulSoup is not None:
+        items = get_extractor(profile, "bs4").extract(html)
+    return items
+
+
+def extract_ddg(html, backend=None):
+    return extract(html, DDG_RESULTS, backend)
+
+
+def extract_yahoo(html, backend=None):
+    return extract(html, YAHOO_RESULTS, backend)
@@ -1,17 +1,280 @@
+"""Host health checks for NanoClaw, run concurrently and cached.
+
+Every check runs in its own thread with its own timeout, so the suite
+takes as long as the slowest check rather than the sum of them. Results
+are cached per check in ``data/sys_check_cache.json`` for ``--ttl``
+seconds; health pings inside that window read the cache and run nothing.
+
+    python3 nanoclaw-lab/sys_check.py
+    python3 nanoclaw-lab/sys_check.py --json --ttl 300
+    python3 nanoclaw-lab/sys_check.py --refresh --only runtime disk:data
+"""
+import argparse
+import datetime
+import json
 import os
 import platform
-import datetime
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DATA_DIR = "data"
+GROUPS_DIR = "groups"
+LOG_DIRS = ("logs",)
+DB_PATH = os.path.join(DATA_DIR, "nanoclaw.db")
+CACHE_PATH = os.path.join(DATA_DIR, "sys_check_cache.json")
+TTL = float(os.environ.get("NANOCLAW_SYSCHECK_TTL", 60))
+
+# Container CLIs in order of preference, with the command that needs the daemon
+RUNTIMES = (
+    ("docker", ["docker", "info", "--format", "{{.ServerVersion}}"]),
+    ("container", ["container", "system", "status"]),
+)
+DEPENDENCIES = ("requests", "bs4", "lxml", "pandas", "numpy", "pyarrow", "matplotlib", "PIL")
+
+DISK_WARN_FREE, DISK_FAIL_FREE = 0.10, 0.02
+LOG_GROWTH_WARN = 50 * 1024 * 1024  # bytes per hour
+IMPORT_WARN_SECONDS = 2.0
+GRACE = 0.5  # seconds past a check's timeout before it is abandoned
+
+STATUS_ORDER = {"ok": 0, "warn": 1, "fail": 2, "timeout": 2}
+
+
+def _size_mb(n):
+    return round(n / 1024 / 1024, 1)
+
+
+def _dir_bytes(path, deadline):
+    total = 0
+    for root, _, files in os.walk(path):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"walking {path}")
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def check_runtime(deadline):
+    timeout = max(0.1, deadline - time.monotonic())
+    for name, cmd in RUNTIMES:
+        if not shutil.which(cmd[0]):
+            continue
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"status": "timeout", "runtime": name, "detail": "daemon did not answer"}
+        lines = (proc.stdout if proc.returncode == 0 else proc.stderr or proc.stdout).strip().splitlines()
+        if proc.returncode != 0:
+            return {"status": "fail", "runtime": name, "detail": lines[-1] if lines else "not running"}
+        return {"status": "ok", "runtime": name, "detail": lines[0] if lines else "running"}
+    return {"status": "fail", "detail": f"none of {', '.join(n for n, _ in RUNTIMES)} installed"}
+
+
+def check_disk(path):
+    def run(deadline):
+        target = path if os.path.exists(path) else "."
+        usage = shutil.disk_usage(target)
+        free = usage.free / usage.total
+        result = {"status": "ok", "path": path, "free_mb": _size_mb(usage.free),
+                  "total_mb": _size_mb(usage.total), "free_fraction": round(free, 3)}
+        if not os.path.exists(path):
+            result.update(status="warn", detail=f"{path} does not exist")
+        elif free < DISK_FAIL_FREE:
+            result["status"] = "fail"
+        elif free < DISK_WARN_FREE:
+            result["status"] = "warn"
+        if os.path.exists(path):
+            result["used_mb"] = _size_mb(_dir_bytes(path, deadline))
+        return result
+    return run
+
+
+def check_sqlite(deadline):
+    if not os.path.exists(DB_PATH):
+        return {"status": "warn", "detail": f"{DB_PATH} does not exist"}
+    size = os.path.getsize(DB_PATH)
+    wal = DB_PATH + "-wal"
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=1)
+    # quick_check can take minutes on a large file; abort it at the deadline
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+    try:
+        rows = [r[0] for r in conn.execute("PRAGMA quick_check").fetchall()]
+    except sqlite3.OperationalError as e:
+        if "interrupted" in str(e):
+            return {"status": "timeout", "size_mb": _size_mb(size)}
+        return {"status": "fail", "detail": str(e), "size_mb": _size_mb(size)}
+    finally:
+        conn.close()
+    return {"status": "ok" if rows == ["ok"] else "fail", "detail": rows[0] if rows == ["ok"] else rows[:5],
+            "size_mb": _size_mb(size), "wal_mb": _size_mb(os.path.getsize(wal)) if os.path.exists(wal) else 0}
+
+
+def _log_dirs():
+    dirs = [d for d in LOG_DIRS if os.path.isdir(d)]
+    if os.path.isdir(GROUPS_DIR):
+        dirs += [os.path.join(GROUPS_DIR, g, "logs") for g in sorted(os.listdir(GROUPS_DIR))
+                 if os.path.isdir(os.path.join(GROUPS_DIR, g, "logs"))]
+    return dirs
+
+
+def check_logs(deadline, previous=None):
+    """Total log size, and growth per hour since the previous (cached) measurement."""
+    dirs = _log_dirs()
+    total = sum(_dir_bytes(d, deadline) for d in dirs)
+    result = {"status": "ok", "dirs": len(dirs), "size_mb": _size_mb(total), "bytes": total, "measured_at": time.time()}
+    if previous and time.time() - previous["measured_at"] > 60:
+        per_hour = (total - previous["bytes"]) * 3600 / (time.time() - previous["measured_at"])
+        result["growth_mb_per_hour"] = _size_mb(per_hour)
+        if per_hour > LOG_GROWTH_WARN:
+            result["status"] = "warn"
+    return result
+
+
+def check_import(module):
+    """Import time in a fresh interpreter, so nothing is already loaded."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+    def run(deadline):
+        try:
+            proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                  timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            return {"status": "timeout"}
+        if proc.returncode != 0:
+            return {"status": "warn", "detail": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"}
+        seconds = float(proc.stdout.strip())
+        return {"status": "warn" if seconds > IMPORT_WARN_SECONDS else "ok", "import_ms": round(seconds * 1000, 1)}
+    return run
+
+
+# name -> (function(deadline), timeout seconds)
+CHECKS = {
+    "runtime": (check_runtime, 10),
+    "disk:data": (check_disk(DATA_DIR), 5),
+    "disk:groups": (check_disk(GROUPS_DIR), 5),
+    "sqlite": (check_sqlite, 15),
+    "logs": (check_logs, 5),
+}
+CHECKS.update({f"import:{m}": (check_import(m), 15) for m in DEPENDENCIES})
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _timed(func, *args):
+    started = time.monotonic()
+    try:
+        result = func(*args)
+    except TimeoutError as e:
+        result = {"status": "timeout", "detail": str(e)}
+    except Exception as e:
+        result = {"status": "fail", "detail": f"{type(e).__name__}: {e}"}
+    result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+
+def run_checks(names=None, ttl=TTL, cache_path=CACHE_PATH):
+    """Run the stale checks concurrently and return the full report dict."""
+    names = list(names or CHECKS)
+    cache = load_cache(cache_path)
+    results = cache.get("checks", {})
+    now = time.time()
+    stale = [n for n in names if n not in results or now - results[n].get("checked_at", 0) > ttl]
+
+    if stale:
+        started = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=len(stale))
+        futures, deadlines = {}, {}
+        for name in stale:
+            func, timeout = CHECKS[name]
+            deadline = started + timeout
+            args = (deadline, results.get("logs")) if name == "logs" else (deadline,)
+            future = pool.submit(_timed, func, *args)
+            futures[future], deadlines[future] = name, deadline
+        # Stop waiting on each check at its own deadline; the suite ends with the slowest
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            pending = {f for f in pending if deadlines[f] + GRACE > now}
+            if pending:
+                _, pending = wait(pending, timeout=min(deadlines[f] for f in pending) + GRACE - now,
+                                  return_when=FIRST_COMPLETED)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        for future, name in futures.items():
+            if future.done():
+                result = future.result()
+            else:
+                result = {"status": "timeout", "detail": f"no result within {CHECKS[name][1]}s",
+                          "duration_ms": CHECKS[name][1] * 1000}
+            result["checked_at"] = time.time()
+            results[name] = result
+        cache["checks"] = results
+        save_cache(cache, cache_path)
+
+    checks = {n: results[n] for n in names}
+    return {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "status": max((c["status"] for c in checks.values()), key=STATUS_ORDER.get, default="ok"),
+        "refreshed": stale,
+        "platform": {"system": platform.system(), "release": platform.release(),
+                     "machine": platform.machine(), "python": platform.python_version(), "cwd": os.getcwd()},
+        "checks": checks,
+    }
+
+
+ICONS = {"ok": "✅", "warn": "⚠️ ", "fail": "❌", "timeout": "⏱️ "}
+
+
+def print_report(report):
+    p = report["platform"]
+    print("--- NanoClaw Diagnostic ---")
+    print(f"Time: {report['generated_at']}")
+    print(f"System: {p['system']} {p['release']} ({p['machine']}), Python {p['python']}")
+    print(f"CWD: {p['cwd']}")
+    for name, result in report["checks"].items():
+        info = ", ".join(f"{k}={v}" for k, v in result.items()
+                         if k not in ("status", "checked_at", "duration_ms", "bytes", "measured_at"))
+        cached = "" if name in report["refreshed"] else " (cached)"
+        print(f"{ICONS[result['status']]} {name:<18} {result['duration_ms']:>8.1f} ms{cached}  {info}")
+    print(f"Overall: {report['status']}")
+
 
 def run_check():
-    print(f"--- NanoClaw Diagnostic ---")
-    print(f"Time: {datetime.datetime.now()}")
-    print(f"System: {platform.system()} {platform.release()}")
-    print(f"Arch: {platform.machine()}")
-    print(f"CWD: {os.getcwd()}")
-    
-    # Check for docker
-    docker_check = os.system("docker --version > /dev/null 2>&1")
-    print(f"Docker: {'Available' if docker_check == 0 else 'Not Found'}")
-
-if __name__ == '__main__':
-    run_check()
\ No newline at end of file
+    print_report(run_checks())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NanoClaw host diagnostics")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--ttl", type=float, default=TTL, help="seconds a cached result stays valid")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cache and run every check")
+    parser.add_argument("--only", nargs="+", choices=sorted(CHECKS), metavar="CHECK",
+                        help=f"run a subset: {', '.join(CHECKS)}")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    args = parser.parse_args()
+
+    report = run_checks(args.only, 0 if args.refresh else args.ttl, args.cache)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    sys.exit(0 if report["status"] in ("ok", "warn") else 1)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Bulk provisioning for the scheduler's ``tasks`` table.
+
+Task specs come from a JSON or YAML manifest. ``next_run`` is computed from
+the real cron fire time in the scheduler's timezone, and all tasks are
+upserted in one transaction. A ``matrix`` expands one spec into many, e.g.
+one report task per (chat, country):
+
+    {
+      "defaults": {"group_folder": "main", "context_mode": "isolated"},
+      "tasks": [{
+        "name": "gdp-daily-{country}",
+        "chat_jid": "{chat}",
+        "prompt": "[SHELL: python3 nanoclaw-lab/cli.py gdp {country}] ...",
+        "schedule_type": "cron",
+        "schedule_value": "0 9 * * *",
+        "matrix": {"chat": ["...@s.whatsapp.net"], "country": ["CHN", "USA"]}
+      }]
+    }
+
+Task ids are derived from (group_folder, chat_jid, name), so re-running a
+manifest updates tasks in place instead of duplicating them. New tasks start
+``active``; an existing task keeps its status (e.g. paused in the scheduler)
+unless the manifest sets ``status`` for it or in ``defaults``.
+"""
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+DB_PATH = "data/nanoclaw.db"
+# Same default as TIMEZONE in src/config.ts
+TIMEZONE = os.environ.get("TZ") or "Asia/Shanghai"
+TASK_NAMESPACE = uuid.UUID("5d0f3a8e-2b7c-4e0e-9a51-6c1f0b7d2e44")
+
+DEFAULTS = {
+    "group_folder": "main",
+    "schedule_type": "cron",
+    "context_mode": "isolated",
+}
+NEW_TASK_STATUS = "active"
+
+MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+DAYS = {d: i for i, d in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+
+def _parse_field(field, low, high, names=None):
+    values = set()
+    for part in field.lower().split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (names.get(p) if names and p in names else int(p) for p in part.split("-", 1))
+        else:
+            start = names.get(part) if names and part in names else int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Standard five-field cron expression (minute hour day month weekday)."""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"expected 5 cron fields: {expression!r}")
+        self.minutes = sorted(_parse_field(fields[0], 0, 59))
+        self.hours = sorted(_parse_field(fields[1], 0, 23))
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12, MONTHS)
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7, DAYS)}
+        # Like cron: when both day fields are restricted, either may match.
+        # Judged by the values, so "*/1" or "1-31" count as unrestricted too
+        self.day_any = self.days == set(range(1, 32))
+        self.weekday_any = self.weekdays == set(range(7))
+
+    def _day_matches(self, day):
+        if day.month not in self.months:
+            return False
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self.day_any or self.weekday_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, moment, tz):
+        """First fire time strictly after ``moment`` (aware datetime)."""
+        local = moment.astimezone(tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = local.date()
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+                        if candidate >= local:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError("cron expression never fires")
+
+
+def iso_utc(moment):
+    """Format like JavaScript's Date.toISOString(), which the scheduler compares against."""
+    moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def compute_next_run(schedule_type, schedule_value, now=None, tz=TIMEZONE):
+    now = now or datetime.now(timezone.utc)
+    if schedule_type == "cron":
+        return iso_utc(CronSchedule(schedule_value).next_after(now, ZoneInfo(tz)))
+    if schedule_type == "interval":
+        return iso_utc(now + timedelta(milliseconds=int(schedule_value)))
+    if schedule_type == "once":
+        moment = datetime.fromisoformat(schedule_value.replace("Z", "+00:00"))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=ZoneInfo(tz))
+        return iso_utc(moment)
+    raise ValueError(f"unknown schedule_type: {schedule_type}")
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                sys.exit("PyYAML is required for YAML manifests (pip install pyyaml), or use JSON")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def expand_specs(manifest):
+    """Apply defaults and expand ``matrix`` entries into concrete task specs."""
+    defaults = dict(DEFAULTS, **manifest.get("defaults", {}))
+    for spec in manifest.get("tasks", []):
+        spec = dict(defaults, **spec)
+        matrix = spec.pop("matrix", None) or {}
+        keys = list(matrix)
+        for combo in itertools.product(*(matrix[k] for k in keys)):
+            values = dict(zip(keys, combo))
+            yield {k: v.format(**values) if isinstance(v, str) and values else v for k, v in spec.items()}
+
+
+def task_id(spec):
+    if spec.get("id"):
+        return spec["id"]
+    return str(uuid.uuid5(TASK_NAMESPACE, f"{spec['group_folder']}/{spec['chat_jid']}/{spec['name']}"))
+
+
+def ensure_schema(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            group_folder TEXT,
+            chat_jid TEXT,
+            prompt TEXT,
+            schedule_type TEXT,
+            schedule_value TEXT,
+            context_mode TEXT,
+            next_run DATETIME,
+            status TEXT,
+            created_at DATETIME
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status_next_run ON tasks(status, next_run)")
+
+
+UPSERT_SQL = """
+    INSERT INTO tasks (id, group_folder, chat_jid, prompt, schedule_type, schedule_value, context_mode, next_run, status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        group_folder = excluded.group_folder,
+        chat_jid = excluded.chat_jid,
+        prompt = excluded.prompt,
+        context_mode = excluded.context_mode,
+        -- the manifest's status if it set one, else whatever the scheduler has
+        status = COALESCE(?, tasks.status),
+        -- keep a pending fire time unless the schedule itself changed
+        next_run = CASE
+            WHEN tasks.schedule_type IS NOT excluded.schedule_type
+              OR tasks.schedule_value IS NOT excluded.schedule_value
+              OR tasks.next_run IS NULL
+            THEN excluded.next_run ELSE tasks.next_run END,
+        schedule_type = excluded.schedule_type,
+        schedule_value = excluded.schedule_value
+"""
+
+
+def provision(specs, db_path=DB_PATH, now=None, tz=TIMEZONE):
+    """Upsert ``specs`` in a single transaction; returns the rows written."""
+    now = now or datetime.now(timezone.utc)
+    created_at = iso_utc(now)
+    rows = []
+    for spec in specs:
+        for key in ("name", "chat_jid", "prompt", "schedule_value"):
+            if not spec.get(key):
+                raise ValueError(f"task spec missing {key!r}: {spec}")
+        rows.append((
+            task_id(spec), spec["group_folder"], spec["chat_jid"], spec["prompt"],
+            spec["schedule_type"], str(spec["schedule_value"]), spec["context_mode"],
+            compute_next_run(spec["schedule_type"], str(spec["schedule_value"]), now=now, tz=tz),
+            spec.get("status") or NEW_TASK_STATUS, created_at, spec.get("status"),
+        ))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_schema(conn)
+        with conn:
+            conn.executemany(UPSERT_SQL, rows)
+    finally:
+        conn.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Provision scheduled tasks from a manifest")
+    parser.add_argument("manifest", help="JSON or YAML task manifest")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--tz", default=TIMEZONE, help="timezone for cron expressions")
+    parser.add_argument("--dry-run", action="store_true", help="print tasks and next runs without writing")
+    args = parser.parse_args()
+
+    specs = list(expand_specs(load_manifest(args.manifest)))
+    if args.dry_run:
+        for spec in specs:
+            next_run = compute_next_run(spec["schedule_type"], str(spec["schedule_value"]), tz=args.tz)
+            print(f"{task_id(spec)}  {spec['name']:<30}  {spec['schedule_value']:<15}  next: {next_run}")
+        sys.exit(0)
+
+    rows = provision(specs, db_path=args.db, tz=args.tz)
+    print(f"Provisioned {len(rows)} tasks into {args.db}")
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""Latency and failure analytics for scheduled task runs.
+
+``task_runs`` (see src/db.ts) is read in id order, in chunks, and folded into
+rollup tables keyed by (task_id, day): run/failure counts plus a log-bucket
+latency histogram. Runs logged without a duration are counted but kept out
+of the latency figures; runs without a run_at go under the day "unknown",
+which every report window includes and drift ignores. The highest id folded in is stored alongside, so a repeat
+report only reads rows logged since the last one. Percentiles, failure rates
+and drift are computed from the rollups with NumPy.
+
+    python3 nanoclaw-lab/task_run_stats.py              # last 30 days
+    python3 nanoclaw-lab/task_run_stats.py --days 90 --task <task_id>
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+DB_PATH = "data/nanoclaw.db"
+ROLLUP_PATH = "data/task_runs_rollup.db"
+CHUNK_ROWS = 50000
+# Histogram buckets grow by 10%, so percentiles are within ~5% of exact
+HIST_GROWTH = 1.1
+RECENT_DAYS = 7
+DRIFT_RATIO = 1.2
+# Day for runs logged without run_at; sorts after every ISO date
+UNKNOWN_DAY = "unknown"
+
+
+def duration_buckets(ms):
+    ms = np.maximum(np.asarray(ms, dtype=np.float64), 1.0)
+    return np.ceil(np.log(ms) / np.log(HIST_GROWTH)).astype(np.int64)
+
+
+class RunRollup:
+    def __init__(self, path=ROLLUP_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS daily (
+                task_id TEXT,
+                day TEXT,
+                runs INTEGER,
+                failures INTEGER,
+                timed INTEGER,
+                total_ms INTEGER,
+                max_ms INTEGER,
+                PRIMARY KEY (task_id, day)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS histogram (
+                task_id TEXT,
+                day TEXT,
+                bucket INTEGER,
+                count INTEGER,
+                PRIMARY KEY (task_id, day, bucket)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_daily_day ON daily(day);
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(daily)")}
+        if "timed" not in columns:
+            # Older rollups binned missing durations as 0 ms; rebuild them from task_runs
+            self.conn.execute("ALTER TABLE daily ADD COLUMN timed INTEGER")
+            self.reset()
+
+    def high_water(self):
+        row = self.conn.execute("SELECT value FROM state WHERE key = 'last_run_id'").fetchone()
+        return row[0] if row else 0
+
+    def fold(self, chunk):
+        """Add one DataFrame chunk of task_runs to the rollups, together with
+        the new high-water mark, in a single transaction."""
+        # groupby drops NaN keys, and the high-water mark would still move past those rows
+        chunk = chunk.assign(
+            task_id=chunk["task_id"].fillna("unknown"),
+            day=chunk["run_at"].str.slice(0, 10).fillna(UNKNOWN_DAY),
+            failed=(chunk["status"] != "success").astype(np.int64),
+            duration_ms=chunk["duration_ms"].astype(np.float64),
+        )
+
+        # count/sum/max skip NULL durations, so untimed runs only add to runs/failures
+        daily = chunk.groupby(["task_id", "day"], sort=False).agg(
+            runs=("id", "size"), failures=("failed", "sum"), timed=("duration_ms", "count"),
+            total_ms=("duration_ms", "sum"), max_ms=("duration_ms", "max"),
+        ).reset_index()
+        daily["total_ms"] = daily["total_ms"].astype(np.int64)
+        daily["max_ms"] = daily["max_ms"].astype(object).where(daily["max_ms"].notna(), None)
+        timed = chunk[chunk["duration_ms"].notna()]
+        hist = timed.assign(bucket=duration_buckets(timed["duration_ms"].to_numpy())) \
+            .groupby(["task_id", "day", "bucket"], sort=False).size().reset_index(name="count")
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO daily (task_id, day, runs, failures, timed, total_ms, max_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(task_id, day) DO UPDATE SET
+                    runs = runs + excluded.runs,
+                    failures = failures + excluded.failures,
+                    timed = timed + excluded.timed,
+                    total_ms = total_ms + excluded.total_ms,
+                    max_ms = COALESCE(MAX(max_ms, excluded.max_ms), max_ms, excluded.max_ms)
+            """, daily.itertuples(index=False, name=None))
+            self.conn.executemany("""
+                INSERT INTO histogram (task_id, day, bucket, count) VALUES (?, ?, ?, ?)
+                ON CONFLICT(task_id, day, bucket) DO UPDATE SET count = count + excluded.count
+            """, hist.itertuples(index=False, name=None))
+            self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('last_run_id', ?)",
+                              (int(chunk["id"].max()),))
+
+    def refresh(self, db_path=DB_PATH, chunk_rows=CHUNK_ROWS):
+        """Fold in task_runs rows logged since the last refresh; returns the count."""
+        source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        folded = 0
+        try:
+            query = ("SELECT id, task_id, run_at, duration_ms, status FROM task_runs"
+                     " WHERE id > ? ORDER BY id")
+            for chunk in pd.read_sql_query(query, source, params=(self.high_water(),), chunksize=chunk_rows):
+                if chunk.empty:
+                    continue
+                self.fold(chunk)
+                folded += len(chunk)
+        finally:
+            source.close()
+        return folded
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM daily")
+            self.conn.execute("DELETE FROM histogram")
+            self.conn.execute("DELETE FROM state")
+
+    def load(self, since, task=None):
+        where, params = "day >= ?", [since]
+        if task:
+            where += " AND task_id = ?"
+            params.append(task)
+        daily = pd.read_sql_query(f"SELECT * FROM daily WHERE {where}", self.conn, params=params)
+        hist = pd.read_sql_query(f"SELECT * FROM histogram WHERE {where}", self.conn, params=params)
+        return daily, hist
+
+    def close(self):
+        self.conn.close()
+
+
+def percentiles(buckets, counts, qs=(50, 95, 99)):
+    """Percentiles (ms) from a log-bucket histogram."""
+    order = np.argsort(buckets)
+    buckets, counts = np.asarray(buckets)[order], np.asarray(counts)[order]
+    cumulative = np.cumsum(counts)
+    ranks = np.ceil(np.asarray(qs) / 100 * cumulative[-1])
+    return HIST_GROWTH ** buckets[np.searchsorted(cumulative, ranks)]
+
+
+def daily_p50(hist):
+    """Median latency per dated day for one task's histogram rows."""
+    hist = hist[hist["day"] != UNKNOWN_DAY]
+    days = sorted(hist["day"].unique())
+    return days, np.array([percentiles(g["bucket"], g["count"], (50,))[0]
+                           for _, g in hist.groupby("day", sort=True)])
+
+
+def drift(days, medians, recent_days=RECENT_DAYS):
+    """Least-squares slope of the daily median (ms/day) and the ratio of the
+    recent window's median to the baseline before it."""
+    if len(days) < 2:
+        return 0.0, None
+    x = np.array([(datetime.fromisoformat(d) - datetime.fromisoformat(days[0])).days for d in days], dtype=float)
+    slope = np.polyfit(x, medians, 1)[0]
+    recent = x > x[-1] - recent_days
+    if recent.all() or not recent.any():
+        return slope, None
+    return slope, float(np.median(medians[recent]) / np.median(medians[~recent]))
+
+
+def task_labels(db_path=DB_PATH):
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        rows = conn.execute("SELECT id, prompt FROM tasks").fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return {}
+    return {task_id: " ".join((prompt or "").split())[:40] for task_id, prompt in rows}
+
+
+def build_report(rollup, days=30, task=None, db_path=DB_PATH):
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    daily, hist = rollup.load(since, task)
+    labels = task_labels(db_path)
+    report = []
+    for task_id, task_daily in daily.groupby("task_id"):
+        task_hist = hist[hist["task_id"] == task_id]
+        p50 = p95 = p99 = None
+        slope, ratio = 0.0, None
+        if not task_hist.empty:
+            merged = task_hist.groupby("bucket")["count"].sum()
+            p50, p95, p99 = percentiles(merged.index.to_numpy(), merged.to_numpy())
+            slope, ratio = drift(*daily_p50(task_hist))
+        runs = int(task_daily["runs"].sum())
+        max_ms = task_daily["max_ms"].max()
+        report.append({
+            "task_id": task_id,
+            "label": labels.get(task_id, ""),
+            "runs": runs,
+            "untimed": runs - int(task_daily["timed"].sum()),
+            "failure_rate": task_daily["failures"].sum() / runs if runs else 0.0,
+            "p50": p50, "p95": p95, "p99": p99,
+            "max": None if pd.isna(max_ms) else int(max_ms),
+            "slope_ms_per_day": int(round(slope)),
+            "recent_ratio": ratio,
+        })
+    return sorted(report, key=lambda r: -(r["recent_ratio"] or 0))
+
+
+def print_report(report, days):
+    if not report:
+        print(f"📭 No task runs in the last {days} days")
+        return
+    print(f"📊 Task runs, last {days} days (latency in seconds)")
+    print(f"{'task':<38} {'runs':>6} {'fail%':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'ms/day':>8} {'recent':>7}")
+    for r in report:
+        ratio = f"{r['recent_ratio']:.2f}x" if r["recent_ratio"] else "-"
+        flag = " ⚠️" if r["recent_ratio"] and r["recent_ratio"] >= DRIFT_RATIO else ""
+        p50, p95, p99 = (f"{r[q] / 1000:>7.1f}" if r[q] is not None else f"{'-':>7}" for q in ("p50", "p95", "p99"))
+        print(f"{r['task_id'][:36]:<38} {r['runs']:>6} {r['failure_rate'] * 100:>5.1f}% "
+              f"{p50} {p95} {p99} {r['slope_ms_per_day']:>8} {ratio:>7}{flag}")
+        if r["label"]:
+            print(f"    {r['label']}")
+        if r["untimed"]:
+            print(f"    ({r['untimed']} runs without a duration, not in the latency figures)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-task latency, failure rate and drift from task_runs")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--rollup", default=ROLLUP_PATH)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--task", help="only report this task id")
+    parser.add_argument("--rebuild", action="store_true", help="discard rollups and re-read all runs")
+    args = parser.parse_args()
+
+    rollup = RunRollup(args.rollup)
+    if args.rebuild:
+        rollup.reset()
+    folded = rollup.refresh(args.db)
+    print(f"[*] Folded {folded} new runs (high-water id {rollup.high_water()})")
+    print_report(build_report(rollup, args.days, args.task, args.db), args.days)
+    rollup.close()
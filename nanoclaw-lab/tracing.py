@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""Lightweight span tracing for the lab scripts, off unless asked for.
+
+Set NANOCLAW_TRACE=1 (or a file path) and every ``span`` / ``@traced``
+stage is appended to ``data/traces/trace.jsonl`` as one JSON line with its
+run id, parent span, duration and attributes. Unset, ``span()`` returns a
+shared no-op object and ``@traced`` adds one flag check per call.
+
+NANOCLAW_PROFILE=cpu|mem|all additionally profiles a run with cProfile
+and/or tracemalloc; NANOCLAW_PROFILE_RATE=0.1 profiles only that fraction
+of runs, so a scheduled task can stay traced without paying for profiling
+every time. Profiles land next to the trace as ``<run>.prof`` and the top
+entries are attached to the run's root span.
+
+    with tracing.run("gdp_crawler", countries=3):
+        with tracing.span("fetch", url=url):
+            ...
+
+    python3 nanoclaw-lab/tracing.py summary --last 5
+    python3 nanoclaw-lab/tracing.py runs
+"""
+import argparse
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+DEFAULT_PATH = "data/traces/trace.jsonl"
+FLUSH_SPANS = 200
+PROFILE_TOP = 15
+
+
+class _State:
+    def __init__(self):
+        self.path = None
+        self.run_id = None
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.forked = False
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+
+_state = _State()
+_parent = contextvars.ContextVar("nanoclaw_span", default=None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+def _new_id():
+    return os.urandom(6).hex()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "id", "parent", "start", "_t0", "_token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.id = _new_id()
+
+    def set(self, **attrs):
+        """Attach attributes known only inside the span (result counts etc.)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.parent = _parent.get()
+        self._token = _parent.set(self.id)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self._t0) * 1000
+        _parent.reset(self._token)
+        record = {"run": _state.run_id, "span": self.id, "parent": self.parent, "name": self.name,
+                  "start": round(self.start, 6), "ms": round(ms, 3), "pid": os.getpid()}
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if exc_type is not None and not (exc_type is SystemExit and exc.code in (0, None)):
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        _emit(record)
+        return False
+
+
+def _emit(record):
+    with _state.lock:
+        _state.buffer.append(record)
+        # Pool workers exit without running atexit, so they write through
+        if _state.forked or len(_state.buffer) >= FLUSH_SPANS:
+            _flush_locked()
+
+
+def _flush_locked():
+    if not _state.buffer or not _state.path:
+        return
+    data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in _state.buffer)
+    _state.buffer = []
+    os.makedirs(os.path.dirname(_state.path) or ".", exist_ok=True)
+    # One write per flush with O_APPEND, so forked workers interleave whole lines
+    with open(_state.path, "a", encoding="utf-8") as f:
+        f.write(data)
+
+
+def flush():
+    with _state.lock:
+        _flush_locked()
+
+
+def enable(path=DEFAULT_PATH):
+    _state.path = path
+    _state.run_id = _state.run_id or _new_id()
+
+
+def disable():
+    flush()
+    _state.path = None
+
+
+def enabled():
+    return _state.enabled
+
+
+def span(name, **attrs):
+    """Context manager timing one stage; a no-op when tracing is off."""
+    if _state.path is None:
+        return _NULL
+    return Span(name, attrs)
+
+
+def traced(name=None):
+    """Decorator form of ``span`` for plain and async functions."""
+    def decorate(func):
+        label = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _state.path is None:
+                    return await func(*args, **kwargs)
+                with Span(label, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _state.path is None:
+                return func(*args, **kwargs)
+            with Span(label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _profile_mode():
+    mode = os.environ.get("NANOCLAW_PROFILE", "").lower()
+    if not mode:
+        return set()
+    import random
+
+    rate = float(os.environ.get("NANOCLAW_PROFILE_RATE", "1"))
+    if random.random() >= rate:
+        return set()
+    return {"cpu", "mem"} if mode in ("all", "1", "both") else set(mode.split(","))
+
+
+def _cpu_top(profiler, path):
+    import pstats
+
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler)
+    top = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in sorted(
+            stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]:
+        top.append({"func": f"{os.path.basename(filename)}:{line}:{func}", "calls": calls,
+                    "self_ms": round(tottime * 1000, 1), "cum_ms": round(cumtime * 1000, 1)})
+    return top
+
+
+@contextlib.contextmanager
+def run(name, **attrs):
+    """Root span for one script run; also applies NANOCLAW_PROFILE sampling."""
+    if _state.path is None:
+        yield _NULL
+        return
+    if _parent.get() is None:
+        _state.run_id = _new_id()
+    modes = _profile_mode()
+    # Profilers load only for sampled runs, so plain tracing stays cheap to import
+    if modes:
+        import cProfile
+        import tracemalloc
+    profiler = cProfile.Profile() if "cpu" in modes else None
+    tracing_mem = "mem" in modes and not tracemalloc.is_tracing()
+    if tracing_mem:
+        tracemalloc.start()
+    try:
+        with Span(name, dict(attrs, profiled=sorted(modes)) if modes else attrs) as root:
+            if profiler:
+                profiler.enable()
+            try:
+                yield root
+            finally:
+                if profiler:
+                    profiler.disable()
+                    prof_path = os.path.join(os.path.dirname(_state.path) or ".", f"{_state.run_id}.prof")
+                    root.set(cpu_top=_cpu_top(profiler, prof_path), profile=prof_path)
+                if tracing_mem:
+                    snapshot = tracemalloc.take_snapshot()
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    root.set(mem_peak_kb=round(peak / 1024), mem_top=[
+                        {"where": str(stat.traceback[0]), "kb": round(stat.size / 1024), "blocks": stat.count}
+                        for stat in snapshot.statistics("lineno")[:PROFILE_TOP]])
+    finally:
+        flush()
+
+
+def _reset_after_fork():
+    # A forked worker inherits the parent's unflushed spans; drop them
+    _state.lock = threading.Lock()
+    _state.buffer = []
+    _state.forked = True
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(flush)
+
+_env = os.environ.get("NANOCLAW_TRACE", "")
+if _env and _env.lower() not in ("0", "false", "no"):
+    enable(DEFAULT_PATH if _env.lower() in ("1", "true", "yes") else _env)
+
+
+# ---- summarizer ----
+
+def load_spans(path=DEFAULT_PATH):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue  # a line cut short by a crash
+    return spans
+
+
+def select_runs(spans, last=None, name=None):
+    """Spans of the ``last`` runs (by root start time), optionally only runs whose root is ``name``."""
+    roots = sorted((s for s in spans if s["parent"] is None and (name is None or s["name"] == name)),
+                   key=lambda s: s["start"])
+    keep = {s["run"] for s in (roots[-last:] if last else roots)}
+    return [s for s in spans if s["run"] in keep], len(keep)
+
+
+def summarize(spans):
+    """Per stage name: count, total/self/mean/max ms, errors; hottest self time first.
+
+    Self time is a span's duration minus its direct children's, so a root
+    that only waits on its stages does not top the list.
+    """
+    children = defaultdict(float)
+    for s in spans:
+        if s["parent"]:
+            children[(s["run"], s["parent"])] += s["ms"]
+    stats = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0, "errors": 0})
+    for s in spans:
+        row = stats[s["name"]]
+        row["count"] += 1
+        row["total_ms"] += s["ms"]
+        row["self_ms"] += max(0.0, s["ms"] - children[(s["run"], s["span"])])
+        row["max_ms"] = max(row["max_ms"], s["ms"])
+        row["errors"] += "error" in s
+    for row in stats.values():
+        row["mean_ms"] = row["total_ms"] / row["count"]
+    return sorted(stats.items(), key=lambda item: item[1]["self_ms"], reverse=True)
+
+
+def print_summary(rows, runs, top=20):
+    total_self = sum(r["self_ms"] for _, r in rows) or 1
+    print(f"🔥 Hottest stages over {runs} run(s)")
+    print(f"{'stage':<32} {'count':>6} {'self ms':>10} {'self %':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'err':>4}")
+    for name, r in rows[:top]:
+        print(f"{name[:32]:<32} {r['count']:>6} {r['self_ms']:>10.1f} {r['self_ms'] / total_self:>7.1%} "
+              f"{r['total_ms']:>10.1f} {r['mean_ms']:>9.1f} {r['max_ms']:>9.1f} {r['errors']:>4}")
+
+
+def print_runs(spans, last=20):
+    roots = sorted((s for s in spans if s["parent"] is None), key=lambda s: s["start"])[-last:]
+    for s in roots:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s["start"]))
+        extra = " (profiled)" if s.get("attrs", {}).get("profiled") else ""
+        print(f"{started}  {s['run']}  {s['name']:<24} {s['ms']:>10.1f} ms{extra}"
+              + (f"  ❌ {s['error']}" if "error" in s else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize NanoClaw trace spans")
+    parser.add_argument("--path", default=_state.path or DEFAULT_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sum_p = sub.add_parser("summary", help="hottest stages by self time")
+    sum_p.add_argument("--last", type=int, help="only the most recent N runs")
+    sum_p.add_argument("--name", help="only runs whose root span has this name, e.g. gdp_crawler")
+    sum_p.add_argument("--run", help="a single run id")
+    sum_p.add_argument("--top", type=int, default=20)
+    runs_p = sub.add_parser("runs", help="list recent runs")
+    runs_p.add_argument("--last", type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        spans = load_spans(args.path)
+    except OSError:
+        raise SystemExit(f"No trace at {args.path}; run with NANOCLAW_TRACE=1 first")
+
+    if args.command == "runs":
+        print_runs(spans, args.last)
+    else:
+        if args.run:
+            spans, runs = [s for s in spans if s["run"] == args.run], 1
+        else:
+            spans, runs = select_runs(spans, args.last, args.name)
+        print_summary(summarize(spans), runs, args.top)
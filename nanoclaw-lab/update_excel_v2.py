@@ -1,12 +1,21 @@
+import argparse
+import datetime
+
 import pandas as pd
-import json
 
-# Load news data if exists
-news_file = 'data/wc2026/news_20260205_230237.json'
+from news_archive import NewsArchive, day_range
+
+parser = argparse.ArgumentParser(description="Latest news plus host city sheet as one workbook")
+parser.add_argument("--dir", default="data/wc2026", help="crawler output directory holding the archive")
+parser.add_argument("--days", type=int, default=1, help="news from the last N days")
+args = parser.parse_args()
+
+# Load news from the crawler archive
 try:
-    with open(news_file, 'r') as f:
-        news_data = json.load(f)
-    df_news = pd.DataFrame(news_data)
+    archive = NewsArchive(args.dir)
+    since, until = day_range(args.days)
+    df_news = pd.DataFrame(archive.query("news", since, until))
+    archive.close()
 except Exception as e:
     print(f"Error loading news: {e}")
     df_news = pd.DataFrame()
@@ -34,10 +43,11 @@ df_cities = pd.DataFrame(host_cities)
 
 # Save to Excel with multiple sheets
 try:
-    with pd.ExcelWriter('Today_News_20260205.xlsx', engine='openpyxl') as writer:
+    excel_path = f"Today_News_{datetime.date.today().strftime('%Y%m%d')}.xlsx"
+    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
         if not df_news.empty:
             df_news.to_excel(writer, sheet_name='Latest News', index=False)
         df_cities.to_excel(writer, sheet_name='Host Cities & Stadiums', index=False)
-    print("Excel updated successfully.")
+    print(f"Excel updated successfully: {excel_path} ({len(df_news)} news rows)")
 except Exception as e:
     print(f"Error saving Excel: {e}")
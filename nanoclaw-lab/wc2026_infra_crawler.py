@@ -1,18 +1,46 @@
 # -*- coding: utf-8 -*-
+import argparse
+import asyncio
 import datetime
 import requests
-from bs4 import BeautifulSoup
 import sys
 import os
-import json
-import time
-import pandas as pd
+
+from crawl_checkpoint import CrawlCheckpoint
+from fetch_engine import FetchEngine
+from http_cache import HttpCache
+from dedup_index import DedupIndex, drop_duplicates
+from news_archive import NewsArchive
+from result_extract import extract_ddg
+import tracing
+
+INFRASTRUCTURE_QUERIES = [
+    "World Cup 2026 stadium construction progress",
+    "MetLife Stadium renovations for 2026 World Cup",
+    "Estadio Azteca renovation status 2026",
+    "BMO Field Toronto expansion World Cup 2026",
+    "BC Place Vancouver World Cup upgrades progress",
+    "SoFi Stadium pitch modification World Cup 2026",
+    "Dallas AT&T Stadium renovations World Cup 2026",
+    "Kansas City Arrowhead Stadium 2026 upgrades",
+    "Monterrey Estadio BBVA World Cup preparation",
+    "Guadalajara Estadio Akron World Cup 2026 news"
+]
 
 class InfraCrawler:
-    def __init__(self, output_dir="data/wc2026"):
+    DDG_URL = "https://html.duckduckgo.com/html/?q={q}"
+
+    def __init__(self, output_dir="data/wc2026", freshness_hours=12, max_in_flight=4, cache=None):
         self.output_dir = output_dir
+        self.cache = cache if cache is not None else HttpCache()
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
+        self.max_in_flight = max_in_flight
+        self.checkpoint = CrawlCheckpoint(
+            os.path.join(output_dir, "infra_checkpoint.jsonl"), freshness_hours=freshness_hours
+        )
+        self.dedup = DedupIndex(os.path.join(output_dir, "infra_dedup.db"))
+        self.archive = NewsArchive(output_dir)
         
         self.session = requests.Session()
         self.headers = {
@@ -20,49 +48,75 @@ class InfraCrawler:
         }
         self.session.headers.update(self.headers)
 
+    @tracing.traced("parse.ddg")
+    def parse_results(self, html):
+        return [{
+            "title": r["title"],
+            "link": r["link"],
+            "snippet": r.get("snippet", ""),
+            "timestamp": datetime.datetime.now().isoformat()
+        } for r in extract_ddg(html)]
+
     def search_ddg(self, query):
         print(f"[{datetime.datetime.now()}] 🔍 Searching: {query}")
-        url = f"https://html.duckduckgo.com/html/?q={query.replace(' ', '+')}"
+        url = self.DDG_URL.format(q=query.replace(' ', '+'))
         try:
-            response = self.session.get(url, timeout=15)
+            response = self.cache.get(self.session, url, timeout=15)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                results = []
-                for result in soup.select('.result'):
-                    title_tag = result.select_one('.result__title a')
-                    snippet_tag = result.select_one('.result__snippet')
-                    if title_tag:
-                        results.append({
-                            "title": title_tag.get_text().strip(),
-                            "link": title_tag['href'],
-                            "snippet": snippet_tag.get_text().strip() if snippet_tag else "",
-                            "timestamp": datetime.datetime.now().isoformat()
-                        })
-                return results
+                return self.parse_results(response.text)
             return []
         except Exception as e:
             print(f"❌ Error: {e}")
             return []
 
-    def run(self):
-        infrastructure_queries = [
-            "World Cup 2026 stadium construction progress",
-            "MetLife Stadium renovations for 2026 World Cup",
-            "Estadio Azteca renovation status 2026",
-            "BMO Field Toronto expansion World Cup 2026",
-            "BC Place Vancouver World Cup upgrades progress",
-            "SoFi Stadium pitch modification World Cup 2026",
-            "Dallas AT&T Stadium renovations World Cup 2026",
-            "Kansas City Arrowhead Stadium 2026 upgrades",
-            "Monterrey Estadio BBVA World Cup preparation",
-            "Guadalajara Estadio Akron World Cup 2026 news"
-        ]
-        
-        all_data = []
-        for query in infrastructure_queries:
-            results = self.search_ddg(query)
-            all_data.extend(results)
-            time.sleep(3) # Be polite
+    async def search_ddg_async(self, engine, query):
+        """Like ``search_ddg`` but returns None on failure, so the query is
+        not checkpointed and gets retried on the next run."""
+        print(f"[{datetime.datetime.now()}] 🔍 Searching: {query}")
+        try:
+            with tracing.span("fetch.ddg", query=query) as span:
+                response = await engine.fetch(self.DDG_URL.format(q=query.replace(' ', '+')))
+                span.set(status=response.status_code)
+            if response.status_code == 200:
+                return self.parse_results(response.text)
+            print(f"⚠️ DDG returned status {response.status_code} for: {query}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+        return None
+
+    async def crawl(self, queries):
+        """Run ``queries`` concurrently, checkpointing each as it completes."""
+        engine = FetchEngine(session=self.session, max_in_flight=self.max_in_flight, cache=self.cache)
+
+        async def one(query):
+            return query, await self.search_ddg_async(engine, query)
+
+        collected = []
+        try:
+            for next_done in asyncio.as_completed([one(q) for q in queries]):
+                query, results = await next_done
+                if results is None:
+                    continue
+                for item in results:
+                    item["query"] = query
+                self.checkpoint.append(query, results)
+                collected.extend(results)
+        finally:
+            engine.close()
+        return collected
+
+    def run(self, queries=INFRASTRUCTURE_QUERIES):
+        done = self.checkpoint.load()
+        pending = [q for q in queries if q not in done]
+        if len(pending) < len(queries):
+            print(f"⏩ Skipping {len(queries) - len(pending)} queries finished within the freshness window")
+
+        # Older checkpoint records predate the per-result query field
+        all_data = [dict(item, query=q) for q in queries if q in done for item in done[q]["results"]]
+        if pending:
+            all_data.extend(asyncio.run(self.crawl(pending)))
+            print(self.cache.summary())
+        self.checkpoint.compact()
         
         if all_data:
             self.save(all_data)
@@ -72,19 +126,28 @@ class InfraCrawler:
     def save(self, data):
         # Deduplicate
         unique_data = list({item['link']: item for item in data}.values())
-        
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"infra_progress_{timestamp}.json"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(unique_data, f, ensure_ascii=False, indent=2)
-            
-        # Also save to Excel for the user
-        excel_path = f"Infra_Progress_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx"
-        pd.DataFrame(unique_data).to_excel(excel_path, index=False)
-        print(f"✅ Deep crawl completed. Saved to {excel_path}")
+        # Results are marked seen only once the archive append has committed
+        with self.dedup.deferred():
+            with tracing.span("dedupe", articles=len(unique_data)):
+                fresh = drop_duplicates(self.dedup, unique_data)
+            print(f"🧬 {len(fresh)} new/updated, {len(unique_data) - len(fresh)} seen in earlier runs")
+            if fresh:
+                with tracing.span("archive", articles=len(fresh)):
+                    crawl_id = self.archive.append("infra", fresh)
+        self.dedup.evict()
+        if not fresh:
+            print("No new results since the last run.")
+            return
+        print(f"✅ Deep crawl completed. Archived {len(fresh)} results (crawl #{crawl_id}) in "
+              f"{self.output_dir}/news_archive.db")
+        print("   Export: python3 nanoclaw-lab/news_archive.py export --kind infra --format xlsx")
 
 if __name__ == "__main__":
-    crawler = InfraCrawler()
-    crawler.run()
+    parser = argparse.ArgumentParser(description="World Cup 2026 stadium infrastructure crawler")
+    parser.add_argument("--fresh-hours", type=float, default=12,
+                        help="skip queries already finished within this many hours (0 = recrawl all)")
+    args = parser.parse_args()
+
+    with tracing.run("wc2026_infra_crawler", fresh_hours=args.fresh_hours):
+        crawler = InfraCrawler(freshness_hours=args.fresh_hours)
+        crawler.run()
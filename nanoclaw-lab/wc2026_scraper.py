@@ -1,18 +1,29 @@
 # -*- coding: utf-8 -*-
+import argparse
+import asyncio
 import datetime
 import requests
-from bs4 import BeautifulSoup
 import sys
 import os
-import json
-import time
-import pandas as pd
+
+from fetch_engine import FetchEngine
+from http_cache import HttpCache
+from dedup_index import DedupIndex, drop_duplicates
+from news_archive import NewsArchive
+from result_extract import extract_ddg, extract_yahoo
+import tracing
 
 class WorldCupScraper:
-    def __init__(self, output_dir="data/wc2026"):
+    def __init__(self, output_dir="data/wc2026", max_in_flight=8, cache=None):
         self.output_dir = output_dir
+        self.cache = cache if cache is not None else HttpCache()
+        self.max_in_flight = max_in_flight
+        self._ddg_warm = False
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
+        # Remembers articles across runs so reports only carry new stories
+        self.dedup = DedupIndex(os.path.join(output_dir, "news_dedup.db"))
+        self.archive = NewsArchive(output_dir)
         
         self.session = requests.Session()
         self.headers = {
@@ -25,37 +36,34 @@ class WorldCupScraper:
         }
         self.session.headers.update(self.headers)
 
+    DDG_HOME = "https://duckduckgo.com/"
+    DDG_URL = "https://html.duckduckgo.com/html/?q={q}"
+    YAHOO_URL = "https://news.search.yahoo.com/search?p={q}"
+
+    @tracing.traced("parse.ddg")
+    def parse_ddg(self, html):
+        return [{
+            "title": r["title"],
+            "link": r["link"],
+            "source": "DuckDuckGo",
+            "snippet": r.get("snippet", "")
+        } for r in extract_ddg(html)]
+
     def fetch_news_ddg(self, query="World Cup 2026 news"):
         print(f"[{datetime.datetime.now()}] 🦆 Fetching from DuckDuckGo: {query}")
         
         try:
-            # First, visit the homepage to get cookies
-            self.session.get("https://duckduckgo.com/", timeout=10)
+            # Visit the homepage once per session to get cookies
+            if not self._ddg_warm and not self.cache.offline:
+                self.session.get(self.DDG_HOME, timeout=10)
+                self._ddg_warm = True
             
             # Now try the search
-            url = f"https://html.duckduckgo.com/html/?q={query.replace(' ', '+')}"
-            response = self.session.get(url, timeout=15)
+            url = self.DDG_URL.format(q=query.replace(' ', '+'))
+            response = self.cache.get(self.session, url, timeout=15)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                articles = []
-                
-                # Try different selectors as DDG might change them
-                results = soup.select('.result') or soup.select('.links_main')
-                
-                for result in results:
-                    title_tag = result.select_one('.result__title a') or result.select_one('.result-link')
-                    snippet_tag = result.select_one('.result__snippet') or result.select_one('.result-snippet')
-                    
-                    if title_tag:
-                        articles.append({
-                            "title": title_tag.get_text().strip(),
-                            "link": title_tag['href'] if title_tag.has_attr('href') else "",
-                            "source": "DuckDuckGo",
-                            "snippet": snippet_tag.get_text().strip() if snippet_tag else ""
-                        })
-                
-                return articles
+                return self.parse_ddg(response.text)
             else:
                 print(f"⚠️ DDG returned status {response.status_code}")
                 return []
@@ -64,92 +72,111 @@ class WorldCupScraper:
             print(f"❌ Error fetching from DDG: {e}")
             return []
 
+    async def fetch_news_ddg_async(self, engine, query="World Cup 2026 news"):
+        print(f"[{datetime.datetime.now()}] 🦆 Fetching from DuckDuckGo: {query}")
+
+        try:
+            await engine.warmup(self.DDG_HOME)
+            with tracing.span("fetch.ddg", query=query) as span:
+                response = await engine.fetch(self.DDG_URL.format(q=query.replace(' ', '+')))
+                span.set(status=response.status_code)
+
+            if response.status_code == 200:
+                return self.parse_ddg(response.text)
+            print(f"⚠️ DDG returned status {response.status_code}")
+            return []
+
+        except Exception as e:
+            print(f"❌ Error fetching from DDG: {e}")
+            return []
+
     def save_results(self, all_articles):
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        
         # Deduplicate by title
         unique_articles = list({a['title']: a for a in all_articles}.values())
-        
-        # Save JSON
-        json_path = os.path.join(self.output_dir, f"news_{timestamp}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(unique_articles, f, ensure_ascii=False, indent=2)
-            
-        # Save Markdown Report
-        md_path = os.path.join(self.output_dir, f"report_{timestamp}.md")
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(f"# 🐾 zhaosj的助手: World Cup 2026 Intelligence Report\n\n")
-            f.write(f"**Generated at:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            for i, article in enumerate(unique_articles, 1):
-                f.write(f"### {i}. {article['title']}\n")
-                f.write(f"- **Snippet:** {article.get('snippet', 'N/A')}\n")
-                f.write(f"- **Link:** [Read More]({article['link']})\n\n")
-        
-        # Save Excel (Using pandas)
-        df = pd.DataFrame(unique_articles)
-        excel_path = os.path.join(self.output_dir, f"WorldCupNews_{timestamp}.xlsx")
-        df.to_excel(excel_path, index=False)
-        
-        # Also save a copy to the root for easy access
-        root_excel_path = f"Today_News_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx"
-        df.to_excel(root_excel_path, index=False)
+        # Articles are marked seen only once the archive append has committed
+        with self.dedup.deferred():
+            with tracing.span("dedupe", articles=len(unique_articles)):
+                fresh = drop_duplicates(self.dedup, unique_articles)
+            print(f"🧬 {len(fresh)} new/updated, {len(unique_articles) - len(fresh)} seen in earlier runs")
+            if not fresh:
+                print("⚠️ No new articles since the last run, nothing archived.")
+                return None
+
+            # One append per crawl; JSON/Markdown/Excel are exported on demand
+            with tracing.span("archive", articles=len(fresh)):
+                crawl_id = self.archive.append("news", fresh)
+        print(f"\n✅ Archived {len(fresh)} articles (crawl #{crawl_id}) in {self.output_dir}/news_archive.db")
+        print("   Reports: python3 nanoclaw-lab/news_archive.py export --format md|json|xlsx")
+        return crawl_id
 
-        print(f"\n✅ Reports saved:")
-        print(f"   - JSON: {json_path}")
-        print(f"   - Markdown: {md_path}")
-        print(f"   - Excel: {excel_path}")
-        print(f"   - Root Excel: {root_excel_path}")
-        return json_path
+    @tracing.traced("parse.yahoo")
+    def parse_yahoo(self, html):
+        return [{
+            "title": r["title"],
+            "link": r["link"],
+            "source": r.get("source") or "Yahoo News",
+            "snippet": r.get("snippet", "")
+        } for r in extract_yahoo(html)]
 
     def fetch_news_yahoo(self, query="World Cup 2026 news"):
         print(f"[{datetime.datetime.now()}] 🟣 Fetching from Yahoo News: {query}")
-        url = f"https://news.search.yahoo.com/search?p={query.replace(' ', '+')}"
+        url = self.YAHOO_URL.format(q=query.replace(' ', '+'))
         
         try:
-            response = self.session.get(url, timeout=15)
+            response = self.cache.get(self.session, url, timeout=15)
+            if response.status_code == 200:
+                return self.parse_yahoo(response.text)
+            return []
+        except Exception as e:
+            print(f"❌ Error fetching from Yahoo: {e}")
+            return []
+
+    async def fetch_news_yahoo_async(self, engine, query="World Cup 2026 news"):
+        print(f"[{datetime.datetime.now()}] 🟣 Fetching from Yahoo News: {query}")
+
+        try:
+            with tracing.span("fetch.yahoo", query=query) as span:
+                response = await engine.fetch(self.YAHOO_URL.format(q=query.replace(' ', '+')))
+                span.set(status=response.status_code)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                articles = []
-                
-                # Yahoo News results are in 'div.NewsArticle' or similar
-                for item in soup.select('div.NewsArticle'):
-                    title_tag = item.select_one('h4.s-title a')
-                    snippet_tag = item.select_one('p.s-desc')
-                    source_tag = item.select_one('span.s-source')
-                    
-                    if title_tag:
-                        articles.append({
-                            "title": title_tag.get_text().strip(),
-                            "link": title_tag['href'],
-                            "source": source_tag.get_text().strip() if source_tag else "Yahoo News",
-                            "snippet": snippet_tag.get_text().strip() if snippet_tag else ""
-                        })
-                
-                return articles
+                return self.parse_yahoo(response.text)
             return []
         except Exception as e:
             print(f"❌ Error fetching from Yahoo: {e}")
             return []
 
+    async def fetch_query(self, engine, query):
+        results = await self.fetch_news_ddg_async(engine, query)
+        if not results:
+            print(f"   (DDG failed, trying Yahoo News...)")
+            results = await self.fetch_news_yahoo_async(engine, query)
+        # Archived with the article, so news_search.py --query can filter on it
+        for article in results:
+            article["query"] = query
+        return results
+
+    async def run_async(self, queries):
+        # Every query is in flight at once; the engine's per-host buckets keep
+        # DDG and Yahoo polite, so a Yahoo fallback overlaps other DDG queries.
+        engine = FetchEngine(session=self.session, max_in_flight=self.max_in_flight, cache=self.cache)
+        try:
+            per_query = await asyncio.gather(*(self.fetch_query(engine, q) for q in queries))
+        finally:
+            engine.close()
+        return [a for results in per_query for a in results]
+
     def run(self):
         queries = [
             "World Cup 2026 news",
             "World Cup 2026 schedule"
         ]
         
-        all_results = []
-        for q in queries:
-            results = self.fetch_news_ddg(q)
-            if not results:
-                print(f"   (DDG failed, trying Yahoo News...)")
-                results = self.fetch_news_yahoo(q)
-            
-            all_results.extend(results)
-            time.sleep(2) 
-            
+        all_results = asyncio.run(self.run_async(queries))
+        print(self.cache.summary())
+
         if all_results:
             self.save_results(all_results)
+            self.dedup.evict()
             print(f"\n--- Top 3 Headlines ---")
             for i, a in enumerate(all_results[:3], 1):
                 print(f"{i}. {a['title']}")
@@ -157,5 +184,9 @@ class WorldCupScraper:
             print("⚠️ No data collected. Please check network or proxy.")
 
 if __name__ == '__main__':
-    scraper = WorldCupScraper()
-    scraper.run()
+    # No options yet; parsed for `nanoclaw-lab wc-news --help` and to reject unknown arguments
+    argparse.ArgumentParser(description="World Cup 2026 news crawler").parse_args()
+
+    with tracing.run("wc2026_scraper"):
+        scraper = WorldCupScraper()
+        scraper.run()
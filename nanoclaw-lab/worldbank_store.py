@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Local SQLite time-series store for World Bank indicator data.
+
+One row per (country, indicator, year), keyed by ISO3 code. The API's
+ISO2 ids are remembered alongside, so ``--batch CN,US`` finds the rows it
+stored. Reports for any subset of countries and indicators are built from
+here without touching the network.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+
+class WorldBankStore:
+    def __init__(self, path="data/worldbank.db"):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS observations (
+                country TEXT,
+                indicator TEXT,
+                year INTEGER,
+                value REAL,
+                country_name TEXT,
+                indicator_name TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (country, indicator, year)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_observations_indicator ON observations(indicator, year);
+            CREATE TABLE IF NOT EXISTS country_codes (
+                iso2 TEXT PRIMARY KEY,
+                iso3 TEXT NOT NULL
+            ) WITHOUT ROWID;
+        """)
+
+    def upsert(self, entries):
+        """Store raw World Bank API entries; returns the number of rows written."""
+        now = datetime.now().isoformat()
+        rows = []
+        aliases = {}
+        for entry in entries:
+            country = entry.get("countryiso3code") or entry["country"]["id"]
+            if entry["country"]["id"] != country:
+                aliases[entry["country"]["id"]] = country
+            try:
+                year = int(entry["date"])
+            except (TypeError, ValueError):
+                continue
+            rows.append((country, entry["indicator"]["id"], year, entry["value"],
+                         entry["country"]["value"], entry["indicator"]["value"], now))
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO observations (country, indicator, year, value, country_name, indicator_name, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(country, indicator, year) DO UPDATE SET
+                    value = excluded.value,
+                    country_name = excluded.country_name,
+                    indicator_name = excluded.indicator_name,
+                    updated_at = excluded.updated_at
+            """, rows)
+            self.conn.executemany("INSERT OR REPLACE INTO country_codes (iso2, iso3) VALUES (?, ?)",
+                                  aliases.items())
+        return len(rows)
+
+    def resolve(self, countries):
+        """Map ISO2 codes seen in earlier fetches to the ISO3 codes rows are keyed by."""
+        aliases = dict(self.conn.execute(
+            f"SELECT iso2, iso3 FROM country_codes WHERE iso2 IN ({','.join('?' * len(countries))})",
+            countries,
+        ).fetchall())
+        return list(dict.fromkeys(aliases.get(c, c) for c in countries))
+
+    def series(self, country, indicator, years=None):
+        """Return [(year, value), ...] newest first, optionally the last ``years`` only."""
+        sql = "SELECT year, value FROM observations WHERE country = ? AND indicator = ? ORDER BY year DESC"
+        params = [country, indicator]
+        if years:
+            sql += " LIMIT ?"
+            params.append(years)
+        return self.conn.execute(sql, params).fetchall()
+
+    def names(self, countries, indicators):
+        """Return ({country: name}, {indicator: name}) for codes present in the store."""
+        country_names = dict(self.conn.execute(
+            f"SELECT country, MAX(country_name) FROM observations WHERE country IN ({','.join('?' * len(countries))}) GROUP BY country",
+            countries,
+        ).fetchall())
+        indicator_names = dict(self.conn.execute(
+            f"SELECT indicator, MAX(indicator_name) FROM observations WHERE indicator IN ({','.join('?' * len(indicators))}) GROUP BY indicator",
+            indicators,
+        ).fetchall())
+        return country_names, indicator_names
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,231 @@
+"""CPU/memory sampler reading /proc directly, with an on-disk ring buffer.
+
+``run`` samples every ``--interval`` seconds into a fixed-size, memory-mapped
+file of packed records (60 bytes each; a day at 10 s is ~0.5 MB), so the
+chart scripts can read current values and windowed aggregates without
+spawning ``top``/``vm_stat``. Nothing here forks a subprocess.
+
+    python3 resource_sampler.py run --interval 10 --pid $(pgrep -f dist/index.js)
+    python3 resource_sampler.py current
+    python3 resource_sampler.py window --seconds 3600
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+RING_PATH = "data/resource_ring.bin"
+CAPACITY = 8640  # 24h at the default interval
+INTERVAL = 10.0
+
+MAGIC = b"NCRS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")  # magic, version, record size, capacity, records written
+HEADER_SIZE = 32
+RECORD = struct.Struct("<dffffQQQfQ")
+FIELDS = ("ts", "cpu_user", "cpu_system", "cpu_idle", "cpu_iowait",
+          "mem_total", "mem_used", "mem_available", "proc_cpu", "proc_rss")
+RECORD_DTYPE = np.dtype(list(zip(FIELDS, ["<f8", "<f4", "<f4", "<f4", "<f4",
+                                          "<u8", "<u8", "<u8", "<f4", "<u8"])))
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_cpu_times():
+    """Aggregate jiffies from the first line of /proc/stat."""
+    with open("/proc/stat", "rb") as f:
+        values = [int(v) for v in f.readline().split()[1:9]]
+    values += [0] * (8 - len(values))
+    user, nice, system, idle, iowait, irq, softirq, steal = values
+    return {"user": user + nice, "system": system + irq + softirq + steal,
+            "idle": idle, "iowait": iowait}
+
+
+def read_meminfo():
+    """Bytes for the /proc/meminfo keys we use."""
+    wanted = {b"MemTotal:", b"MemAvailable:", b"MemFree:", b"Buffers:", b"Cached:"}
+    info = {}
+    with open("/proc/meminfo", "rb") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in wanted:
+                info[parts[0][:-1].decode()] = int(parts[1]) * 1024
+    if "MemAvailable" not in info:  # kernels before 3.14
+        info["MemAvailable"] = info.get("MemFree", 0) + info.get("Buffers", 0) + info.get("Cached", 0)
+    return info
+
+
+def read_process(pid):
+    """(cpu ticks, rss bytes) for ``pid``, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; fields resume after the last ')'
+    fields = data[data.rindex(b")") + 2:].split()
+    return int(fields[11]) + int(fields[12]), int(fields[21]) * PAGE_SIZE
+
+
+class Sampler:
+    """Turns successive /proc readings into interval percentages."""
+
+    def __init__(self, pid=None):
+        self.pid = pid
+        self._prev = None
+
+    def _read(self):
+        return time.monotonic(), read_cpu_times(), read_process(self.pid) if self.pid else None
+
+    def sample(self):
+        """One record tuple; the first call primes the counters with a short wait."""
+        if self._prev is None:
+            self._prev = self._read()
+            time.sleep(0.1)
+        now = self._read()
+        (t0, cpu0, proc0), (t1, cpu1, proc1) = self._prev, now
+        self._prev = now
+
+        delta = {k: cpu1[k] - cpu0[k] for k in cpu1}
+        total = sum(delta.values()) or 1
+        busy_user = delta["user"] * 100.0 / total
+        busy_system = delta["system"] * 100.0 / total
+        idle = (delta["idle"] + delta["iowait"]) * 100.0 / total
+        iowait = delta["iowait"] * 100.0 / total
+
+        mem = read_meminfo()
+        proc_cpu, proc_rss = 0.0, 0
+        if proc0 and proc1:
+            proc_cpu = (proc1[0] - proc0[0]) / CLK_TCK / max(t1 - t0, 1e-6) * 100.0
+            proc_rss = proc1[1]
+        return (time.time(), busy_user, busy_system, idle, iowait, mem["MemTotal"],
+                mem["MemTotal"] - mem["MemAvailable"], mem["MemAvailable"], proc_cpu, proc_rss)
+
+
+class RingBuffer:
+    """Fixed-capacity file of packed records, memory-mapped.
+
+    One writer appends; any number of readers may open the file meanwhile.
+    The header's running count is updated after the record is written.
+    """
+
+    def __init__(self, path=RING_PATH, capacity=CAPACITY, writable=False):
+        self.path = path
+        if writable and not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, capacity, 0).ljust(HEADER_SIZE, b"\0"))
+                f.truncate(HEADER_SIZE + capacity * RECORD.size)
+        self._file = open(path, "r+b" if writable else "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, record_size, self.capacity, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a version {VERSION} resource ring")
+
+    @property
+    def written(self):
+        return HEADER.unpack_from(self._map, 0)[4]
+
+    def append(self, record):
+        written = self.written
+        RECORD.pack_into(self._map, HEADER_SIZE + (written % self.capacity) * RECORD.size, *record)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self.capacity, written + 1)
+
+    def records(self):
+        """All stored records, oldest first, as a NumPy structured array."""
+        written = self.written
+        count = min(written, self.capacity)
+        data = np.frombuffer(self._map, dtype=RECORD_DTYPE, count=self.capacity, offset=HEADER_SIZE)
+        if written <= self.capacity:
+            return data[:count].copy()
+        start = written % self.capacity
+        return np.concatenate([data[start:], data[:start]])
+
+    def window(self, seconds, now=None):
+        records = self.records()
+        return records[records["ts"] >= (now or time.time()) - seconds]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _as_dict(record):
+    return {name: (float(record[name]) if record.dtype[name].kind == "f" else int(record[name]))
+            for name in FIELDS}
+
+
+def current(path=RING_PATH, max_age=2 * INTERVAL):
+    """Latest values: from the ring if the sampler is running, else measured now."""
+    if os.path.exists(path):
+        ring = RingBuffer(path)
+        try:
+            records = ring.records()
+        finally:
+            ring.close()
+        if len(records) and time.time() - records["ts"][-1] <= max_age:
+            return _as_dict(records[-1])
+    return dict(zip(FIELDS, Sampler().sample()))
+
+
+def window_stats(seconds, path=RING_PATH):
+    """Mean and max of each metric over the last ``seconds``, or None without data."""
+    if not os.path.exists(path):
+        return None
+    ring = RingBuffer(path)
+    try:
+        records = ring.window(seconds)
+    finally:
+        ring.close()
+    if not len(records):
+        return None
+    stats = {"samples": int(len(records)), "from": float(records["ts"][0]), "to": float(records["ts"][-1])}
+    for name in FIELDS[1:]:
+        values = records[name].astype(np.float64)
+        stats[name] = {"mean": float(values.mean()), "max": float(values.max())}
+    return stats
+
+
+def run(path=RING_PATH, interval=INTERVAL, capacity=CAPACITY, pid=None, count=None):
+    ring = RingBuffer(path, capacity, writable=True)
+    sampler = Sampler(pid)
+    taken = 0
+    next_at = time.monotonic()
+    try:
+        while count is None or taken < count:
+            ring.append(sampler.sample())
+            taken += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample /proc CPU and memory into a ring buffer")
+    parser.add_argument("--path", default=RING_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="sample until interrupted")
+    run_p.add_argument("--interval", type=float, default=INTERVAL)
+    run_p.add_argument("--capacity", type=int, default=CAPACITY, help="records kept (new files only)")
+    run_p.add_argument("--pid", type=int, help="also track this process's CPU and RSS")
+    run_p.add_argument("--count", type=int, help="stop after this many samples")
+    sub.add_parser("current", help="print the latest sample")
+    win_p = sub.add_parser("window", help="print aggregates over a recent window")
+    win_p.add_argument("--seconds", type=float, default=3600)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        print(f"📈 Sampling every {args.interval:g}s into {args.path}")
+        run(args.path, args.interval, args.capacity, args.pid, args.count)
+    elif args.command == "current":
+        print(json.dumps(current(args.path), indent=2))
+    else:
+        print(json.dumps(window_stats(args.seconds, args.path), indent=2))
@@ -61,6 +61,7 @@ export function initDatabase() {
       timestamp DATETIME,
       from_me INTEGER
     );
+    CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp);
     CREATE TABLE IF NOT EXISTS chats (
       jid TEXT PRIMARY KEY,
       name TEXT,
@@ -78,6 +79,7 @@ export function initDatabase() {
       status TEXT,
       created_at DATETIME
     );
+    CREATE INDEX IF NOT EXISTS idx_tasks_status_next_run ON tasks(status, next_run);
     CREATE TABLE IF NOT EXISTS task_runs (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       task_id TEXT,
@@ -251,6 +253,11 @@ export function getAllTasks(): Task[] {
   return db.prepare('SELECT * FROM tasks').all() as Task[];
 }
 
+export function getDueTasks(now: string): Task[] {
+  return db.prepare("SELECT * FROM tasks WHERE status = 'active' AND next_run <= ? ORDER BY next_run")
+    .all(now) as Task[];
+}
+
 export function getTaskById(id: string): Task | undefined {
   return db.prepare('SELECT * FROM tasks WHERE id = ?').get(id) as Task | undefined;
 }
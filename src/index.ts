@@ -53,6 +53,7 @@ import { loadJson, saveJson } from './utils.js';
 import { logger } from './logger.js';
 import { LarkConnector } from './lark-connector.js';
 import { generateDashboard } from './db-dashboard.js';
+import { stopOcrWorker } from './ocr-worker.js';
 import { startDashboardServer } from './server.js';
 
 const GROUP_SYNC_INTERVAL_MS = 24 * 60 * 60 * 1000; // 24 hours
@@ -127,12 +128,14 @@ function acquireLock(): void {
         }
       }
     } catch (e) {}
+    stopOcrWorker();
     process.exit(0);
   };
 
   process.on('SIGINT', cleanup);
   process.on('SIGTERM', cleanup);
   process.on('exit', () => {
+    stopOcrWorker();
     try {
       if (fs.existsSync(PID_FILE) && fs.readFileSync(PID_FILE, 'utf-8') === process.pid.toString()) {
         fs.unlinkSync(PID_FILE);
@@ -2,6 +2,7 @@ import { execSync } from 'child_process';
 import fs from 'fs';
 import path from 'path';
 import { logger } from './logger.js';
+import { ocrImage } from './ocr-worker.js';
 
 export interface MediaInfo {
   type: 'audio' | 'image' | 'document';
@@ -45,8 +46,8 @@ export async function analyzeMedia(filePath: string): Promise<MediaInfo | null>
       
       let ocrText = '';
       try {
-        // 调用 macOS 原生 OCR (Vision Framework)
-        ocrText = execSync(`python3 src/native-ocr.py "${filePath}"`, { encoding: 'utf-8' }).trim();
+        // 调用 macOS 原生 OCR (Vision Framework)，常驻进程避免每张图重复启动
+        ocrText = (await ocrImage(filePath)).trim();
       } catch (err) {
         logger.warn({ err }, 'Native OCR failed, falling back to stats only');
       }
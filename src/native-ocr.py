@@ -1,39 +1,282 @@
 import sys
-try:
-    from AppKit import NSImage
-    import Vision
-    import Quartz
-except ImportError:
-    print('Error: Missing pyobjc-framework-Vision or AppKit')
-    sys.exit(1)
-
-def ocr_image(file_path):
+import os
+import json
+import time
+import argparse
+import contextvars
+import signal
+import threading
+import socketserver
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+from ocr_cache import CachedRecognizer, OcrCache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from lab_tracing import tracing
+
+IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.webp', '.heic', '.gif', '.bmp', '.tiff'}
+DEFAULT_MAX_DIM = 2048
+AUTO_ACCURATE_MAX_PIXELS = 4_000_000
+
+class VisionRecognizer:
+    """macOS Vision framework backend. Frameworks are loaded once, here."""
+    name = 'vision'
+
+    def __init__(self):
+        import Foundation
+        import Vision
+        import Quartz
+        import objc
+        self.Foundation = Foundation
+        self.Vision = Vision
+        self.Quartz = Quartz
+        self.objc = objc
+
+    def _load(self, file_path, max_dim):
+        Q = self.Quartz
+        url = self.Foundation.NSURL.fileURLWithPath_(file_path)
+        source = Q.CGImageSourceCreateWithURL(url, None)
+        if source is None:
+            raise ValueError('Could not load image')
+        props = Q.CGImageSourceCopyPropertiesAtIndex(source, 0, None) or {}
+        pixels = int(props.get('PixelWidth', 0)) * int(props.get('PixelHeight', 0))
+        if max_dim:
+            # ImageIO decodes straight to the reduced size instead of
+            # materializing the full-resolution bitmap first.
+            cg_image = Q.CGImageSourceCreateThumbnailAtIndex(source, 0, {
+                Q.kCGImageSourceCreateThumbnailFromImageAlways: True,
+                Q.kCGImageSourceCreateThumbnailWithTransform: True,
+                Q.kCGImageSourceThumbnailMaxPixelSize: max_dim,
+            })
+        else:
+            cg_image = Q.CGImageSourceCreateImageAtIndex(source, 0, None)
+        if cg_image is None:
+            raise ValueError('Could not load image')
+        return cg_image, pixels
+
+    def recognize(self, file_path, max_dim=None, level='accurate', roi=None):
+        # Each worker thread needs its own autorelease pool for Cocoa objects
+        with self.objc.autorelease_pool():
+            cg_image, pixels = self._load(file_path, max_dim)
+            if level == 'auto':
+                level = 'accurate' if pixels <= AUTO_ACCURATE_MAX_PIXELS else 'fast'
+
+            request_handler = self.Vision.VNImageRequestHandler.alloc().initWithCGImage_options_(cg_image, None)
+            request = self.Vision.VNRecognizeTextRequest.alloc().init()
+            request.setRecognitionLevel_(
+                self.Vision.VNRequestTextRecognitionLevelFast if level == 'fast'
+                else self.Vision.VNRequestTextRecognitionLevelAccurate
+            )
+            if roi:
+                # Vision's normalized coordinates start at the bottom-left
+                x, y, w, h = roi
+                request.setRegionOfInterest_(self.Quartz.CGRectMake(x, 1 - y - h, w, h))
+
+            success, error = request_handler.performRequests_error_([request], None)
+            if not success:
+                raise RuntimeError(str(error))
+
+            text_parts = []
+            for result in request.results():
+                candidates = result.topCandidates_(1)
+                if candidates:
+                    text_parts.append(candidates[0].string())
+
+            return '\n'.join(text_parts)
+
+class StubRecognizer:
+    """Deterministic backend for exercising the protocol and queue off macOS."""
+    name = 'stub'
+
+    def __init__(self):
+        self.delay = float(os.environ.get('NANOCLAW_OCR_STUB_DELAY', '0'))
+
+    def recognize(self, file_path, max_dim=None, level='accurate', roi=None):
+        if not os.path.exists(file_path):
+            raise ValueError('Could not load image')
+        if self.delay:
+            time.sleep(self.delay)
+        return f'stub:{os.path.basename(file_path)}'
+
+BACKENDS = {'vision': VisionRecognizer, 'stub': StubRecognizer}
+
+def load_recognizer(name=None):
+    name = name or os.environ.get('NANOCLAW_OCR_BACKEND', 'vision')
+    return BACKENDS[name]()
+
+def ocr_image(file_path, recognizer, **options):
     try:
-        image = NSImage.alloc().initWithContentsOfFile_(file_path)
-        if not image:
-            return 'Error: Could not load image'
-        
-        cg_image = image.CGImageForProposedRect_context_hints_(None, None, None)[0]
-        request_handler = Vision.VNImageRequestHandler.alloc().initWithCGImage_options_(cg_image, None)
-        request = Vision.VNRecognizeTextRequest.alloc().init()
-        request.setRecognitionLevel_(Vision.VNRequestTextRecognitionLevelAccurate)
-        
-        success, error = request_handler.performRequests_error_([request], None)
-        if not success:
-            return f'Error: {error}'
-        
-        results = request.results()
-        text_parts = []
-        for result in results:
-            candidates = result.topCandidates_(1)
-            if candidates:
-                text_parts.append(candidates[0].string())
-        
-        return '\n'.join(text_parts)
+        return recognizer.recognize(file_path, **options)
     except Exception as e:
         return f'Error: {str(e)}'
 
+def iter_images(paths):
+    """Yield image files from ``paths``, walking directories lazily."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTS:
+                    yield os.path.join(root, name)
+
+def _batch_one(recognizer, path, options):
+    started = time.monotonic()
+    try:
+        with tracing.span('ocr.image', path=os.path.basename(path)):
+            result = {'path': path, 'text': recognizer.recognize(path, **options)}
+    except Exception as e:
+        result = {'path': path, 'error': str(e)}
+    result['ms'] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+def ocr_batch(paths, recognizer, workers=4, **options):
+    """OCR many images on a thread pool, yielding results as they finish.
+
+    At most ``2 * workers`` images are in flight, so memory stays bounded no
+    matter how many files ``paths`` expands to.
+    """
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path in iter_images(paths):
+            # Pool threads do not inherit contextvars; carry the run's span over
+            pending.add(pool.submit(contextvars.copy_context().run, _batch_one, recognizer, path, options))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+def parse_roi(value):
+    roi = tuple(float(v) for v in value.split(','))
+    if len(roi) != 4:
+        raise argparse.ArgumentTypeError('ROI must be x,y,w,h (normalized, top-left origin)')
+    return roi
+
+def request_options(request):
+    options = {}
+    for key in ('max_dim', 'level'):
+        if request.get(key) is not None:
+            options[key] = request[key]
+    if request.get('roi'):
+        options['roi'] = tuple(request['roi'])
+    return options
+
+def handle_request(recognizer, line):
+    """Run one JSON-lines request and build its response.
+
+    Requests are {"id", "path"} plus optional "max_dim", "level" and "roi".
+    """
+    started = time.monotonic()
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        with tracing.span('ocr.request', path=os.path.basename(request['path'])):
+            text = recognizer.recognize(request['path'], **request_options(request))
+        response = {'id': request_id, 'text': text}
+    except Exception as e:
+        response = {'id': request_id, 'error': str(e)}
+    response['ms'] = round((time.monotonic() - started) * 1000, 1)
+    return response
+
+def serve_stream(recognizer, reader, writer, pool):
+    """Answer requests from ``reader`` concurrently; responses are written to
+    ``writer`` in completion order, so clients must match them by id."""
+    write_lock = threading.Lock()
+
+    def process(line):
+        data = (json.dumps(handle_request(recognizer, line), ensure_ascii=False) + '\n').encode('utf-8')
+        with write_lock:
+            try:
+                writer.write(data)
+                writer.flush()
+            except (BrokenPipeError, ValueError):
+                pass
+        # The server runs for the life of the app, so spans go out per request
+        tracing.flush()
+
+    pending = []
+    for line in reader:
+        if not line.strip():
+            continue
+        pending = [f for f in pending if not f.done()]
+        pending.append(pool.submit(contextvars.copy_context().run, process, line))
+
+    # Drain before returning so a closing client still gets every reply
+    for future in pending:
+        future.result()
+
+def serve_socket(recognizer, socket_path, pool):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # Connection threads start with an empty context; give them the server's
+    context = contextvars.copy_context()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            context.copy().run(serve_stream, recognizer, self.rfile, self.wfile, pool)
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        server.daemon_threads = True
+        server.serve_forever()
+
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Native OCR via macOS Vision')
+    parser.add_argument('images', nargs='*')
+    parser.add_argument('--batch', action='store_true', help='OCR every image/directory given, one JSON line per image')
+    parser.add_argument('--max-dim', type=int, default=None,
+                        help=f'downscale so the longer side is at most this many pixels (batch default {DEFAULT_MAX_DIM}, 0 = full size)')
+    parser.add_argument('--level', choices=['accurate', 'fast', 'auto'], default='accurate')
+    parser.add_argument('--roi', type=parse_roi, help='normalized region of interest x,y,w,h')
+    parser.add_argument('--serve', action='store_true', help='JSON-lines server on stdin/stdout')
+    parser.add_argument('--socket', help='JSON-lines server on a Unix socket instead of stdin/stdout')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--backend', choices=sorted(BACKENDS))
+    parser.add_argument('--no-cache', action='store_true', help='always run the recognizer')
+    parser.add_argument('--near-dup', action='store_true', help='also reuse results for perceptually similar images')
+    args = parser.parse_args()
+
+    if not args.images and not args.serve and not args.socket:
+        sys.exit(1)
+    if len(args.images) > 1 and not args.batch:
+        parser.error('several images need --batch')
+
+    try:
+        recognizer = load_recognizer(args.backend)
+    except ImportError:
+        print('Error: Missing pyobjc-framework-Vision or AppKit')
         sys.exit(1)
-    print(ocr_image(sys.argv[1]))
+
+    if not args.no_cache:
+        recognizer = CachedRecognizer(recognizer, OcrCache(near_duplicates=args.near_dup))
+
+    max_dim = args.max_dim if args.max_dim is not None else (DEFAULT_MAX_DIM if args.batch else 0)
+    options = {'max_dim': max_dim or None, 'level': args.level, 'roi': args.roi}
+
+    if args.batch:
+        sys.stdout.reconfigure(encoding='utf-8')
+        with tracing.run('native-ocr', mode='batch', workers=args.workers):
+            for result in ocr_batch(args.images, recognizer, workers=args.workers, **options):
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+        sys.exit(0)
+
+    if args.images:
+        with tracing.run('native-ocr', mode='single'):
+            print(ocr_image(args.images[0], recognizer, **options))
+        sys.exit(0)
+
+    # SIGTERM unwinds like Ctrl-C, so the server's root span is still written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    pool = ThreadPoolExecutor(max_workers=args.workers)
+    with tracing.run('native-ocr', mode='socket' if args.socket else 'serve', workers=args.workers):
+        if args.socket:
+            serve_socket(recognizer, args.socket, pool)
+        else:
+            serve_stream(recognizer, sys.stdin.buffer, sys.stdout.buffer, pool)
+    pool.shutdown(wait=True)
@@ -0,0 +1,94 @@
+/**
+ * Long-lived OCR worker: keeps one `native-ocr.py --serve` process alive so
+ * the Vision frameworks are imported once instead of per image.
+ */
+import { ChildProcessWithoutNullStreams, spawn } from 'child_process';
+import readline from 'readline';
+import { logger } from './logger.js';
+
+interface PendingRequest {
+  resolve: (text: string) => void;
+  reject: (err: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+const OCR_WORKERS = process.env.OCR_WORKERS || '2';
+const OCR_TIMEOUT_MS = 60000;
+
+let worker: ChildProcessWithoutNullStreams | null = null;
+let nextId = 1;
+const pending = new Map<number, PendingRequest>();
+
+function failAll(err: Error) {
+  for (const [id, req] of pending) {
+    clearTimeout(req.timer);
+    req.reject(err);
+    pending.delete(id);
+  }
+}
+
+function getWorker(): ChildProcessWithoutNullStreams {
+  if (worker) return worker;
+
+  const child = spawn('python3', ['src/native-ocr.py', '--serve', '--workers', OCR_WORKERS]);
+  logger.info({ pid: child.pid }, 'OCR worker started');
+
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    let msg: { id: number; text?: string; error?: string; ms?: number };
+    try {
+      msg = JSON.parse(line);
+    } catch {
+      logger.warn({ line }, 'OCR worker emitted non-JSON output');
+      return;
+    }
+    const req = pending.get(msg.id);
+    if (!req) return;
+    pending.delete(msg.id);
+    clearTimeout(req.timer);
+    if (msg.error !== undefined) req.reject(new Error(msg.error));
+    else req.resolve(msg.text || '');
+  });
+
+  child.stdin.on('error', (err) => logger.warn({ err }, 'OCR worker stdin closed'));
+  child.stderr.on('data', (data) => logger.debug({ stderr: data.toString() }, 'OCR worker stderr'));
+
+  child.on('exit', (code) => {
+    logger.warn({ code }, 'OCR worker exited');
+    if (worker === child) worker = null;
+    failAll(new Error(`OCR worker exited with code ${code}`));
+  });
+
+  child.on('error', (err) => {
+    logger.error({ err }, 'OCR worker failed to start');
+    if (worker === child) worker = null;
+    failAll(err);
+  });
+
+  worker = child;
+  return child;
+}
+
+export function ocrImage(filePath: string): Promise<string> {
+  return new Promise((resolve, reject) => {
+    const id = nextId++;
+    const timer = setTimeout(() => {
+      pending.delete(id);
+      reject(new Error(`OCR timed out after ${OCR_TIMEOUT_MS}ms`));
+    }, OCR_TIMEOUT_MS);
+    pending.set(id, { resolve, reject, timer });
+    getWorker().stdin.write(JSON.stringify({ id, path: filePath }) + '\n');
+  });
+}
+
+/**
+ * Close the worker's stdin: it answers what is already queued, flushes its
+ * trace spans and exits on its own. Safe to call more than once.
+ */
+export function stopOcrWorker() {
+  if (worker) {
+    const child = worker;
+    worker = null;
+    child.stdin.end();
+    logger.info({ pid: child.pid }, 'OCR worker stopping');
+  }
+}
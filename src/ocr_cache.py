@@ -0,0 +1,280 @@
+"""Content-addressed OCR result cache.
+
+Results are keyed by the SHA-256 of the image bytes, so a forwarded
+screenshot or repeated sticker is recognized once no matter which message
+carries it. Full-resolution ``accurate`` text is stored under the bare
+digest; downscaled or ``fast``/``auto`` results get a variant suffix so they
+are never served to a full-quality request. A (path, size, mtime) table skips re-hashing files we have seen,
+which keeps hits well under a millisecond. An optional 64-bit dHash finds
+near-duplicates (re-encoded or resized copies); it is split into four 16-bit
+bands so candidates come from an index lookup instead of a table scan. It is
+only computed when near-duplicate matching is on.
+
+Everything lives in one SQLite file with entry-count bounded LRU eviction;
+evicting a result also drops the path rows that pointed at it.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+OCR_BLOCK = re.compile(r'--- START OCR ---\n(.*)\n--- END OCR ---', re.S)
+# Batched last_hit updates reach the database after this many hits or seconds
+TOUCH_FLUSH_HITS = 64
+TOUCH_FLUSH_SECONDS = 30
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def dhash(path):
+    """64-bit difference hash, or None when Pillow is unavailable."""
+    if Image is None:
+        return None
+    with Image.open(path) as img:
+        img.draft('L', (64, 64))
+        pixels = img.convert('L').resize((9, 8)).tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+def cache_variant(max_dim=None, level='accurate'):
+    """Key suffix for recognition options; '' for full-size accurate OCR."""
+    if not max_dim and level == 'accurate':
+        return ''
+    return f':{level}:{max_dim or "full"}'
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _bands(value):
+    return [(value >> shift) & 0xFFFF for shift in (48, 32, 16, 0)]
+
+class OcrCache:
+    def __init__(self, path='data/ocr_cache.db', max_entries=50000, near_duplicates=False, max_distance=3):
+        self.path = path
+        self.max_entries = max_entries
+        self.near_duplicates = near_duplicates and Image is not None
+        self.max_distance = max_distance
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS ocr (
+                sha256 TEXT PRIMARY KEY,
+                phash INTEGER,
+                b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER,
+                text TEXT,
+                created_at REAL,
+                last_hit REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ocr_b0 ON ocr(b0);
+            CREATE INDEX IF NOT EXISTS idx_ocr_b1 ON ocr(b1);
+            CREATE INDEX IF NOT EXISTS idx_ocr_b2 ON ocr(b2);
+            CREATE INDEX IF NOT EXISTS idx_ocr_b3 ON ocr(b3);
+            CREATE INDEX IF NOT EXISTS idx_ocr_last_hit ON ocr(last_hit);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                sha256 TEXT
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                message_id TEXT PRIMARY KEY,
+                sha256 TEXT
+            );
+        ''')
+        self._count = self._conn.execute('SELECT COUNT(*) FROM ocr').fetchone()[0]
+        # last_hit updates are batched so a hit does not pay for a commit; the
+        # time bound keeps LRU order current in the long-running --serve worker
+        self._touched = {}
+        self._touched_since = None
+
+    def digest(self, path):
+        """SHA-256 of ``path``, reusing the stored digest if the file is unchanged."""
+        st = os.stat(path)
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute('SELECT size, mtime_ns, sha256 FROM files WHERE path = ?', (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        sha = file_digest(path)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)',
+                               (path, st.st_size, st.st_mtime_ns, sha))
+            self._conn.commit()
+        return sha
+
+    def get(self, path, variant=''):
+        """Return cached OCR text for the image at ``path``, or None."""
+        key = self.digest(path) + variant
+        with self._lock:
+            row = self._conn.execute('SELECT text FROM ocr WHERE sha256 = ?', (key,)).fetchone()
+            if row:
+                self._touch(key)
+                return row[0]
+        # Variant rows carry no dHash bands, so near matches are full-quality only
+        if not self.near_duplicates or variant:
+            return None
+        return self._near(path)
+
+    def _near(self, path):
+        try:
+            value = dhash(path)
+        except Exception:
+            return None
+        b = _bands(value)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT sha256, phash, text FROM ocr WHERE b0 = ? OR b1 = ? OR b2 = ? OR b3 = ?', b
+            ).fetchall()
+        best = None
+        for sha, phash, text in rows:
+            distance = bin((phash & ((1 << 64) - 1)) ^ value).count('1')
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, sha, text)
+        if best is None:
+            return None
+        with self._lock:
+            self._touch(best[1])
+        return best[2]
+
+    def _touch(self, sha):
+        now = time.time()
+        if self._touched_since is None:
+            self._touched_since = now
+        self._touched[sha] = now
+        if len(self._touched) >= TOUCH_FLUSH_HITS or now - self._touched_since >= TOUCH_FLUSH_SECONDS:
+            self._flush_touched()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany('UPDATE ocr SET last_hit = ? WHERE sha256 = ?',
+                                   [(t, sha) for sha, t in self._touched.items()])
+            self._conn.commit()
+            self._touched.clear()
+        self._touched_since = None
+
+    def put(self, path, text, message_id=None, variant=''):
+        sha = self.digest(path)
+        key = sha + variant
+        value = None
+        # Without near-duplicate lookups the bands are never read; skip the second decode
+        if self.near_duplicates and not variant:
+            try:
+                value = dhash(path)
+            except Exception:
+                value = None
+        b = _bands(value) if value is not None else [None] * 4
+        now = time.time()
+        with self._lock:
+            existed = self._conn.execute('SELECT 1 FROM ocr WHERE sha256 = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO ocr (sha256, phash, b0, b1, b2, b3, text, created_at, last_hit)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, _signed(value) if value is not None else None, *b, text, now, now),
+            )
+            if message_id:
+                self._conn.execute('INSERT OR REPLACE INTO messages (message_id, sha256) VALUES (?, ?)',
+                                   (message_id, key))
+            if not existed:
+                self._count += 1
+            self._evict()
+            self._conn.commit()
+        return key
+
+    def _evict(self):
+        if self._count <= self.max_entries:
+            return
+        self._flush_touched()
+        excess = self._count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            'DELETE FROM ocr WHERE sha256 IN (SELECT sha256 FROM ocr ORDER BY last_hit LIMIT ?)', (excess,)
+        )
+        self._conn.execute('DELETE FROM messages WHERE sha256 NOT IN (SELECT sha256 FROM ocr)')
+        # Path rows whose digest has no result left, under the bare key or any
+        # ':variant' suffix (the range stays on the primary key index)
+        self._conn.execute(
+            "DELETE FROM files WHERE NOT EXISTS"
+            " (SELECT 1 FROM ocr WHERE ocr.sha256 >= files.sha256 AND ocr.sha256 < files.sha256 || ';')"
+        )
+        self._count -= excess
+
+    def import_media_dir(self, media_dir='data/media'):
+        """Seed the cache from existing ``analysis_<id>.json`` records whose
+        ``image_<id>.*`` file is still present."""
+        imported = 0
+        for analysis_path in glob.glob(os.path.join(media_dir, 'analysis_*.json')):
+            message_id = os.path.basename(analysis_path)[len('analysis_'):-len('.json')]
+            images = glob.glob(os.path.join(media_dir, f'image_{message_id}.*'))
+            if not images:
+                continue
+            try:
+                with open(analysis_path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if record.get('type') != 'image':
+                continue
+            match = OCR_BLOCK.search(record.get('description', ''))
+            # No OCR block means OCR failed and media-analyzer fell back to
+            # image stats; caching '' would stop the image ever being retried
+            if not match:
+                continue
+            self.put(images[0], match.group(1), message_id=message_id)
+            imported += 1
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.close()
+
+class CachedRecognizer:
+    """Wraps a recognizer backend so cache hits never reach Vision."""
+
+    def __init__(self, recognizer, cache):
+        self.recognizer = recognizer
+        self.cache = cache
+        self.name = recognizer.name
+
+    def recognize(self, file_path, roi=None, max_dim=None, level='accurate'):
+        # A region-of-interest result only covers part of the image
+        if roi:
+            return self.recognizer.recognize(file_path, max_dim=max_dim, level=level, roi=roi)
+        variant = cache_variant(max_dim, level)
+        text = self.cache.get(file_path, variant)
+        if text is not None:
+            return text
+        text = self.recognizer.recognize(file_path, max_dim=max_dim, level=level)
+        self.cache.put(file_path, text, variant=variant)
+        return text
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'stats'):
+        print('usage: ocr_cache.py import [media_dir] | stats')
+        sys.exit(1)
+    cache = OcrCache()
+    if sys.argv[1] == 'import':
+        media_dir = sys.argv[2] if len(sys.argv) > 2 else 'data/media'
+        print(f'Imported {cache.import_media_dir(media_dir)} OCR results from {media_dir}')
+    else:
+        print(f'{cache._count} cached OCR results in {cache.path}')
+    cache.close()
@@ -10,6 +10,7 @@ import {
 } from './config.js';
 import {
   getAllTasks,
+  getDueTasks,
   getTaskById,
   logTaskRun,
   updateTask,
@@ -118,13 +119,10 @@ async function runTask(
 
 export function startSchedulerLoop(deps: SchedulerDependencies) {
   setInterval(async () => {
-    const tasks = getAllTasks();
     const now = new Date().toISOString();
 
-    for (const task of tasks) {
-      if (task.status === 'active' && task.next_run && task.next_run <= now) {
-        await runTask(task, deps);
-      }
+    for (const task of getDueTasks(now)) {
+      await runTask(task, deps);
     }
   }, POLL_INTERVAL);
   